@@ -17,14 +17,16 @@ def pool_handler():
         By default, the number of workers is the number of cores in the CPU.
         You can specify the number of workers by passing the processes argument to the Pool class.
     '''
-    pool = Pool(processes=2)
-    '''
-        The map() function in the Pool class applies the function to each element in the iterable.
-        It blocks the main program until all the processes are finished.
-    '''
-    # work_log: function to be applied to each element in the iterable
-    # work: iterable
-    pool.map(work_log, work)
+    # the with statement closes the pool (and its worker processes) once the block is done
+    with Pool(processes=2) as pool:
+        '''
+            The map() function in the Pool class applies the function to each element in the iterable.
+            It blocks the main program until all the processes are finished.
+            See 2_3_pool_adaptive_chunking.py for streaming results and tuning the chunksize.
+        '''
+        # work_log: function to be applied to each element in the iterable
+        # work: iterable
+        pool.map(work_log, work)
 
 if __name__ == "__main__":
     pool_handler()
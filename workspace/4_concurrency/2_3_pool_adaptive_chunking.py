@@ -0,0 +1,215 @@
+# Multiprocessing Pool with adaptive chunking
+# Every task sent to a worker process is pickled, written to a pipe, read by the worker,
+# unpickled, executed and then the result travels back the same way.
+# For tiny tasks this IPC (Inter-Process Communication) overhead is bigger than the work itself.
+# The fix is "chunking": send many items in one message so the overhead is paid once per chunk.
+#   - chunk too small -> IPC overhead dominates (many tiny tasks)
+#   - chunk too big   -> bad load balancing, one worker ends up with all the slow items (few huge tasks)
+# This module keeps ONE persistent pool, measures how long an item takes inside the worker
+# and picks the chunksize so that every chunk takes roughly `target_chunk_seconds`.
+
+from collections import deque
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+from queue import Queue
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import time
+
+
+def _timed_chunk(func: Callable, chunk: list) -> Tuple[list, float]:
+    """Runs func on every item of the chunk inside the worker and returns the CPU time per item."""
+    # process_time() only counts the time spent running, not the time spent waiting on the pipe
+    start = time.process_time()
+    results = [func(item) for item in chunk]
+    return results, (time.process_time() - start) / len(chunk)
+
+
+class AdaptivePool:
+    """
+    A persistent process pool that tunes its chunksize from the observed cost per item.
+
+    Args:
+        processes: Number of worker processes (defaults to the number of CPU cores)
+        maxtasksperchild: Recycle a worker after this many tasks to bound its memory usage
+        target_chunk_seconds: How long a single chunk should take inside a worker
+        max_chunksize: Upper bound for the chunksize
+        smoothing: Weight of the newest measurement in the moving average (0..1)
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        maxtasksperchild: Optional[int] = 10_000,
+        target_chunk_seconds: float = 0.02,
+        max_chunksize: int = 4096,
+        smoothing: float = 0.3,
+    ):
+        self.processes = processes or cpu_count()
+        self.target_chunk_seconds = target_chunk_seconds
+        self.max_chunksize = max_chunksize
+        self.smoothing = smoothing
+        # cost per item for every function seen so far; a function that was never
+        # measured starts with chunksize=1 and its first batch is used as a probe
+        self.item_costs: Dict[Callable, float] = {}
+        '''
+            maxtasksperchild: a worker exits after completing that many tasks and a fresh one
+            is started. NOTE: with chunking, one chunk counts as ONE task.
+        '''
+        self._pool = Pool(processes=self.processes, maxtasksperchild=maxtasksperchild)
+
+    def chunksize_for(self, func: Callable) -> int:
+        """Returns the chunksize that makes one chunk of func take ~target_chunk_seconds."""
+        if func not in self.item_costs:
+            return 1
+        # avoid dividing by zero for functions that are faster than the clock resolution
+        cost = max(self.item_costs[func], 1e-7)
+        return max(1, min(self.max_chunksize, int(self.target_chunk_seconds / cost)))
+
+    def _update_cost(self, func: Callable, durations: List[float]) -> None:
+        """Updates the moving average of the per-item cost of func."""
+        if not durations:
+            return
+        measured = sum(durations) / len(durations)
+        previous = self.item_costs.get(func)
+        if previous is None:
+            self.item_costs[func] = measured
+        else:
+            self.item_costs[func] = self.smoothing * measured + (1 - self.smoothing) * previous
+
+    def imap(self, func: Callable, iterable: Iterable, ordered: bool = True) -> Iterator:
+        """
+        Streams results back as soon as they are ready.
+
+        Up to `processes * 4` chunks are in flight at once. Whenever one comes back,
+        its timing re-tunes the chunksize and the next chunk is sent right away, so
+        the workers never wait for a whole batch to drain. Each chunk travels as a
+        single message and is timed as a whole inside the worker.
+        ordered=True keeps the input order (imap), ordered=False yields chunks in
+        completion order (imap_unordered) which keeps all the workers busy.
+        """
+        timed_chunk = partial(_timed_chunk, func)
+        iterator = iter(iterable)
+        # enough chunks queued to keep every worker busy while results travel back
+        window = self.processes * 4
+        pending: deque = deque()  # AsyncResults in submission order (ordered=True)
+        finished: Queue = Queue()  # (result, error) in completion order (ordered=False)
+        in_flight = 0
+
+        def fill() -> int:
+            sent = 0
+            while in_flight + sent < window:
+                chunk = list(islice(iterator, self.chunksize_for(func)))
+                if not chunk:
+                    break
+                if ordered:
+                    pending.append(self._pool.apply_async(timed_chunk, (chunk,)))
+                else:
+                    self._pool.apply_async(
+                        timed_chunk, (chunk,),
+                        callback=lambda result: finished.put((result, None)),
+                        error_callback=lambda error: finished.put((None, error)),
+                    )
+                sent += 1
+            return sent
+
+        in_flight += fill()
+        while in_flight:
+            if ordered:
+                chunk_results, duration = pending.popleft().get()
+            else:
+                result, error = finished.get()
+                if error is not None:
+                    raise error
+                chunk_results, duration = result
+            in_flight -= 1
+            self._update_cost(func, [duration])
+            # top the window up before handing the results to the caller
+            in_flight += fill()
+            yield from chunk_results
+
+    def imap_unordered(self, func: Callable, iterable: Iterable) -> Iterator:
+        """Same as imap(ordered=False)."""
+        return self.imap(func, iterable, ordered=False)
+
+    def map(self, func: Callable, iterable: Iterable) -> list:
+        """Blocks until all the results are ready and returns them in order."""
+        return list(self.imap(func, iterable))
+
+    def close(self) -> None:
+        # no more tasks will be submitted, let the workers exit when done
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self) -> None:
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+
+# --- Workloads (must be defined at module level so they can be pickled) ---
+
+def tiny_task(n: int) -> int:
+    return n * n
+
+
+def huge_task(n: int) -> int:
+    while n > 0:
+        n -= 1
+    return n
+
+
+# --- Benchmark ---
+
+def benchmark(label: str, run: Callable[[], list]) -> float:
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<40} {elapsed:8.3f}s")
+    return elapsed
+
+
+def main():
+    processes = min(4, cpu_count())
+    tiny_items = range(200_000)
+    huge_items = [3_000_000] * (processes * 2)
+
+    # 1. The worker pool is created ONCE and reused for every run below
+    with Pool(processes=processes) as pool, AdaptivePool(processes=processes) as adaptive:
+        print(f"Many tiny tasks ({len(tiny_items)} items, {processes} processes)")
+        # imap default chunksize=1 -> one pipe round trip per item
+        benchmark("imap chunksize=1", lambda: list(pool.imap(tiny_task, tiny_items)))
+        # 2. IPC overhead is amortized as the chunksize grows
+        for chunksize in (16, 256, 4096):
+            benchmark(
+                f"imap chunksize={chunksize}",
+                lambda: list(pool.imap(tiny_task, tiny_items, chunksize=chunksize)),
+            )
+        benchmark("map default chunksize", lambda: pool.map(tiny_task, tiny_items))
+        benchmark("AdaptivePool.imap", lambda: list(adaptive.imap(tiny_task, tiny_items)))
+        print(f"  -> adaptive chunksize settled at {adaptive.chunksize_for(tiny_task)}")
+
+        print(f"\nFew huge tasks ({len(huge_items)} items)")
+        # a big chunk puts several huge tasks on the same worker while others are idle
+        benchmark(
+            "imap chunksize=8",
+            lambda: list(pool.imap(huge_task, huge_items, chunksize=8)),
+        )
+        benchmark("map default chunksize", lambda: pool.map(huge_task, huge_items))
+        benchmark(
+            "AdaptivePool.imap_unordered",
+            lambda: list(adaptive.imap_unordered(huge_task, huge_items)),
+        )
+        print(f"  -> adaptive chunksize settled at {adaptive.chunksize_for(huge_task)}")
+
+
+if __name__ == "__main__":
+    main()
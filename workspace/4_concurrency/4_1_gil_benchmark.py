@@ -0,0 +1,261 @@
+# GIL contention benchmark
+# 4_gil.py shows that two threads counting down are not faster than one thread.
+# This module turns that experiment into a repeatable benchmark so we can decide where
+# threads help, where processes help and where neither does.
+#
+# It sweeps:
+#   - workers:   1, 2, 4, ... threads and processes (the total work stays the same)
+#   - workloads: pure Python loop (holds the GIL), NumPy (releases the GIL), I/O sleep (releases the GIL)
+#   - sys.setswitchinterval(): how often a thread holding the GIL is asked to drop it
+# and records wall time, CPU time and context switches (resource.getrusage).
+#
+# Free-threaded CPython (3.13t, PEP 703) has no GIL at all. The report says whether the
+# current interpreter is free-threaded and, with --free-threaded, re-runs the same sweep
+# under a free-threaded interpreter found on PATH.
+#
+# Usage:
+#   python 4_1_gil_benchmark.py                      # human readable table
+#   python 4_1_gil_benchmark.py --output report.json # machine readable report
+
+import argparse
+import json
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import sysconfig
+import time
+from multiprocessing import Process
+from threading import Thread
+from typing import Callable, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, its workload is skipped without it
+    np = None
+
+FREE_THREADED_EXECUTABLES = ["python3.14t", "python3.13t"]
+
+
+# --- Workloads ---
+# Every workload takes the number of "units" to process, so the total work can be split
+# evenly between the workers like countdown(count//2) in 4_gil.py.
+
+def countdown(units: int) -> None:
+    """Pure Python bytecode: the thread holds the GIL the whole time."""
+    n = units * 1000
+    while n > 0:
+        n -= 1
+
+
+def numpy_matmul(units: int) -> None:
+    """NumPy drops the GIL while the BLAS routine is running."""
+    matrix = np.ones((120, 120))
+    for _ in range(units // 20):
+        matrix @ matrix
+
+
+def io_sleep(units: int) -> None:
+    """time.sleep() releases the GIL, like waiting on a socket or a disk."""
+    for _ in range(units // 100):
+        time.sleep(0.001)
+
+
+WORKLOADS: Dict[str, Callable[[int], None]] = {
+    "python_loop": countdown,
+    "numpy_release_gil": numpy_matmul,
+    "io_sleep": io_sleep,
+}
+
+
+# --- Interpreter detection ---
+
+def is_free_threaded_build() -> bool:
+    """True if the interpreter was compiled with --disable-gil."""
+    return bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+
+
+def is_gil_enabled() -> bool:
+    """A free-threaded build can still turn the GIL back on (PYTHON_GIL=1)."""
+    check = getattr(sys, "_is_gil_enabled", None)
+    return True if check is None else check()
+
+
+def find_free_threaded_python() -> Optional[str]:
+    for name in FREE_THREADED_EXECUTABLES:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def interpreter_info() -> dict:
+    return {
+        "implementation": platform.python_implementation(),
+        "version": platform.python_version(),
+        "executable": sys.executable,
+        "free_threaded_build": is_free_threaded_build(),
+        "gil_enabled": is_gil_enabled(),
+        "numpy": np.__version__ if np is not None else None,
+    }
+
+
+# --- Measurement ---
+
+def run_case(mode: str, workload: str, workers: int, total_units: int) -> dict:
+    """
+    Runs the workload split across `workers` threads or processes and returns one result row.
+
+    Threads are measured with RUSAGE_SELF; processes with RUSAGE_CHILDREN, which only
+    includes children once they have been joined.
+    """
+    func = WORKLOADS[workload]
+    units = total_units // workers
+
+    if mode == "thread":
+        who = resource.RUSAGE_SELF
+        runners = [Thread(target=func, args=(units,)) for _ in range(workers)]
+    else:
+        who = resource.RUSAGE_CHILDREN
+        runners = [Process(target=func, args=(units,)) for _ in range(workers)]
+
+    before = resource.getrusage(who)
+    start = time.perf_counter()
+    for runner in runners:
+        runner.start()
+    for runner in runners:
+        runner.join()
+    wall = time.perf_counter() - start
+    after = resource.getrusage(who)
+
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return {
+        "mode": mode,
+        "workload": workload,
+        "workers": workers,
+        "switch_interval": sys.getswitchinterval(),
+        "wall_seconds": round(wall, 6),
+        "cpu_seconds": round(cpu, 6),
+        # cpu/wall > 1 means more than one core was busy at the same time
+        "parallelism": round(cpu / wall, 3) if wall else 0.0,
+        "voluntary_ctx_switches": after.ru_nvcsw - before.ru_nvcsw,
+        "involuntary_ctx_switches": after.ru_nivcsw - before.ru_nivcsw,
+    }
+
+
+def run_sweep(
+    worker_counts: List[int],
+    switch_intervals: List[float],
+    total_units: int,
+) -> List[dict]:
+    workloads = [name for name in WORKLOADS if name != "numpy_release_gil" or np is not None]
+    default_interval = sys.getswitchinterval()
+    results = []
+
+    try:
+        for workload in workloads:
+            for workers in worker_counts:
+                results.append(run_case("process", workload, workers, total_units))
+                # the switch interval only matters for threads competing for the GIL
+                for interval in switch_intervals:
+                    sys.setswitchinterval(interval)
+                    results.append(run_case("thread", workload, workers, total_units))
+                sys.setswitchinterval(default_interval)
+    finally:
+        sys.setswitchinterval(default_interval)
+
+    return results
+
+
+def run_free_threaded(executable: str, argv: List[str]) -> Optional[dict]:
+    """Re-runs this script under another interpreter and returns its JSON report."""
+    completed = subprocess.run(
+        [executable, __file__, "--json", *argv],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        print(f"Free-threaded run failed: {completed.stderr.strip()}", file=sys.stderr)
+        return None
+    return json.loads(completed.stdout)
+
+
+# --- Report ---
+
+def build_report(args: argparse.Namespace) -> dict:
+    return {
+        "interpreter": interpreter_info(),
+        "total_units": args.units,
+        "results": run_sweep(args.workers, args.switch_intervals, args.units),
+    }
+
+
+def print_table(report: dict) -> None:
+    info = report["interpreter"]
+    print(
+        f"{info['implementation']} {info['version']} "
+        f"(free-threaded build: {info['free_threaded_build']}, GIL enabled: {info['gil_enabled']})"
+    )
+    header = (
+        f"{'workload':<18} {'mode':<8} {'workers':>7} "
+        f"{'switch':>8} {'wall':>8} {'cpu':>8} "
+        f"{'par':>5} {'vcsw':>6} {'ivcsw':>6}"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in report["results"]:
+        print(
+            f"{row['workload']:<18} {row['mode']:<8} {row['workers']:>7} "
+            f"{row['switch_interval']:>8.4f} {row['wall_seconds']:>8.3f} {row['cpu_seconds']:>8.3f} "
+            f"{row['parallelism']:>5.2f} {row['voluntary_ctx_switches']:>6} {row['involuntary_ctx_switches']:>6}"
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="GIL contention benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--switch-intervals", type=float, nargs="+", default=[0.0005, 0.005, 0.05])
+    parser.add_argument("--units", type=int, default=2000, help="total work shared by the workers")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="print the JSON report to stdout")
+    parser.add_argument(
+        "--free-threaded",
+        action="store_true",
+        help="also run the sweep under a free-threaded interpreter found on PATH",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = build_report(args)
+
+    if args.free_threaded and not is_free_threaded_build():
+        executable = find_free_threaded_python()
+        if executable is None:
+            report["free_threaded"] = None
+            print("No free-threaded interpreter found on PATH", file=sys.stderr)
+        else:
+            sweep_args = [
+                "--workers", *map(str, args.workers),
+                "--switch-intervals", *map(str, args.switch_intervals),
+                "--units", str(args.units),
+            ]
+            report["free_threaded"] = run_free_threaded(executable, sweep_args)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_table(report)
+        if report.get("free_threaded"):
+            print()
+            print_table(report["free_threaded"])
+
+
+if __name__ == "__main__":
+    main()
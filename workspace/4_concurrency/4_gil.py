@@ -1,4 +1,5 @@
 # GIL: a mechanism used in CPython to ensure that only one thread executes Python bytecode at a time.
+# See 4_1_gil_benchmark.py for a full sweep over threads, processes and workload types.
 
 # reference counting works
 import sys
@@ -0,0 +1,111 @@
+"""
+Latency of a 1000-user list response through FastAPI, with and without the
+fast JSON path.
+
+"models + response_model": the old get_users: UserResponse(**user) per row in a
+                           UsersListResponse, validated again by response_model
+"dicts + response_model":  the stored dicts, validated once by response_model
+"fast_json (orjson)":      @fast_json_response, no validation, orjson encoder
+"fast_json (json)":        @fast_json_response with the json.JSONEncoder fallback
+
+Requests go through httpx's ASGI transport one at a time, so the numbers are
+the per-request cost of routing, validation and serialization.
+
+Run from the day03 directory:
+    python benchmarks/json_response_benchmark.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# the shared fast_json module (7_framework/shared)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "shared"))
+import fast_json  # noqa: E402
+from enums.user_enum import UserStatus  # noqa: E402
+from fast_json import fast_json_response  # noqa: E402
+from models.user import UserResponse, UsersListResponse  # noqa: E402
+
+ROWS = 1000
+REQUESTS = 300
+
+
+def make_users():
+    start = datetime(2024, 1, 1)
+    return [{
+        "id": i,
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "full_name": f"User Number {i}",
+        "age": 20 + i % 50,
+        "status": UserStatus.ACTIVE if i % 3 else UserStatus.INACTIVE,
+        "is_active": True,
+        "created_at": start + timedelta(minutes=i),
+        "updated_at": start,
+    } for i in range(1, ROWS + 1)]
+
+
+def build_app(users) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/models", response_model=UsersListResponse)
+    def with_models():
+        return UsersListResponse(users=[UserResponse(**user) for user in users], total=len(users), skip=0, limit=ROWS)
+
+    @app.get("/dicts", response_model=UsersListResponse)
+    def with_dicts():
+        return {"users": users, "total": len(users), "skip": 0, "limit": ROWS}
+
+    @app.get("/fast", response_model=UsersListResponse)
+    @fast_json_response(UsersListResponse)
+    def fast():
+        return {"users": users, "total": len(users), "skip": 0, "limit": ROWS}
+
+    return app
+
+
+async def measure(app: FastAPI, path: str) -> tuple:
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        body = (await client.get(path)).json()
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+    return body, statistics.median(latencies), len(response.content)
+
+
+async def main() -> None:
+    users = make_users()
+    app = build_app(users)
+    print(f"{ROWS} users per response, median of {REQUESTS} requests")
+    expected = None
+    orjson = fast_json.orjson
+    for label, path, encoder in (
+        ("models + response_model", "/models", orjson),
+        ("dicts + response_model", "/dicts", orjson),
+        ("fast_json (orjson)", "/fast", orjson),
+        ("fast_json (json)", "/fast", None),
+    ):
+        if path == "/fast" and encoder is None and orjson is None:
+            continue
+        if path == "/fast" and encoder is not None and orjson is None:
+            label = "fast_json (json, orjson not installed)"
+        fast_json.orjson = encoder
+        body, median, size = await measure(app, path)
+        fast_json.orjson = orjson
+        expected = expected or body
+        assert body == expected, label
+        print(f"  {label:<26} {median:7.2f} ms   {size} bytes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+GET /users latency with filters and sorting at 1e5 and 1e6 users.
+
+"scan":    the old get_users body: list comprehensions for each filter,
+           lowercasing every full_name for search, then a full sort and a slice
+"indexed": get_users on the IndexedRepository: status/age bitmaps, the n-gram
+           search index and a walk of the sort index, with the total counted
+           from the combined bitmap
+
+Both sides produce the JSON body of the response, and their bodies are
+compared before timing. Building the million-user repository takes a while.
+
+Run from the day03 directory:
+    python benchmarks/users_query_benchmark.py
+"""
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# the shared indexed_repository package (7_framework/shared)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "shared"))
+import main  # noqa: E402
+from enums.user_enum import SortOrder, UserStatus  # noqa: E402
+from models.user import UserResponse, UsersListResponse  # noqa: E402
+
+SIZES = (100_000, 1_000_000)
+REPEAT = 5
+FIRST_NAMES = ["Jay", "Jane", "Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi",
+               "Ivan", "Judy", "Mallory", "Niaj", "Olivia", "Peggy", "Rupert", "Sybil", "Trent", "Walter"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore"]
+STATUSES = [UserStatus.ACTIVE] * 8 + [UserStatus.INACTIVE] + [UserStatus.SUSPENDED]
+
+QUERIES = {
+    "no filter, sort by age": dict(sort_by="age"),
+    "status=active, sort by full_name": dict(status=UserStatus.ACTIVE, sort_by="full_name"),
+    "age 20-30, sort by created_at desc": dict(min_age=20, max_age=30, sort_by="created_at",
+                                               sort_order=SortOrder.DESC),
+    "search=garcia": dict(search="garcia"),
+    "search=garcia, suspended, age 40+": dict(search="garcia", status=UserStatus.SUSPENDED, min_age=40),
+}
+
+
+def make_users(count):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    return [{
+        "id": i,
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "age": rng.randrange(13, 90),
+        "status": rng.choice(STATUSES),
+        "is_active": True,
+        "created_at": start + timedelta(seconds=rng.randrange(10**8)),
+        "updated_at": start,
+    } for i in range(1, count + 1)]
+
+
+def scan_users(users, skip=0, limit=10, status=None, min_age=None, max_age=None, search=None,
+               sort_by="id", sort_order=SortOrder.ASC):
+    """The get_users body before the repository (sorting a copy rather than the shared list)."""
+    filtered_users = users
+    if status:
+        filtered_users = [user for user in filtered_users if user["status"] == status]
+    if min_age is not None:
+        filtered_users = [user for user in filtered_users if user["age"] >= min_age]
+    if max_age is not None:
+        filtered_users = [user for user in filtered_users if user["age"] <= max_age]
+    if search:
+        filtered_users = [user for user in filtered_users if search.lower() in user["full_name"].lower()]
+    filtered_users = sorted(filtered_users, key=lambda x: (x[sort_by], x["id"]),
+                            reverse=sort_order == SortOrder.DESC)
+    return UsersListResponse(
+        users=[UserResponse(**user) for user in filtered_users[skip:skip + limit]],
+        total=len(filtered_users), skip=skip, limit=limit
+    ).model_dump_json().encode()
+
+
+def indexed_users(skip=0, limit=10, status=None, min_age=None, max_age=None, search=None,
+                  sort_by="id", sort_order=SortOrder.ASC):
+    response = main.get_users(skip=skip, limit=limit, status=status, min_age=min_age, max_age=max_age,
+                              include_age=False, search=search, sort_by=sort_by, sort_order=sort_order, cursor=None)
+    return response.body
+
+
+def best_of(func) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main_benchmark() -> None:
+    for size in SIZES:
+        users = make_users(size)
+        start = time.perf_counter()
+        main.users_db.clear()
+        main.users_db.extend(users)
+        print(f"--- {size} users (repository built in {time.perf_counter() - start:.1f} s) ---")
+        for label, params in QUERIES.items():
+            scanned = json.loads(scan_users(users, **params))
+            indexed = json.loads(indexed_users(**params))
+            # the scan breaks ties by id in the same direction as the sort, like the index
+            assert indexed["total"] == scanned["total"], label
+            assert indexed["users"] == scanned["users"], label
+            scan_ms = best_of(lambda: scan_users(users, **params))
+            indexed_ms = best_of(lambda: indexed_users(**params))
+            print(f"  {label:<38} scan {scan_ms:8.2f} ms   indexed {indexed_ms:7.2f} ms"
+                  f"   ({indexed['total']} matches)")
+
+
+if __name__ == "__main__":
+    main_benchmark()
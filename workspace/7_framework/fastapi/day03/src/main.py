@@ -1,14 +1,25 @@
 from fastapi import FastAPI, Path, Query, HTTPException
 from models.user import UserCreate, UserResponse, UserUpdate, UsersListResponse
 from enums.user_enum import UserStatus, SortOrder
+from fast_json import fast_json_response
+from indexed_repository.pagination import decode_cursor, keyset_page
+from indexed_repository import IndexedRepository
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from functools import reduce
+from itertools import islice
+from operator import and_
+from typing import Dict, Any, Optional
 
 app = FastAPI(title="User Management API", version="1.0.0")
 
-# In-memory database - a simple list to store our user records.
+# In-memory database - user records by id, with a sorted index for each sort_by field,
+# bitmaps for the status and age filters and lowercased names for search.
 # In a real app, this would be a database like PostgreSQL or MongoDB.
-users_db: List[Dict[str, Any]] = [
+users_db = IndexedRepository(key="id", indexes={
+    "full_name": lambda name: name or "",  # users without a name sort first
+    "age": None,
+    "created_at": None
+}, facets=("status", "age"), search=("full_name",), records=[
     {
         "id": 1,
         "username": "code.conductor",
@@ -53,15 +64,12 @@ users_db: List[Dict[str, Any]] = [
         "created_at": datetime.now(),
         "updated_at": datetime.now()
     },
-]
+])
 next_id = 5
 
 def _find_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """Helper function to find a user in the 'database' by their ID."""
-    for user in users_db:
-        if user["id"] == user_id:
-            return user
-    return None
+    return users_db.get(user_id)
 
 @app.post("/users", response_model=UserResponse, status_code=201)
 def create_user(user: UserCreate):
@@ -76,12 +84,13 @@ def create_user(user: UserCreate):
     new_user_data["is_active"] = True
     new_user_data["status"] = user.status
 
-    users_db.append(new_user_data)
+    users_db.insert(new_user_data)
     next_id += 1
 
     return new_user_data
 
 @app.get("/users", response_model=UsersListResponse)
+@fast_json_response(UsersListResponse)
 def get_users(
     skip: int = Query(0, ge=0, description="Number of users to skip"),
     limit: int = Query(10, ge=1, le=100, description="Number of users to return"),
@@ -91,35 +100,42 @@ def get_users(
     include_age: bool = Query(False, description="Include age in response"),
     search: Optional[str] = Query(None, min_length=1, max_length=50, description="Search in user names"),
     sort_by: str = Query("id", pattern="^(id|full_name|age|created_at)$"),
-    sort_order: SortOrder = Query(SortOrder.ASC)
+    sort_order: SortOrder = Query(SortOrder.ASC),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
     """Returns a list of all users in the database."""
-    filtered_users = users_db
-
+    # Each filter is a bitmap of the matching users, combined with & instead of a scan
+    bitmaps = []
     if status:
-        filtered_users = [user for user in filtered_users if user["status"] == status]
-    if min_age is not None:
-        filtered_users = [user for user in filtered_users if user["age"] >= min_age]
-    if max_age is not None:
-        filtered_users = [user for user in filtered_users if user["age"] <= max_age]
+        bitmaps.append(users_db.facet("status", status))
+    if min_age is not None or max_age is not None:
+        bitmaps.append(users_db.facet_range("age", min_age, max_age))
     if search:
-        filtered_users = [user for user in filtered_users if search.lower() in user["full_name"].lower()]
+        bitmaps.append(users_db.search(search))
+    matching = reduce(and_, bitmaps) if bitmaps else None
 
     reverse_order = sort_order == SortOrder.DESC
-    filtered_users.sort(key=lambda x: x[sort_by], reverse=reverse_order)
+    try:
+        after = decode_cursor(cursor, sort_by, reverse_order) if cursor else None
+        # Walk the sort index from the cursor (or the start): no copy and no sort per request
+        ordered_users = users_db.seek(sort_by, after, reverse=reverse_order, within=matching)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
 
-    total = len(filtered_users)
-    users = filtered_users[skip:skip + limit]
+    users, next_cursor = keyset_page(islice(ordered_users, skip, None), limit, sort_by, reverse_order)
+    total = matching.bit_count() if matching is not None else len(users_db)
 
     if include_age:
         users = [user | {"age": user["age"]} for user in users]
 
-    return UsersListResponse(
-        users=[UserResponse(**user) for user in users],
-        total=total,
-        skip=skip,
-        limit=limit
-    )
+    # Stored users are already valid: send them without building UserResponse models
+    return {
+        "users": users,
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "next_cursor": next_cursor
+    }
 
 @app.get("/users/{user_id}", response_model=UserResponse)
 def get_user(
@@ -145,8 +161,5 @@ def update_user(user_id: int, user_update: UserUpdate):
     # actually sent, allowing for partial updates.
     update_data = user_update.model_dump(exclude_unset=True)
 
-    # Update the user's data field by field.
-    for field, value in update_data.items():
-        user[field] = value
-
-    return user
+    # Update the user's data field by field (and the sort indexes with it).
+    return users_db.update(user_id, update_data)
@@ -34,3 +34,4 @@ class UsersListResponse(BaseModel):
     total: int
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
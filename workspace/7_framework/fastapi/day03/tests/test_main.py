@@ -3,6 +3,8 @@ from fastapi.testclient import TestClient
 from datetime import datetime
 from src.main import app, users_db
 from src.enums.user_enum import UserStatus
+from src.models.user import UserResponse
+from indexed_repository.pagination import encode_cursor
 
 # Create a test client for the FastAPI app
 client = TestClient(app)
@@ -148,6 +150,21 @@ def test_get_users_with_search():
     assert len(data["users"]) == 2
     assert all("Smith" in user["full_name"] for user in data["users"])
 
+def test_get_users_sends_only_the_response_model_fields():
+    data = client.get("/users?limit=1").json()
+    assert set(data) == {"users", "total", "skip", "limit", "next_cursor"}
+    assert set(data["users"][0]) == set(UserResponse.model_fields)
+    assert data["users"][0]["status"] == "active"
+    assert datetime.fromisoformat(data["users"][0]["created_at"]) == users_db.get(1)["created_at"]
+
+def test_get_users_combined_filters_follow_updates():
+    data = client.get("/users?search=SMITH&min_age=10&max_age=20&sort_by=full_name").json()
+    assert [user["id"] for user in data["users"]] == [2]
+    assert data["total"] == 1
+    client.put("/users/2", json={"full_name": "Jane Doe"})
+    assert client.get("/users?search=smith&min_age=10&max_age=20").json()["total"] == 0
+    assert client.get("/users?search=jane doe&status=inactive").json()["total"] == 1
+
 def test_get_users_with_sort():
     response = client.get("/users?sort_by=age&sort_order=desc")
     assert response.status_code == 200
@@ -157,6 +174,42 @@ def test_get_users_with_sort():
     assert data["users"][0]["age"] == 35
     assert data["users"][1]["age"] == 28
 
+def test_get_users_cursor_pages_cover_all_users():
+    seen = []
+    url = "/users?sort_by=age&sort_order=desc&limit=3"
+    response = client.get(url)
+    data = response.json()
+    seen += [user["age"] for user in data["users"]]
+    assert data["next_cursor"] is not None
+
+    data = client.get(f"{url}&cursor={data['next_cursor']}").json()
+    seen += [user["age"] for user in data["users"]]
+    assert data["next_cursor"] is None
+    assert seen == [35, 28, 25, 12]
+
+def test_get_users_cursor_is_stable_across_inserts():
+    first = client.get("/users?limit=2").json()
+    users_db.insert(users_db.get(1) | {"id": 0, "username": "early.bird"})
+    second = client.get(f"/users?limit=2&cursor={first['next_cursor']}").json()
+    assert [user["id"] for user in second["users"]] == [3, 4]
+
+def test_get_users_cursor_with_filter():
+    first = client.get("/users?status=active&limit=1").json()
+    second = client.get(f"/users?status=active&limit=1&cursor={first['next_cursor']}").json()
+    assert [first["users"][0]["id"], second["users"][0]["id"]] == [1, 3]
+    assert second["next_cursor"] is None
+
+def test_get_users_cursor_rejects_other_sort_or_garbage():
+    cursor = client.get("/users?sort_by=age&limit=1").json()["next_cursor"]
+    assert client.get(f"/users?sort_by=full_name&cursor={cursor}").status_code == 400
+    assert client.get("/users?cursor=not-a-cursor").status_code == 400
+    tampered = encode_cursor("age", False, "old", 1)
+    assert client.get(f"/users?sort_by=age&cursor={tampered}").status_code == 400
+
+def test_get_users_sort_does_not_reorder_the_database():
+    client.get("/users?sort_by=age&sort_order=desc")
+    assert [user["id"] for user in client.get("/users").json()["users"]] == [1, 2, 3, 4]
+
 def test_get_users_with_include_age():
     response = client.get("/users?include_age=true")
     assert response.status_code == 200
@@ -3,7 +3,8 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from exceptions import DuplicateItemError, InsufficientStockError, ItemNotFoundError, UnauthorizedError, ForbiddenError
 from models.stock import Item, Order, OrderStatus
-from typing import List, Dict, Any
+from indexed_repository import IndexedRepository
+from typing import Any, Dict, List
 from datetime import datetime
 import logging
 
@@ -14,9 +15,9 @@ logger = logging.getLogger(__name__)
 app = FastAPI(title="FastAPI E-Commerce API", version="1.0.0", description="An API for managing an e-commerce platform", docs_url="/api/docs")
 
 # Mock db
-# In-memory database - a simple list to store our required records.
-items_db: List[Dict[str, Any]] = []
-orders_db: List[Dict[str, Any]] = []
+# In-memory database - records keyed by id, with an index on SKU for the duplicate check.
+items_db = IndexedRepository(key="id", indexes=("sku",))
+orders_db: Dict[int, Dict[str, Any]] = {}
 next_item_id = 1
 next_order_id = 1
 
@@ -123,14 +124,12 @@ async def create_item(item: Item):
     global next_item_id
 
     # Check for duplicate SKU
-    existing_item = next((i for i in items_db if i["sku"] == item.sku), None)
-
-    if existing_item:
+    if items_db.find("sku", item.sku):
         raise DuplicateItemError("sku", item.sku)
 
     item_dict = item.model_dump()
     item_dict["id"] = next_item_id
-    items_db.append(item_dict)
+    items_db.insert(item_dict)
     next_item_id += 1
 
     logger.info(f"Created item with id {item_dict['id']}")
@@ -138,7 +137,7 @@ async def create_item(item: Item):
 
 @app.get("/items/{item_id}", response_model=Item, summary="Get an item by ID", tags=["Items"])
 async def get_item(item_id: int):
-    item = next((i for i in items_db if i["id"] == item_id), None)
+    item = items_db.get(item_id)
 
     if not item:
         raise ItemNotFoundError(item_id)
@@ -149,35 +148,27 @@ async def get_item(item_id: int):
 @app.get("/items/", response_model=List[Item], summary="Get all items", tags=["Items"])
 async def get_items():
     logger.info("Retrieved all items")
-    return items_db
+    return items_db.all()
 
 @app.put("/items/{item_id}", response_model=Item, summary="Update an item by ID", tags=["Items"])
 async def update_item(item_id: int, item_update: Item):
-    item_index = next((i for i, item in enumerate(items_db) if item["id"] == item_id), None)
-
-    if item_index is None:
+    if item_id not in items_db:
         raise ItemNotFoundError(item_id)
 
     # Check for duplicate SKU (excluding current item)
-    existing_item = next((i for i in items_db if i["sku"] == item_update.sku and i["id"] != item_id), None)
-    if existing_item:
+    if any(i["id"] != item_id for i in items_db.find("sku", item_update.sku)):
         raise DuplicateItemError("sku", item_update.sku)
 
-    item_dict = item_update.model_dump()
-    item_dict["id"] = item_id
-    items_db[item_index] = item_dict
+    item_dict = items_db.replace(item_id, item_update.model_dump())
 
     logger.info(f"Updated item with id {item_id}")
     return item_dict
 
 @app.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete an item by ID", tags=["Items"])
 async def delete_item(item_id: int):
-    item_index = next((i for i, item in enumerate(items_db) if item["id"] == item_id), None)
-
-    if item_index is None:
+    if not items_db.delete(item_id):
         raise ItemNotFoundError(item_id)
 
-    del items_db[item_index]
     logger.info(f"Deleted item with id {item_id}")
 
 # Order endpoints
@@ -188,7 +179,7 @@ async def create_order(order: Order):
     # Validate item exists and sufficient stock
     total_amount = 0.0
     for order_item in order.items:
-        item = next((item for item in items_db if item["id"] == order_item.item_id), None)
+        item = items_db.get(order_item.item_id)
 
         if not item:
             raise ItemNotFoundError(order_item.item_id)
@@ -200,8 +191,8 @@ async def create_order(order: Order):
 
     # Update stock
     for order_item in order.items:
-        item = next(item for item in items_db if item["id"] == order_item.item_id)
-        item["stock"] -= order_item.quantity
+        item = items_db.get(order_item.item_id)
+        items_db.update(order_item.item_id, {"stock": item["stock"] - order_item.quantity})
 
     order_dict = order.model_dump()
     order_dict.update({
@@ -211,7 +202,7 @@ async def create_order(order: Order):
         "created_at": datetime.now(),
         "status": OrderStatus.pending
     })
-    orders_db.append(order_dict)
+    orders_db[order_dict["id"]] = order_dict
     next_order_id += 1
 
     logger.info(f"Created order with id {order_dict['id']}")
@@ -219,7 +210,7 @@ async def create_order(order: Order):
 
 @app.get("/orders/{order_id}", response_model=Order)
 def get_order(order_id: int):
-    order = next((order for order in orders_db if order["id"] == order_id), None)
+    order = orders_db.get(order_id)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -229,7 +220,7 @@ def get_order(order_id: int):
 
 @app.patch("/orders/{order_id}/status", response_model=Order)
 def update_order_status(order_id: int, new_status: OrderStatus):
-    order = next((order for order in orders_db if order["id"] == order_id), None)
+    order = orders_db.get(order_id)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -173,7 +173,7 @@ def test_create_order(client):
     assert response.json()["status"] == "pending"
     assert response.json()["total_amount"] == 54.95
     assert len(orders_db) == 1
-    assert items_db[0]["stock"] == 95  # Stock reduced by 5
+    assert items_db.get(resp.json()["id"])["stock"] == 95  # Stock reduced by 5
 
 def test_create_order_insufficient_stock(client):
     resp = client.post("/items/", json={
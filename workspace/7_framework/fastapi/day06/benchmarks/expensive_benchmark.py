@@ -0,0 +1,91 @@
+"""
+/expensive throughput with and without the dependency cache, and the cost of
+checking a bearer token with and without the decoded-token cache.
+
+"uncached": the old route: expensive_operation sleeps 100 ms on every request
+"cached":   GET /expensive from main.app: @cached_dependency(ttl=30), so the
+            first wave of concurrent requests waits for a single computation
+            and the rest are served from the cache
+
+Requests are authenticated and go through httpx's ASGI transport, CONCURRENCY
+at a time, so sync dependencies run in FastAPI's threadpool as in production.
+
+Run from the day06 directory:
+    python benchmarks/expensive_benchmark.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# the shared indexed_repository package (7_framework/shared)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "shared"))
+import main  # noqa: E402
+from dependencies import User, create_access_token, decode_token, get_current_user  # noqa: E402
+
+REQUESTS = 1000
+CONCURRENCY = 40
+DECODES = 20_000
+
+
+def uncached_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/expensive")
+    def get_expensive_data(
+        result=Depends(main.expensive_operation.__wrapped__),
+        current_user: User = Depends(get_current_user)
+    ):
+        return {"user": current_user.username, "expensive_data": result}
+
+    return app
+
+
+async def throughput(app: FastAPI, headers: dict) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        pending = iter(range(REQUESTS))
+
+        async def worker():
+            for _ in pending:
+                response = await client.get("/expensive")
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        return REQUESTS / (time.perf_counter() - start)
+
+
+def per_call_us(func, token: str) -> float:
+    start = time.perf_counter()
+    for _ in range(DECODES):
+        func(token)
+    return (time.perf_counter() - start) / DECODES * 1e6
+
+
+async def run() -> None:
+    token = create_access_token({"sub": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+    print(f"GET /expensive, {REQUESTS} requests, {CONCURRENCY} concurrent")
+    for label, app in (("uncached", uncached_app()), ("cached", main.app)):
+        main.expensive_operation.cache.clear()
+        rate = await throughput(app, headers)
+        print(f"  {label:<9} {rate:9.0f} requests/s")
+    print(f"  expensive_operation cache: {main.expensive_operation.cache.stats()}")
+
+    print(f"decoding one bearer token, {DECODES} times")
+    print(f"  jwt.decode   {per_call_us(decode_token.__wrapped__, token):6.2f} us")
+    print(f"  cached       {per_call_us(decode_token, token):6.2f} us")
+
+
+if __name__ == "__main__":
+    # verify_token prints every decoded token
+    with contextlib.redirect_stdout(io.StringIO()) as quiet:
+        asyncio.run(run())
+    print("\n".join(line for line in quiet.getvalue().splitlines() if not line.startswith("Token decoded")))
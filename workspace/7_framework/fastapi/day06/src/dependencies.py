@@ -23,6 +23,8 @@ from typing import Optional, List
 import jwt
 from datetime import datetime, timedelta
 import hashlib
+import time
+from dependency_cache import cached_dependency
 
 # Security
 security = HTTPBearer()
@@ -49,6 +51,7 @@ users_db = {
 
 SECRET_KEY = "python-secret-key" # In real application, this should be a secret key stored securely
 ALGORITHM = "HS256"
+TOKEN_CACHE_TTL = 60 # seconds a decoded token is reused; expiry is still checked on every request
 
 class User:
     def __init__(self, id: int, username: str, email: str, roles: List[str], is_active: bool):
@@ -85,9 +88,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Each token is decoded and its signature checked once per TOKEN_CACHE_TTL, not on every request
+@cached_dependency(ttl=TOKEN_CACHE_TTL, maxsize=10_000)
+def decode_token(token: str) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(credentials.credentials)
+        # A cached payload can outlive its token, so check the expiry here as jwt.decode does
+        if payload.get("exp") is not None and payload["exp"] <= time.time():
+            raise jwt.ExpiredSignatureError("Signature has expired")
         username: str = payload.get("sub")
         print(f"Token decoded: username={username}, payload={payload}")  # Debug output
         if username is None:
@@ -107,7 +118,9 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
 
 """
 In this get_current_user, verify_token is the dependency that verifies the token and returns the username.
+The user is looked up once per request, but never cached across requests: deactivating a user takes effect at once.
 """
+@cached_dependency()
 def get_current_user(username: str = Depends(verify_token)) -> User:
     user_data = users_db.get(username)
     if user_data is None:
@@ -142,10 +155,12 @@ class PaginationParams:
     def __init__(
         self,
         skip: int = Query(0, ge=0, description="Number of records to skip"),
-        limit: int = Query(10, ge=1, le=100, description="Number of records to return")
+        limit: int = Query(10, ge=1, le=100, description="Number of records to return"),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
     ):
         self.skip = skip
         self.limit = limit
+        self.cursor = cursor
 
 # Sorting dependency
 class SortingParams:
@@ -0,0 +1,234 @@
+"""
+Result caching for expensive dependencies
+
+    @cached_dependency(ttl=30)
+    def expensive_operation(): ...
+
+    # the key leaves out the connection, which is neither hashable nor relevant
+    @cached_dependency(ttl=5, key=lambda item_id, db: item_id)
+    def load_item(item_id: int, db: DatabaseConnection = Depends(get_database)): ...
+
+Per request:
+    - A cached dependency runs once per key within a request, however many
+      dependencies or sub-dependencies ask for it. The results live in the
+      request scope and go away with it.
+
+Across requests (ttl > 0):
+    - Results are shared until they are `ttl` seconds old, in an LRU bounded
+      by `maxsize` entries.
+    - Concurrent misses on one key wait for a single computation instead of
+      all running it (a stampede lock per key: a threading.Lock for sync
+      dependencies, which FastAPI runs in its threadpool, an asyncio.Lock for
+      async ones).
+
+The key is computed from the dependency's arguments: by default the tuple of
+(name, value) pairs, or whatever `key(**arguments)` returns. Exceptions are
+never cached, and dependencies that yield a resource cannot be cached at all.
+
+Every cache counts its hits and misses; dependency_cache_stats() returns them
+by dependency name.
+"""
+import asyncio
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi import Request
+
+_MISSING = object()
+# Added to the wrapper's signature so FastAPI passes the request for the per-request memo
+_REQUEST_PARAM = "dependency_cache_request"
+_SCOPE_KEY = "dependency_cache"
+
+_caches: Dict[str, "DependencyCache"] = {}
+
+
+class DependencyCache:
+    """Results of one dependency by key, with their expiry times and fill locks."""
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0            # served from the cache
+        self.waits = 0           # served from the cache after waiting for another caller's miss
+        self.misses = 0          # computed
+        self.request_hits = 0    # served from the request's own memo
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._guard = threading.Lock()
+        # key -> [lock, number of callers holding or waiting for it]
+        self._thread_locks: Dict[Hashable, list] = {}
+        self._async_locks: Dict[Hashable, list] = {}
+
+    def _lookup(self, key: Hashable, counter: Optional[str]) -> Any:
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            if counter:
+                setattr(self, counter, getattr(self, counter) + 1)
+            return entry[1]
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        with self._guard:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def count(self, counter: str) -> None:
+        with self._guard:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _join(self, locks: Dict[Hashable, list], key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._guard:
+            entry = locks.get(key)
+            if entry is None:
+                entry = locks[key] = [factory(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _leave(self, locks: Dict[Hashable, list], key: Hashable) -> None:
+        # The lock goes away with its last waiter, not with the computation: if that
+        # raised, the next waiter recomputes under the same lock, and callers that
+        # arrive meanwhile queue behind it instead of computing alongside it.
+        with self._guard:
+            entry = locks[key]
+            entry[1] -= 1
+            if not entry[1]:
+                del locks[key]
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        value = self._lookup(key, "hits")
+        if value is not _MISSING:
+            return value
+        lock = self._join(self._thread_locks, key, threading.Lock)
+        try:
+            with lock:
+                value = self._lookup(key, "waits")
+                if value is not _MISSING:
+                    return value
+                self.count("misses")
+                value = compute()
+                self._store(key, value)
+        finally:
+            self._leave(self._thread_locks, key)
+        return value
+
+    async def get_async(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        value = self._lookup(key, "hits")
+        if value is not _MISSING:
+            return value
+        lock = self._join(self._async_locks, key, asyncio.Lock)
+        try:
+            async with lock:
+                value = self._lookup(key, "waits")
+                if value is not _MISSING:
+                    return value
+                self.count("misses")
+                value = await compute()
+                self._store(key, value)
+        finally:
+            self._leave(self._async_locks, key)
+        return value
+
+    def clear(self) -> None:
+        with self._guard:
+            self._entries.clear()
+            self.hits = self.waits = self.misses = self.request_hits = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._guard:
+            return {
+                "hits": self.hits,
+                "waits": self.waits,
+                "misses": self.misses,
+                "request_hits": self.request_hits,
+                "size": len(self._entries),
+                "ttl": self.ttl,
+            }
+
+
+def _default_key(**arguments) -> tuple:
+    key = tuple(arguments.items())
+    try:
+        hash(key)
+    except TypeError:
+        raise TypeError("dependency arguments are not hashable; pass key= to cached_dependency") from None
+    return key
+
+
+def cached_dependency(ttl: float = 0, key: Optional[Callable[..., Hashable]] = None, maxsize: int = 1024):
+    """Memoize a dependency per request, and across requests for `ttl` seconds if ttl > 0."""
+    make_key = key or _default_key
+
+    def decorator(func):
+        if inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func):
+            raise TypeError(f"{func.__qualname__} yields a resource; only returned values can be cached")
+        signature = inspect.signature(func)
+        cache = DependencyCache(f"{func.__module__}.{func.__qualname__}", ttl, maxsize)
+        _caches[cache.name] = cache
+
+        def lookup(args, kwargs):
+            request = kwargs.pop(_REQUEST_PARAM, None)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            cache_key = make_key(**bound.arguments)
+            # Called directly rather than by FastAPI: no request, no memo
+            memo = request.scope.setdefault(_SCOPE_KEY, {}) if request is not None else None
+            return (cache, cache_key), memo
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                memo_key, memo = lookup(args, kwargs)
+                if memo is not None and memo_key in memo:
+                    cache.count("request_hits")
+                    return memo[memo_key]
+                if ttl > 0:
+                    value = await cache.get_async(memo_key[1], lambda: func(*args, **kwargs))
+                else:
+                    cache.count("misses")
+                    value = await func(*args, **kwargs)
+                if memo is not None:
+                    memo[memo_key] = value
+                return value
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                memo_key, memo = lookup(args, kwargs)
+                if memo is not None and memo_key in memo:
+                    cache.count("request_hits")
+                    return memo[memo_key]
+                if ttl > 0:
+                    value = cache.get(memo_key[1], lambda: func(*args, **kwargs))
+                else:
+                    cache.count("misses")
+                    value = func(*args, **kwargs)
+                if memo is not None:
+                    memo[memo_key] = value
+                return value
+
+        parameters = list(signature.parameters.values())
+        hidden = inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+        # keyword-only parameters go before **kwargs
+        at = len(parameters)
+        if parameters and parameters[-1].kind is inspect.Parameter.VAR_KEYWORD:
+            at -= 1
+        wrapper.__signature__ = signature.replace(parameters=parameters[:at] + [hidden] + parameters[at:])
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def dependency_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit and miss counts of every cached dependency, by name."""
+    return {name: cache.stats() for name, cache in _caches.items()}
@@ -4,17 +4,24 @@ from dependencies import (
     SortingParams, check_rate_limit, get_item_id, CommonQueryParams,
     create_access_token, users_db, User, DatabaseConnection
 )
-from datetime import timedelta
+from dependency_cache import cached_dependency, dependency_cache_stats
+from indexed_repository.pagination import decode_cursor, keyset_page
+from indexed_repository import IndexedRepository
+from datetime import datetime, timedelta
+from itertools import islice
 import hashlib
+import time
 
 app = FastAPI(title="Dependency Injection Demo", version="1.0.0")
 
-# Mock data
-items_db = [
+# Mock data: items by id, with a sorted index for each sortable field,
+# a bitmap of the active items and lowercased names for the q search
+SORTABLE_FIELDS = ("id", "name", "price")
+items_db = IndexedRepository(key="id", indexes=("name", "price"), facets=("is_active",), search=("name",), records=[
     {"id": 1, "name": "Item 1", "price": 10.0, "is_active": True, "owner_id": 1},
     {"id": 2, "name": "Item 2", "price": 20.0, "is_active": False, "owner_id": 2},
     {"id": 3, "name": "Item 3", "price": 15.0, "is_active": True, "owner_id": 1},
-]
+])
 
 # Authentication endpoints
 @app.post("/token")
@@ -58,32 +65,35 @@ def get_items(
     db: DatabaseConnection = Depends(get_database),
     client_ip: str = Depends(check_rate_limit)
 ):
-    # Filter items
-    filtered_items = items_db
-
+    # Filter items: bitmaps of the active items and the search matches
+    matching = None
     if not commons.include_inactive:
-        filtered_items = [item for item in filtered_items if item["is_active"]]
-
+        matching = items_db.facet("is_active", True)
     if commons.q:
-        filtered_items = [
-            item for item in filtered_items
-            if commons.q.lower() in item["name"].lower()
-        ]
-
-    # Sort items
-    reverse_order = sorting.sort_order == "desc"
-    if sorting.sort_by in ["id", "name", "price"]:
-        filtered_items.sort(key=lambda x: x[sorting.sort_by], reverse=reverse_order)
-
-    # Apply pagination
-    total = len(filtered_items)
-    items = filtered_items[pagination.skip:pagination.skip + pagination.limit]
+        found = items_db.search(commons.q)
+        matching = found if matching is None else matching & found
+
+    # Sort items (unknown fields fall back to id order)
+    sort_by = sorting.sort_by if sorting.sort_by in SORTABLE_FIELDS else "id"
+    reverse_order = sort_by == sorting.sort_by and sorting.sort_order == "desc"
+    try:
+        after = decode_cursor(pagination.cursor, sort_by, reverse_order) if pagination.cursor else None
+        # Walk the sort index from the cursor (or the start) and stop once the page is full
+        ordered_items = items_db.seek(sort_by, after, reverse=reverse_order, within=matching)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {e}")
+
+    items, next_cursor = keyset_page(
+        islice(ordered_items, pagination.skip, None), pagination.limit, sort_by, reverse_order
+    )
+    total = matching.bit_count() if matching is not None else len(items_db)
 
     return {
         "items": items,
         "total": total,
         "skip": pagination.skip,
         "limit": pagination.limit,
+        "next_cursor": next_cursor,
         "requested_by": current_user.username,
         "client_ip": client_ip,
         "db_connection": db.connection_id
@@ -95,7 +105,7 @@ def get_item(
     current_user: User = Depends(get_current_user),
     db: DatabaseConnection = Depends(get_database)
 ):
-    item = next((item for item in items_db if item["id"] == item_id), None)
+    item = items_db.get(item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
@@ -112,13 +122,13 @@ def create_item(
     db: DatabaseConnection = Depends(get_database)
 ):
     new_item = {
-        "id": len(items_db) + 1,
+        "id": items_db.next_id(),
         "name": item_data["name"],
         "price": item_data["price"],
         "is_active": True,
         "owner_id": current_user.id
     }
-    items_db.append(new_item)
+    items_db.insert(new_item)
 
     return {
         "item": new_item,
@@ -132,12 +142,10 @@ def delete_item(
     current_user: User = Depends(get_current_user),
     db: DatabaseConnection = Depends(get_database)
 ):
-    item_index = next((i for i, item in enumerate(items_db) if item["id"] == item_id), None)
-    if item_index is None:
+    item = items_db.get(item_id)
+    if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    item = items_db[item_index]
-
     # Check ownership or admin rights
     if item["owner_id"] != current_user.id and "admin" not in current_user.roles:
         raise HTTPException(
@@ -145,7 +153,7 @@ def delete_item(
             detail="Not enough permissions"
         )
 
-    del items_db[item_index]
+    items_db.delete(item_id)
     return {"message": "Item deleted successfully", "deleted_by": current_user.username}
 
 # Admin-only endpoints
@@ -162,21 +170,22 @@ def activate_item(
     admin_user: User = Depends(get_admin_user),
     db: DatabaseConnection = Depends(get_database)
 ):
-    item = next((item for item in items_db if item["id"] == item_id), None)
+    item = items_db.get(item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    item["is_active"] = True
+    items_db.update(item_id, {"is_active": True})
     return {
         "message": "Item activated",
         "item": item,
         "activated_by": admin_user.username
     }
 
-# Cached dependency example
+# Cached dependency example: computed at most once every 30 seconds,
+# by one request while concurrent requests wait for its result
+@cached_dependency(ttl=30)
 def expensive_operation():
     # Simulate expensive operation
-    import time
     time.sleep(0.1)  # Simulate delay
     return {"computed_value": "expensive_result", "timestamp": str(datetime.now())}
 
@@ -189,3 +198,10 @@ def get_expensive_data(
         "user": current_user.username,
         "expensive_data": result
     }
+
+@app.get("/admin/dependency-cache")
+def get_dependency_cache_stats(admin_user: User = Depends(get_admin_user)):
+    return {
+        "caches": dependency_cache_stats(),
+        "accessed_by": admin_user.username
+    }
@@ -0,0 +1,203 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+
+from src import dependency_cache
+from src.dependency_cache import cached_dependency, dependency_cache_stats
+from src.dependencies import create_access_token, decode_token, verify_token
+
+
+def test_ttl_caches_across_calls_until_expiry(monkeypatch):
+    calls = []
+
+    @cached_dependency(ttl=10)
+    def load(item_id: int):
+        calls.append(item_id)
+        return {"id": item_id}
+
+    assert load(1) is load(1)
+    assert load(item_id=2) == {"id": 2}
+    assert calls == [1, 2]
+
+    now = time.monotonic()
+    monkeypatch.setattr(dependency_cache.time, "monotonic", lambda: now + 11)
+    load(1)
+    assert calls == [1, 2, 1]
+    stats = load.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 3, 2)
+    assert dependency_cache_stats()[load.cache.name] == stats
+
+
+def test_lru_bound_custom_key_and_errors():
+    calls = []
+
+    @cached_dependency(ttl=10, key=lambda item_id, db: item_id, maxsize=2)
+    def load(item_id: int, db: dict):
+        calls.append(item_id)
+        if item_id < 0:
+            raise HTTPException(status_code=404)
+        return item_id
+
+    for item_id in (1, 2, 1, 3, 2):
+        load(item_id, {"unhashable": True})
+    assert calls == [1, 2, 3, 2]
+    assert load.cache.stats()["size"] == 2
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            load(-1, {})
+    assert calls[-2:] == [-1, -1]
+
+    @cached_dependency(ttl=10)
+    def by_dict(filters: dict):
+        return filters
+
+    with pytest.raises(TypeError, match="key="):
+        by_dict({})
+
+    with pytest.raises(TypeError, match="yields"):
+        @cached_dependency()
+        def connection():
+            yield object()
+
+
+def test_concurrent_misses_compute_once():
+    calls = []
+    start = threading.Barrier(8)
+
+    @cached_dependency(ttl=10)
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    def worker(results):
+        start.wait()
+        results.append(slow())
+
+    results = []
+    threads = [threading.Thread(target=worker, args=(results,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+    stats = slow.cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] + stats["waits"] == 7
+
+
+def test_failed_miss_is_retried_by_one_waiter_at_a_time():
+    calls = []
+    active = []
+    overlaps = []
+    started = threading.Event()
+    release = threading.Event()
+
+    @cached_dependency(ttl=10)
+    def flaky():
+        calls.append(1)
+        active.append(1)
+        overlaps.append(len(active))
+        try:
+            if len(calls) == 1:
+                started.set()
+                release.wait()
+                raise ValueError("first computation failed")
+            time.sleep(0.05)
+            return "value"
+        finally:
+            active.pop()
+
+    results = []
+    errors = []
+
+    def worker():
+        try:
+            results.append(flaky())
+        except ValueError as e:
+            errors.append(e)
+
+    first = threading.Thread(target=worker)
+    first.start()
+    started.wait()
+    waiters = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    first.join()
+    # arrive while a waiter is recomputing after the failure
+    late = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in late:
+        thread.start()
+    for thread in waiters + late:
+        thread.join()
+
+    assert len(errors) == 1
+    assert results == ["value"] * 6
+    assert len(calls) == 2
+    assert max(overlaps) == 1
+    assert flaky.cache._thread_locks == {}
+
+
+def test_concurrent_async_misses_compute_once():
+    calls = []
+
+    @cached_dependency(ttl=10)
+    async def slow(name: str):
+        calls.append(name)
+        await asyncio.sleep(0.01)
+        return name.upper()
+
+    async def run():
+        return await asyncio.gather(*(slow("a") for _ in range(5)), slow("b"))
+
+    assert asyncio.run(run()) == ["A"] * 5 + ["B"]
+    assert calls == ["a", "b"]
+    assert slow.cache.stats()["waits"] == 4
+
+
+def test_request_memo_and_hidden_parameter():
+    calls = []
+
+    @cached_dependency()
+    def lookup(q: str = "x"):
+        calls.append(q)
+        return q
+
+    app = FastAPI()
+
+    @app.get("/both")
+    def both(first=Depends(lookup, use_cache=False), second=Depends(lookup, use_cache=False)):
+        return [first, second]
+
+    client = TestClient(app)
+    assert client.get("/both?q=y").json() == ["y", "y"]
+    assert client.get("/both?q=y").json() == ["y", "y"]
+    assert calls == ["y", "y"]
+    assert lookup.cache.stats()["request_hits"] == 2
+
+    params = app.openapi()["paths"]["/both"]["get"]["parameters"]
+    assert [param["name"] for param in params] == ["q"]
+
+
+def test_cached_token_is_still_checked_for_expiry(monkeypatch):
+    token = create_access_token({"sub": "admin"}, expires_delta=timedelta(minutes=1))
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    assert verify_token(credentials) == "admin"
+    assert verify_token(credentials) == "admin"
+    assert decode_token.cache.stats()["hits"] >= 1
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 3600)
+    with pytest.raises(HTTPException) as exc:
+        verify_token(credentials)
+    assert exc.value.status_code == 401
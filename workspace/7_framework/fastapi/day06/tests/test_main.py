@@ -16,11 +16,12 @@ def client():
 @pytest.fixture(autouse=True)
 def reset_db():
     # Reset items_db to its original state
-    items_db[:] = [
+    items_db.clear()
+    items_db.extend([
         {"id": 1, "name": "Item 1", "price": 10.0, "is_active": True, "owner_id": 1},
         {"id": 2, "name": "Item 2", "price": 20.0, "is_active": False, "owner_id": 2},
         {"id": 3, "name": "Item 3", "price": 15.0, "is_active": True, "owner_id": 1},
-    ]
+    ])
     # Reset and repopulate users_db
     users_db.clear()
     users_db["testuser"] = {
@@ -77,6 +78,36 @@ def test_get_all_items(client):
     assert "items" in response.json()
     assert len(response.json()["items"]) == 3
 
+def test_get_items_search_and_active_filter(client):
+    """Test that q search (case-insensitive) combines with the active filter."""
+    headers = get_auth_header(client)
+    response = client.get("/items/?q=ITEM 2", headers=headers).json()
+    assert response["items"] == [] and response["total"] == 0
+    response = client.get("/items/?q=ITEM 2&include_inactive=true", headers=headers).json()
+    assert [item["id"] for item in response["items"]] == [2]
+    assert response["total"] == 1
+    client.post("/admin/items/2/activate", headers=get_auth_header(client, "adminuser", "adminpassword"))
+    assert client.get("/items/?q=item", headers=headers).json()["total"] == 3
+
+def test_get_items_cursor_pages(client):
+    """Test walking the items by price with next_cursor."""
+    headers = get_auth_header(client)
+    first = client.get("/items/?include_inactive=true&sort_by=price&limit=2", headers=headers).json()
+    assert [item["price"] for item in first["items"]] == [10.0, 15.0]
+    assert first["next_cursor"] is not None
+    second = client.get(
+        f"/items/?include_inactive=true&sort_by=price&limit=2&cursor={first['next_cursor']}", headers=headers
+    ).json()
+    assert [item["price"] for item in second["items"]] == [20.0]
+    assert second["next_cursor"] is None
+
+def test_get_items_invalid_cursor(client):
+    """Test that a cursor for another sort order is rejected."""
+    headers = get_auth_header(client)
+    cursor = client.get("/items/?sort_by=price&limit=1", headers=headers).json()["next_cursor"]
+    response = client.get(f"/items/?sort_by=name&cursor={cursor}", headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 def test_get_single_item(client):
     """Test fetching a single item by its ID."""
     headers = get_auth_header(client)
@@ -126,7 +157,22 @@ def test_admin_can_activate_item(client):
     """Test that an admin can activate an inactive item."""
     admin_headers = get_auth_header(client, "adminuser", "adminpassword")
     # Item with ID 2 is initially inactive
-    assert items_db[1]["is_active"] is False
+    assert items_db.get(2)["is_active"] is False
     response = client.post("/admin/items/2/activate", headers=admin_headers)
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["item"]["is_active"] is True
+
+def test_expensive_data_is_cached_across_requests(client):
+    """Test that the expensive dependency runs once and its counts are reported to admins."""
+    from src.main import expensive_operation
+    expensive_operation.cache.clear()
+    headers = get_auth_header(client)
+    first = client.get("/expensive", headers=headers).json()
+    second = client.get("/expensive", headers=headers).json()
+    assert first["expensive_data"] == second["expensive_data"]
+
+    assert client.get("/admin/dependency-cache", headers=headers).status_code == status.HTTP_403_FORBIDDEN
+    admin_headers = get_auth_header(client, "adminuser", "adminpassword")
+    caches = client.get("/admin/dependency-cache", headers=admin_headers).json()["caches"]
+    stats = caches[expensive_operation.cache.name]
+    assert (stats["hits"], stats["misses"]) == (1, 1)
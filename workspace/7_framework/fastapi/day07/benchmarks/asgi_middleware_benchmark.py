@@ -0,0 +1,114 @@
+"""
+Throughput and latency of the main.py middleware stack in three forms.
+
+"BaseHTTPMiddleware": the six custom layers from middleware.py
+"pure ASGI":          the same six layers from asgi_middleware.py
+"fused pipeline":     MiddlewarePipeline, one layer doing all six steps
+
+All three also run GZip, CORS and TrustedHost (already pure ASGI in Starlette)
+and log through a BatchedLogSink, so only the custom middleware differs.
+
+Run from the day07 directory:
+    python benchmarks/asgi_middleware_benchmark.py
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.middleware.trustedhost import TrustedHostMiddleware
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# the shared log_sink module (7_framework/shared)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "shared"))
+import asgi_middleware  # noqa: E402
+import middleware  # noqa: E402
+from log_sink import BatchedLogSink  # noqa: E402
+
+REQUESTS = 3000
+CONCURRENCY = 50
+
+
+def build_app(stack: str, sink: BatchedLogSink) -> FastAPI:
+    app = FastAPI()
+    rate_limit = middleware.RateLimitConfig(calls=10 ** 9, period=60)
+
+    if stack == "base":
+        app.add_middleware(middleware.ErrorHandlingMiddleware)
+        app.add_middleware(middleware.CorrelationIDMiddleware)
+        app.add_middleware(middleware.RequestLoggingMiddleware, sink=sink)
+        app.add_middleware(middleware.SecurityHeadersMiddleware)
+        app.add_middleware(middleware.RateLimitingMiddleware, config=rate_limit)
+        app.add_middleware(middleware.RequestSizeMiddleware)
+    elif stack == "asgi":
+        app.add_middleware(asgi_middleware.ErrorHandlingASGIMiddleware)
+        app.add_middleware(asgi_middleware.CorrelationIDASGIMiddleware)
+        app.add_middleware(asgi_middleware.RequestLoggingASGIMiddleware, sink=sink)
+        app.add_middleware(asgi_middleware.SecurityHeadersASGIMiddleware)
+        app.add_middleware(asgi_middleware.RateLimitingASGIMiddleware, config=rate_limit)
+        app.add_middleware(asgi_middleware.RequestSizeASGIMiddleware)
+    else:
+        app.add_middleware(asgi_middleware.MiddlewarePipeline, sink=sink, rate_limit=rate_limit)
+
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+    app.add_middleware(CORSMiddleware, allow_origins=middleware.get_cors_origins(), allow_credentials=True)
+    app.add_middleware(TrustedHostMiddleware, allowed_hosts=["bench"])
+
+    @app.get("/")
+    async def root():
+        return {"status": "ok"}
+
+    return app
+
+
+async def measure(app: FastAPI, concurrency: int) -> tuple:
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one() -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get("/")
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200
+
+        # warm up, then measure
+        await asyncio.gather(*(one() for _ in range(100)))
+        latencies.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def report(label: str, latencies: list, elapsed: float) -> None:
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<22} {REQUESTS / elapsed:8.0f} req/s   p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        sink = BatchedLogSink(os.path.join(directory, "access.log")).start()
+        for concurrency in (1, CONCURRENCY):
+            print(f"--- {REQUESTS} requests, concurrency {concurrency} ---")
+            for label, stack in [("BaseHTTPMiddleware", "base"), ("pure ASGI", "asgi"), ("fused pipeline", "pipeline")]:
+                latencies, elapsed = asyncio.run(measure(build_app(stack, sink), concurrency))
+                report(label, latencies, elapsed)
+        sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Bytes on the wire and CPU cost of response compression on /large-data.
+
+Calls the /large-data endpoint from main.py (size=5000, about 100 KB of JSON)
+through ResponseCompressionMiddleware with each encoding, and through Starlette's
+GZipMiddleware (compresslevel 9) for reference. A second run serves the same
+payload with an ETag, where the compressed bytes come from the cache.
+
+The benchmark keeps the CPU busy, so with the default cpu_threshold the
+middleware sends most responses uncompressed ("skipped" column); the
+"CPU check off" rows show the cost of always compressing.
+
+Run from the day07 directory:
+    python benchmarks/compression_benchmark.py
+(pip install brotli to include "br")
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault("RATE_LIMIT_CALLS", str(10 ** 9))
+os.environ.setdefault("ENVIRONMENT", "production")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.middleware.gzip import GZipMiddleware  # noqa: E402
+from fastapi.responses import JSONResponse, Response  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# the shared indexed_repository package (7_framework/shared)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "shared"))
+import main  # noqa: E402
+from compression import PREFERRED_ENCODINGS, ResponseCompressionMiddleware  # noqa: E402
+
+REQUESTS = 300
+SIZE = 5000
+
+
+def build_app(compression: str) -> tuple:
+    app = FastAPI()
+    if compression == "starlette":
+        app.add_middleware(GZipMiddleware, minimum_size=1000)
+        middleware = None
+    else:
+        # a threshold above 1.0 turns the CPU check off
+        cpu_threshold = 2.0 if compression == "always" else 0.9
+        middleware = ResponseCompressionMiddleware(None, minimum_size=1000, cpu_threshold=cpu_threshold)
+
+    app.get("/large-data")(main.get_large_data)
+
+    static_body = JSONResponse(main.get_large_data(Request({"type": "http", "state": {}}), size=SIZE)).body
+
+    @app.get("/large-data-static")
+    async def large_data_static():
+        return Response(static_body, media_type="application/json", headers={"ETag": '"large-data-v1"'})
+
+    if middleware is not None:
+        # wrap the app directly so the stats stay reachable
+        middleware.app = app
+        return middleware, middleware
+    return app, None
+
+
+async def measure(app, path: str, accept_encoding: str) -> tuple:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+        wire_bytes = 0
+        body_bytes = 0
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            response = await client.get(path, params={"size": SIZE}, headers={"accept-encoding": accept_encoding})
+            wire_bytes += response.num_bytes_downloaded
+            body_bytes += len(response.content)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+    return wire_bytes / REQUESTS, body_bytes / REQUESTS, cpu / REQUESTS * 1000, REQUESTS / elapsed
+
+
+def main_benchmark() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    scenarios = [("identity", "identity", "ours")]
+    scenarios += [(encoding, encoding, "ours") for encoding in PREFERRED_ENCODINGS]
+    scenarios += [(f"{encoding}, CPU check off", encoding, "always") for encoding in PREFERRED_ENCODINGS]
+    scenarios += [("gzip (Starlette GZip)", "gzip", "starlette")]
+
+    for path in ("/large-data", "/large-data-static"):
+        print(f"--- {path} (size={SIZE}), {REQUESTS} requests ---")
+        for label, accept_encoding, compression in scenarios:
+            app, middleware = build_app(compression)
+            wire, body, cpu_ms, rps = asyncio.run(measure(app, path, accept_encoding))
+            skipped = f"{middleware.stats['skipped_cpu']:4d}" if middleware else "   -"
+            print(f"{label:<24} {wire:9.0f} B on wire ({wire / body:6.1%})   "
+                  f"CPU {cpu_ms:6.2f} ms/request   {rps:7.0f} req/s   skipped {skipped}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,86 @@
+"""
+Request latency with the batched log sink on and off.
+
+"off": RequestLoggingMiddleware logs through a logging.FileHandler, so every request
+       runs json.dumps and two synchronous file writes on the event loop.
+"on":  the middleware only appends two dicts to the sink's queue; a background
+       thread serializes and writes them in batches.
+
+Run from the day07 directory:
+    python benchmarks/log_sink_benchmark.py
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# the shared log_sink module (7_framework/shared)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "shared"))
+import middleware  # noqa: E402
+from log_sink import BatchedLogSink  # noqa: E402
+
+REQUESTS = 3000
+
+
+def build_app(sink=None) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(middleware.RequestLoggingMiddleware, sink=sink)
+
+    @app.get("/")
+    async def root():
+        return {"status": "ok"}
+
+    return app
+
+
+async def measure(app: FastAPI) -> list:
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            await client.get("/")
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list, elapsed: float) -> None:
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<12} {REQUESTS / elapsed:8.0f} req/s   p50 {p50:6.3f} ms   p99 {p99:6.3f} ms")
+
+
+def main() -> None:
+    # the middleware module turns on INFO logging; keep the client quiet
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # sink off: the module logger writes straight to a file
+        handler = logging.FileHandler(os.path.join(directory, "logger.log"))
+        middleware.logger.addHandler(handler)
+        middleware.logger.propagate = False
+        start = time.perf_counter()
+        latencies = asyncio.run(measure(build_app()))
+        report("sink off", latencies, time.perf_counter() - start)
+        middleware.logger.removeHandler(handler)
+        handler.close()
+
+        # sink on
+        sink = BatchedLogSink(os.path.join(directory, "sink.log")).start()
+        start = time.perf_counter()
+        latencies = asyncio.run(measure(build_app(sink)))
+        report("sink on", latencies, time.perf_counter() - start)
+        sink.close()
+        print(f"sink stats: {sink.stats()}")
+
+
+if __name__ == "__main__":
+    main()
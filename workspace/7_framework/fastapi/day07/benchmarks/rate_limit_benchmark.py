@@ -0,0 +1,79 @@
+"""
+Per-request cost of the rate limiting algorithms.
+
+Drives the limiter's check directly (no HTTP) with many clients that each stay
+just under their limit, so every request is allowed and the per-client state
+is as large as it gets:
+
+"sliding_log":    the original algorithm, a list of timestamps per client plus an
+                  inline cleanup sweep over all clients every cleanup_interval
+"token_bucket":   O(1) per request, in-process MemoryStore
+"sliding_window": O(1) per request, in-process MemoryStore
+"... (sqlite)":   the same algorithms with state in a SQLite file shared by workers;
+                  each check is a transaction in a worker thread
+
+Run from the day07 directory:
+    python benchmarks/rate_limit_benchmark.py
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from asgi_middleware import RateLimitingASGIMiddleware  # noqa: E402
+from middleware import RateLimitConfig  # noqa: E402
+from rate_limit import SQLiteStore  # noqa: E402
+
+CLIENTS = 2000
+CALLS = 100
+PERIOD = 60
+
+
+async def run(label: str, config: RateLimitConfig, store=None, requests_per_client: int = CALLS - 1) -> None:
+    limiter = RateLimitingASGIMiddleware(None, config, store)
+    scopes = [{"type": "http", "path": "/", "client": (f"10.0.{i // 256}.{i % 256}", 5000)} for i in range(CLIENTS)]
+    headers = {}
+    latencies = []
+    rejected = 0
+
+    start = time.perf_counter()
+    for _ in range(requests_per_client):
+        for scope in scopes:
+            t0 = time.perf_counter()
+            if await limiter.check(scope, headers) is not None:
+                rejected += 1
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    mean_us = sum(latencies) / len(latencies) * 1e6
+    p99_us = latencies[int(len(latencies) * 0.99)] * 1e6
+    max_ms = latencies[-1] * 1000
+    print(f"{label:<26} {len(latencies) / elapsed:9.0f} checks/s   mean {mean_us:7.2f} us   "
+          f"p99 {p99_us:7.2f} us   max {max_ms:7.2f} ms   rejected {rejected}")
+    if limiter.limiter is not None:
+        await limiter.limiter.close()
+
+
+async def main() -> None:
+    logging.getLogger("middleware").setLevel(logging.ERROR)
+    print(f"{CLIENTS} clients x {CALLS - 1} requests, limit {CALLS} per {PERIOD}s")
+
+    # a short cleanup interval so the inline sweep happens during the run
+    await run("sliding_log", RateLimitConfig(calls=CALLS, period=PERIOD, cleanup_interval=1))
+    for algorithm in ("token_bucket", "sliding_window"):
+        await run(algorithm, RateLimitConfig(calls=CALLS, period=PERIOD, cleanup_interval=1, algorithm=algorithm))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for algorithm in ("token_bucket", "sliding_window"):
+            store = SQLiteStore(os.path.join(directory, f"{algorithm}.db"))
+            # fewer requests: every check is a SQLite transaction
+            await run(f"{algorithm} (sqlite)", RateLimitConfig(calls=CALLS, period=PERIOD, algorithm=algorithm),
+                store, requests_per_client=10)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
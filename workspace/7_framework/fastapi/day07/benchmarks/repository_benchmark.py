@@ -0,0 +1,120 @@
+"""
+CRUD and filter latency of a list of dicts vs IndexedRepository at 1e6 rows.
+
+"list":       the old ItemDatabase pattern: next(...) scan for get, a second
+              scan in list.remove for delete, list comprehensions for filters
+"repository": dict primary index, sorted price index, keyset pages
+
+Operations use random ids spread over the whole table, so the list scans are
+measured at their average depth. Building a million-row repository takes a few
+seconds; the list side runs fewer operations since each costs milliseconds.
+
+Run from the day07 directory:
+    python benchmarks/repository_benchmark.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# the shared indexed_repository package (7_framework/shared)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "shared"))
+from indexed_repository import IndexedRepository  # noqa: E402
+
+ROWS = 1_000_000
+LIST_OPS = 20
+REPO_OPS = 20_000
+
+
+def make_rows():
+    rng = random.Random(42)
+    return [{"id": i, "name": f"Item {i}", "price": round(rng.uniform(1, 1000), 2),
+             "created_at": 1_700_000_000 + i} for i in range(1, ROWS + 1)]
+
+
+def timed(label: str, func, ops: int) -> None:
+    start = time.perf_counter()
+    for _ in range(ops):
+        func()
+    elapsed = time.perf_counter() - start
+    per_op = elapsed / ops
+    unit, scale = ("ms", 1e3) if per_op >= 1e-3 else ("us", 1e6)
+    print(f"  {label:<34} {per_op * scale:9.2f} {unit}/op")
+
+
+def bench_list(rows) -> None:
+    items = list(rows)
+    rng = random.Random(1)
+    print("list")
+
+    def get():
+        item_id = rng.randrange(1, ROWS + 1)
+        next((item for item in items if item["id"] == item_id), None)
+
+    def update():
+        item_id = rng.randrange(1, ROWS + 1)
+        item = next((item for item in items if item["id"] == item_id), None)
+        item.update({"price": 1.0})
+
+    def delete_insert():
+        item_id = rng.randrange(1, ROWS + 1)
+        item = next((item for item in items if item["id"] == item_id), None)
+        items.remove(item)
+        items.append(item)
+
+    def price_filter():
+        low = rng.uniform(1, 990)
+        [item for item in items if low <= item["price"] <= low + 10][:20]
+
+    def deep_page():
+        items[900_000:900_020]
+
+    timed("get by id", get, LIST_OPS)
+    timed("update", update, LIST_OPS)
+    timed("delete + insert", delete_insert, LIST_OPS)
+    timed("price range (1%), first 20", price_filter, LIST_OPS)
+    timed("page at offset 900k", deep_page, LIST_OPS)
+
+
+def bench_repository(rows) -> None:
+    start = time.perf_counter()
+    repo = IndexedRepository(indexes=("price", "created_at"), records=rows)
+    print(f"repository (built in {time.perf_counter() - start:.1f} s)")
+    rng = random.Random(1)
+
+    def get():
+        repo.get(rng.randrange(1, ROWS + 1))
+
+    def update():
+        repo.update(rng.randrange(1, ROWS + 1), {"price": round(rng.uniform(1, 1000), 2)})
+
+    def delete_insert():
+        item = repo.get(rng.randrange(1, ROWS + 1))
+        if item is not None:
+            repo.delete(item["id"])
+            repo.insert(item)
+
+    def price_filter():
+        low = rng.uniform(1, 990)
+        repo.select("price", low, low + 10, limit=20)
+
+    def deep_page():
+        repo.page(after=900_000, limit=20)
+
+    timed("get by id", get, REPO_OPS)
+    timed("update (reindex price)", update, REPO_OPS)
+    timed("delete + insert", delete_insert, REPO_OPS)
+    timed("price range (1%), first 20", price_filter, REPO_OPS)
+    timed("keyset page after id 900k", deep_page, REPO_OPS)
+
+
+def main() -> None:
+    print(f"{ROWS} rows")
+    rows = make_rows()
+    bench_list(rows)
+    bench_repository(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""
+Pure ASGI versions of the middleware in middleware.py.
+
+BaseHTTPMiddleware wraps every layer in a Request object, runs call_next in a
+separate task and streams the response body through a memory channel. With six
+custom layers that is six tasks and six body copies per request. These classes
+work on the ASGI `scope` and wrap `send` instead:
+
+- header names and the static security headers are encoded to bytes once, at
+  startup, and appended to the raw header list of `http.response.start`
+- request headers are read from `scope["headers"]` without building a Request
+- values that endpoints read from `request.state` are stored in `scope["state"]`,
+  which is where Starlette keeps request.state
+
+MiddlewarePipeline runs all of them in one pass: one header lookup table, one
+wrapped `send`, no nesting.
+"""
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
+import time
+import logging
+import uuid
+import json
+
+from log_sink import BatchedLogSink
+from middleware import RateLimitConfig, ClientRateData, create_limiter, rate_limit_response
+from rate_limit import RateLimiter, RateLimitStore
+
+logger = logging.getLogger(__name__)
+
+HeaderList = List[Tuple[bytes, bytes]]
+
+REQUEST_ID_HEADER = b"x-request-id"
+PROCESS_TIME_HEADER = b"x-process-time"
+DEFAULT_SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    "Permissions-Policy": "geolocation=(), camera=(), microphone=()"
+}
+
+
+def encode_headers(headers: Dict[str, str]) -> HeaderList:
+    """Encode header names (lowercased) and values to the byte pairs ASGI expects."""
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+
+def header_map(scope: Scope) -> Dict[bytes, bytes]:
+    """Request headers as a dict; for repeated headers the first one wins, like Request.headers.get."""
+    headers: Dict[bytes, bytes] = {}
+    for name, value in scope["headers"]:
+        headers.setdefault(name, value)
+    return headers
+
+
+def client_ip(scope: Scope, headers: Dict[bytes, bytes], trust_real_ip: bool = True) -> str:
+    """Extract client IP considering proxy headers."""
+    forwarded_for = headers.get(b"x-forwarded-for")
+    if forwarded_for:
+        return forwarded_for.decode("latin-1").split(",")[0].strip()
+    if trust_real_ip:
+        real_ip = headers.get(b"x-real-ip")
+        if real_ip:
+            return real_ip.decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def set_headers(message: Message, pairs: HeaderList) -> None:
+    """Replace (not duplicate) the given headers on an http.response.start message."""
+    names = {name for name, _ in pairs}
+    headers = [header for header in message.get("headers", []) if header[0] not in names]
+    headers.extend(pairs)
+    message["headers"] = headers
+
+
+def _state(scope: Scope) -> Dict:
+    return scope.setdefault("state", {})
+
+
+class RequestLoggingASGIMiddleware:
+    """Logs each request and adds X-Request-ID / X-Process-Time, like RequestLoggingMiddleware."""
+
+    def __init__(
+        self,
+        app: Optional[ASGIApp],
+        log_body: bool = False,
+        max_body_size: int = 1000,
+        sink: Optional[BatchedLogSink] = None
+    ):
+        self.app = app
+        self.log_body = log_body
+        self.max_body_size = max_body_size
+        self.sink = sink
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id, start_time, receive = await self.start(scope, header_map(scope), receive)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                self.finish(request_id, start_time, message)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            logger.error(f"Request {request_id} failed: {str(e)} (Time: {time.time() - start_time:.4f}s)")
+            raise
+
+    async def start(self, scope: Scope, headers: Dict[bytes, bytes], receive: Receive) -> Tuple[str, float, Receive]:
+        """Assign the request ID and log the incoming request; returns a receive that replays a read body."""
+        request_id = str(uuid.uuid4())
+        _state(scope)["request_id"] = request_id
+        start_time = time.time()
+
+        log_data = {
+            "request_id": request_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "query_params": scope.get("query_string", b"").decode("latin-1"),
+            "client_ip": client_ip(scope, headers),
+            "user_agent": headers.get(b"user-agent", b"unknown").decode("latin-1")
+        }
+
+        if self.log_body and scope["method"] in ("POST", "PUT", "PATCH"):
+            body, receive = await self._read_body(receive)
+            if len(body) <= self.max_body_size:
+                try:
+                    log_data["request_body"] = body.decode("utf-8")[:self.max_body_size]
+                except UnicodeDecodeError:
+                    log_data["request_body"] = "<unable to decode>"
+
+        self._log("Incoming request", log_data)
+        return request_id, start_time, receive
+
+    def finish(self, request_id: str, start_time: float, message: Message) -> None:
+        """Add the tracing headers to the response start message and log it."""
+        process_time = time.time() - start_time
+        set_headers(message, [
+            (REQUEST_ID_HEADER, request_id.encode("latin-1")),
+            (PROCESS_TIME_HEADER, f"{process_time:.4f}".encode("latin-1"))
+        ])
+        self._log("Request completed", {
+            "request_id": request_id,
+            "status_code": message["status"],
+            "process_time": f"{process_time:.4f}s"
+        })
+
+    async def _read_body(self, receive: Receive) -> Tuple[bytes, Receive]:
+        """Read the whole request body and return a receive callable that hands it to the app."""
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return body, replay
+
+    def _log(self, event: str, data: Dict) -> None:
+        """Send a record to the sink if there is one, otherwise to the logger."""
+        if self.sink is not None:
+            self.sink.write({"event": event, "timestamp": time.time(), **data})
+        else:
+            logger.info(f"{event}: {json.dumps(data)}")
+
+
+class SecurityHeadersASGIMiddleware:
+    """Adds security headers, pre-encoded once, to every response."""
+
+    def __init__(self, app: Optional[ASGIApp], custom_headers: Optional[Dict[str, str]] = None):
+        self.app = app
+        self.headers = encode_headers({**DEFAULT_SECURITY_HEADERS, **(custom_headers or {})})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                set_headers(message, self.headers)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class RateLimitingASGIMiddleware:
+    """Per-client sliding log rate limiter, the same algorithm as RateLimitingMiddleware."""
+
+    def __init__(self, app: Optional[ASGIApp], config: Optional[RateLimitConfig] = None,
+                 store: Optional[RateLimitStore] = None, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.config = config or RateLimitConfig()
+        self.clients: Dict[str, ClientRateData] = defaultdict(ClientRateData)
+        self._last_global_cleanup = time.time()
+        # pass a limiter built by the app to close it (and its store) on shutdown
+        self.limiter = limiter or create_limiter(self.config, store)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        response = await self.check(scope, header_map(scope))
+        if response is not None:
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    async def check(self, scope: Scope, headers: Dict[bytes, bytes]) -> Optional[JSONResponse]:
+        """Record the request; returns a 429 response if the client is over its limit."""
+        ip = client_ip(scope, headers, trust_real_ip=False)
+        if self.limiter is not None:
+            decision = await self.limiter.hit(ip)
+            return None if decision.allowed else rate_limit_response(self.config, ip, decision.retry_after)
+
+        current_time = time.time()
+        self._cleanup_if_needed(current_time)
+
+        client_data = self.clients[ip]
+        client_data.requests = [
+            req_time for req_time in client_data.requests
+            if current_time - req_time < self.config.period
+        ]
+
+        if len(client_data.requests) >= self.config.calls:
+            oldest_request = min(client_data.requests)
+            retry_after = int(self.config.period - (current_time - oldest_request))
+            return rate_limit_response(self.config, ip, retry_after)
+
+        client_data.requests.append(current_time)
+        return None
+
+    def _cleanup_if_needed(self, current_time: float) -> None:
+        """Perform global cleanup of old client entries."""
+        if current_time - self._last_global_cleanup > self.config.cleanup_interval:
+            self._last_global_cleanup = current_time
+            clients_to_remove = [
+                ip for ip, client_data in self.clients.items()
+                if not client_data.requests or current_time - max(client_data.requests) > self.config.period * 2
+            ]
+            for ip in clients_to_remove:
+                del self.clients[ip]
+            if clients_to_remove:
+                logger.info(f"Cleaned up {len(clients_to_remove)} inactive rate limit entries")
+
+
+class RequestSizeASGIMiddleware:
+    """Rejects requests whose Content-Length is over the limit."""
+
+    def __init__(self, app: Optional[ASGIApp], max_size: int = 1024 * 1024, exclude_paths: Optional[List[str]] = None):
+        self.app = app
+        self.max_size = max_size
+        self.exclude_paths = set(exclude_paths or [])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        response = self.check(scope, header_map(scope))
+        if response is not None:
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    def check(self, scope: Scope, headers: Dict[bytes, bytes]) -> Optional[JSONResponse]:
+        """Returns a 413 response if the declared body size is over the limit."""
+        if scope["path"] in self.exclude_paths:
+            return None
+        content_length = headers.get(b"content-length")
+        if not content_length:
+            return None
+        size = int(content_length)
+        if size <= self.max_size:
+            return None
+        logger.warning(f"Request size {size} exceeds limit {self.max_size} for {scope['path']}")
+        return JSONResponse(
+            status_code=413,
+            content={
+                "error": "Request too large",
+                "message": f"Maximum request size is {self._format_size(self.max_size)}",
+                "received_size": self._format_size(size)
+            }
+        )
+
+    def _format_size(self, size_bytes: int) -> str:
+        """Format byte size to human readable format."""
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if size_bytes < 1024:
+                return f"{size_bytes:.1f} {unit}"
+            size_bytes = size_bytes // 1024
+        return f"{size_bytes:.1f} TB"
+
+
+class ErrorHandlingASGIMiddleware:
+    """Turns unhandled exceptions into a JSON 500 (if the response has not started yet)."""
+
+    def __init__(self, app: Optional[ASGIApp], include_debug_info: bool = False):
+        self.app = app
+        self.include_debug_info = include_debug_info
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            if response_started:
+                # too late for a 500: the status line has gone out
+                raise
+            await self.error_response(scope, e)(scope, receive, send)
+
+    def error_response(self, scope: Scope, e: Exception) -> JSONResponse:
+        request_id = _state(scope).get("request_id") or str(uuid.uuid4())
+        client = scope.get("client")
+
+        error_data = {
+            "request_id": request_id,
+            "error_type": type(e).__name__,
+            "error_message": str(e),
+            "path": scope["path"],
+            "method": scope["method"],
+            "client_ip": client[0] if client else "unknown"
+        }
+        logger.error(f"Unhandled exception: {json.dumps(error_data)}", exc_info=True)
+
+        response_content = {
+            "error": "Internal Server Error",
+            "message": "An unexpected error occurred",
+            "request_id": request_id
+        }
+        if self.include_debug_info:
+            response_content["debug"] = {
+                "error_type": type(e).__name__,
+                "error_message": str(e)
+            }
+        return JSONResponse(status_code=500, content=response_content)
+
+
+class CorrelationIDASGIMiddleware:
+    """Propagates (or creates) a correlation ID and echoes it on the response."""
+
+    def __init__(self, app: Optional[ASGIApp], header_name: str = "X-Correlation-ID"):
+        self.app = app
+        self.header_name = header_name
+        self.header_key = header_name.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        correlation_id = self.start(scope, header_map(scope))
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                set_headers(message, [(self.header_key, correlation_id)])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def start(self, scope: Scope, headers: Dict[bytes, bytes]) -> bytes:
+        """Store the correlation ID in request.state; returns it encoded for the response."""
+        correlation_id = headers.get(self.header_key) or str(uuid.uuid4()).encode("latin-1")
+        _state(scope)["correlation_id"] = correlation_id.decode("latin-1")
+        return correlation_id
+
+
+class MiddlewarePipeline:
+    """
+    The six custom main.py middleware fused into one ASGI layer.
+
+    Rate limiting and the request size check run first and can reject the request.
+    Every response, including a 429/413 and the JSON 500 from error handling, gets
+    the correlation ID, the request ID / process time and the security headers.
+    Pass None for rate_limit or max_request_size to leave that step out.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        include_debug_info: bool = False,
+        correlation_header: str = "X-Correlation-ID",
+        log_body: bool = False,
+        sink: Optional[BatchedLogSink] = None,
+        security_headers: Optional[Dict[str, str]] = None,
+        rate_limit: Optional[RateLimitConfig] = None,
+        rate_limit_store: Optional[RateLimitStore] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_request_size: Optional[int] = 1024 * 1024,
+        size_exclude_paths: Optional[List[str]] = None
+    ):
+        self.app = app
+        self.errors = ErrorHandlingASGIMiddleware(None, include_debug_info)
+        self.correlation = CorrelationIDASGIMiddleware(None, correlation_header)
+        self.logging = RequestLoggingASGIMiddleware(None, log_body=log_body, sink=sink)
+        self.security = SecurityHeadersASGIMiddleware(None, security_headers)
+        self.rate_limiter = (
+            RateLimitingASGIMiddleware(None, rate_limit, rate_limit_store, rate_limiter)
+            if rate_limit else None
+        )
+        self.size_limit = (
+            RequestSizeASGIMiddleware(None, max_request_size, size_exclude_paths)
+            if max_request_size is not None else None
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = header_map(scope)
+        correlation_id = self.correlation.start(scope, headers)
+        request_id, start_time, receive = await self.logging.start(scope, headers, receive)
+        response_headers = self.security.headers + [(self.correlation.header_key, correlation_id)]
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                self.logging.finish(request_id, start_time, message)
+                set_headers(message, response_headers)
+            await send(message)
+
+        try:
+            # inside the try, so a failing rate limit store also gets the JSON 500
+            rejection = None
+            if self.rate_limiter is not None:
+                rejection = await self.rate_limiter.check(scope, headers)
+            if rejection is None and self.size_limit is not None:
+                rejection = self.size_limit.check(scope, headers)
+            if rejection is not None:
+                await rejection(scope, receive, send_wrapper)
+                return
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            if response_started:
+                raise
+            await self.errors.error_response(scope, e)(scope, receive, send_wrapper)
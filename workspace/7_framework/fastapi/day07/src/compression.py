@@ -0,0 +1,314 @@
+"""
+Streaming response compression (gzip, deflate and, if installed, brotli).
+
+The old ResponseCompressionMiddleware only set `Content-Encoding: gzip` and sent
+the body uncompressed, so clients that trusted the header failed to decode it.
+This version is a pure ASGI middleware that:
+
+- picks the encoding from the Accept-Encoding quality values ("br;q=1, gzip;q=0.8");
+  parsed headers are cached, since clients send the same few strings
+- compresses each body chunk as it is sent (zlib.compressobj / brotli.Compressor),
+  so streaming responses are never buffered whole
+- leaves small bodies (< minimum_size), already-encoded responses, partial content
+  and incompressible content types alone
+- caches the compressed bytes of responses that carry an ETag, so a static payload
+  is compressed once per encoding
+- sends responses uncompressed while the process is using more than
+  `cpu_threshold` of the machine's CPU: bytes on the wire are cheaper than queueing
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Dict, List, Optional, Tuple
+import os
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pip install brotli to enable "br"
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/xml",
+    "text/csv",
+    "text/javascript"
+})
+
+# server preference when the client gives several encodings the same q value
+PREFERRED_ENCODINGS = ("br", "gzip", "deflate") if brotli is not None else ("gzip", "deflate")
+
+
+@lru_cache(maxsize=512)
+def choose_encoding(accept_encoding: str, available: Tuple[str, ...] = PREFERRED_ENCODINGS) -> Optional[str]:
+    """
+    The best encoding in `available` for an Accept-Encoding header, or None for identity.
+
+    Follows RFC 9110: q=0 means "not acceptable", "*" matches every encoding not listed.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class Compressor:
+    """Incremental compressor with one interface for zlib and brotli."""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            # brotli quality runs 0-11; map the zlib-style level onto it
+            self._brotli = brotli.Compressor(quality=min(11, max(0, level - 1)))
+        else:
+            # wbits: 31 = gzip container, 15 = zlib container (what HTTP calls "deflate")
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31 if encoding == "gzip" else 15)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CpuMonitor:
+    """Share of the machine's CPU this process used over the last `interval` seconds."""
+
+    def __init__(self, threshold: float = 0.9, interval: float = 0.5):
+        self.threshold = threshold
+        self.interval = interval
+        self.cpus = os.cpu_count() or 1
+        self.utilization = 0.0
+        self._wall = time.monotonic()
+        self._cpu = time.process_time()
+
+    def busy(self) -> bool:
+        now = time.monotonic()
+        if now - self._wall >= self.interval:
+            cpu = time.process_time()
+            self.utilization = (cpu - self._cpu) / ((now - self._wall) * self.cpus)
+            self._wall, self._cpu = now, cpu
+        return self.utilization > self.threshold
+
+
+# (path, query string, ETag, uncompressed length, encoding)
+CacheKey = Tuple[str, bytes, bytes, int, str]
+
+
+class CompressedCache:
+    """LRU of compressed bodies keyed by resource, ETag and encoding, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        body = self.entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: CacheKey, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self.entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class ResponseCompressionMiddleware:
+    """Compresses response bodies with the best encoding the client accepts."""
+
+    def __init__(
+        self,
+        app: Optional[ASGIApp],
+        minimum_size: int = 1000,
+        compression_level: int = 6,
+        cpu_threshold: float = 0.9,
+        cache_max_bytes: int = 16 * 1024 * 1024
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compression_level = compression_level
+        self.cpu_monitor = CpuMonitor(cpu_threshold)
+        self.cache = CompressedCache(cache_max_bytes)
+        self.stats = {"compressed": 0, "skipped_small": 0, "skipped_cpu": 0, "bytes_in": 0, "bytes_out": 0}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value
+                break
+        encoding = choose_encoding(accept_encoding.decode("latin-1")) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor: Optional[Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                # hold the headers until the first body chunk tells us the size
+                start_message = message
+                if not self._eligible(message):
+                    passthrough = True
+                    await send(message)
+                return
+            if passthrough or message_type != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = start_message["headers"]
+                if not more_body and len(body) < self.minimum_size:
+                    self.stats["skipped_small"] += 1
+                    passthrough = True
+                    start_message["headers"] = _with_vary(headers)
+                    await send(start_message)
+                    await send(message)
+                    return
+                etag = _header(headers, b"etag")
+                # ETags are only unique per resource: key on the URL too, and on the length as a cheap check
+                key = (scope["path"], scope["query_string"], etag, len(body), encoding) if etag else None
+                # a cached body costs nothing to send, busy or not
+                cached = self.cache.get(key) if key and not more_body else None
+                if cached is None and self.cpu_monitor.busy():
+                    self.stats["skipped_cpu"] += 1
+                    passthrough = True
+                    start_message["headers"] = _with_vary(headers)
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                if not more_body:
+                    # the whole body in one message: use the cache and a real Content-Length
+                    compressed = cached if cached is not None else self._compress_whole(body, encoding, key)
+                    self.stats["bytes_in"] += len(body)
+                    self.stats["bytes_out"] += len(compressed)
+                    start_message["headers"] = _encoded_headers(headers, encoding, len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed, "more_body": False})
+                    return
+
+                self.stats["compressed"] += 1
+                compressor = Compressor(encoding, self.compression_level)
+                start_message["headers"] = _encoded_headers(headers, encoding, None)
+                await send(start_message)
+
+            self.stats["bytes_in"] += len(body)
+            chunk = compressor.compress(body) if body else b""
+            if not more_body:
+                chunk += compressor.finish()
+            self.stats["bytes_out"] += len(chunk)
+            # zlib keeps small inputs in its buffer; only send when there is output (or at the end)
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _eligible(self, message: Message) -> bool:
+        """Whether a response can be compressed at all, judged by its status and headers."""
+        if message["status"] in (204, 206, 304):
+            return False
+        headers = message.get("headers", [])
+        if _header(headers, b"content-encoding") is not None:
+            return False
+        content_type = _header(headers, b"content-type")
+        return content_type is not None and self._should_compress(content_type.decode("latin-1"))
+
+    def _compress_whole(self, body: bytes, encoding: str, key: Optional[CacheKey]) -> bytes:
+        compressor = Compressor(encoding, self.compression_level)
+        compressed = compressor.compress(body) + compressor.finish()
+        self.stats["compressed"] += 1
+        if key:
+            self.cache.put(key, compressed)
+        return compressed
+
+    def _should_compress(self, content_type: str) -> bool:
+        """Determine if content type should be compressed (one set lookup on the media type)."""
+        return content_type.partition(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key == name:
+            return value
+    return None
+
+
+def _with_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Add Accept-Encoding to Vary: the response depends on it even when sent uncompressed."""
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return list(headers) + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return headers
+    return [(k, v) for k, v in headers if k != b"vary"] + [(b"vary", vary + b", Accept-Encoding")]
+
+
+def _encoded_headers(headers: List[Tuple[bytes, bytes]], encoding: str,
+                     length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+    """Response headers for the compressed body."""
+    result = []
+    for key, value in _with_vary(headers):
+        if key == b"content-length":
+            continue
+        if key == b"etag" and not value.startswith(b"W/"):
+            # the compressed bytes differ from the original: a strong ETag becomes weak (as nginx does)
+            value = b"W/" + value
+        result.append((key, value))
+    result.append((b"content-encoding", encoding.encode("latin-1")))
+    if length is not None:
+        result.append((b"content-length", str(length).encode("latin-1")))
+    return result
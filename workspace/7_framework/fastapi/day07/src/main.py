@@ -1,9 +1,9 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
+from operator import itemgetter
 from typing import Dict, Any, List, Optional
 import time
 import json
@@ -18,10 +18,16 @@ from middleware import (
     RequestSizeMiddleware,
     ErrorHandlingMiddleware,
     CorrelationIDMiddleware,
+    ResponseCompressionMiddleware,
     RateLimitConfig,
+    create_limiter,
     get_cors_origins,
     get_trusted_hosts
 )
+from asgi_middleware import MiddlewarePipeline
+from log_sink import BatchedLogSink
+from rate_limit import create_store
+from indexed_repository import IndexedRepository
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -65,10 +71,21 @@ class AppConfig:
         self.max_request_size = int(os.getenv("MAX_REQUEST_SIZE", 2 * 1024 * 1024))  # 2MB
         self.rate_limit_calls = int(os.getenv("RATE_LIMIT_CALLS", 50))
         self.rate_limit_period = int(os.getenv("RATE_LIMIT_PERIOD", 60))
+        # sliding_log | token_bucket | sliding_window
+        self.rate_limit_algorithm = os.getenv("RATE_LIMIT_ALGORITHM", "sliding_log")
+        # memory | sqlite:///rate_limits.db | redis://localhost:6379/0 (the last two are shared by all workers)
+        self.rate_limit_store = os.getenv("RATE_LIMIT_STORE", "memory")
+        # When set, request logs are written as JSON lines by a background thread
+        self.access_log_path = os.getenv("ACCESS_LOG_PATH")
+        # "base": one BaseHTTPMiddleware per concern; "pipeline": the fused pure-ASGI MiddlewarePipeline
+        self.middleware_stack = os.getenv("MIDDLEWARE_STACK", "base")
 
 
 config = AppConfig()
 
+# Batched access log writer (None = log through the standard logger)
+access_log_sink = BatchedLogSink(config.access_log_path) if config.access_log_path else None
+
 
 # Application lifecycle management
 @asynccontextmanager
@@ -76,11 +93,19 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     logger.info("Application starting up...")
     # Startup logic here (database connections, etc.)
+    if access_log_sink:
+        access_log_sink.start()
 
     yield
 
     logger.info("Application shutting down...")
     # Cleanup logic here
+    if access_log_sink:
+        # write the records that are still queued
+        access_log_sink.close()
+    if rate_limiter:
+        # stops the expiry thread, then closes the SQLite connections or the Redis connection pool
+        await rate_limiter.close()
 
 
 # Create FastAPI application
@@ -93,32 +118,52 @@ app = FastAPI(
 
 
 # Add middleware in correct order (last added = first executed)
-# Error handling should be outermost
-app.add_middleware(ErrorHandlingMiddleware, include_debug_info=config.debug)
-
-# Logging and correlation
-app.add_middleware(CorrelationIDMiddleware)
-app.add_middleware(RequestLoggingMiddleware, log_body=config.debug)
-
-# Security
-app.add_middleware(SecurityHeadersMiddleware)
-
-# Rate limiting
 rate_limit_config = RateLimitConfig(
     calls=config.rate_limit_calls,
-    period=config.rate_limit_period
+    period=config.rate_limit_period,
+    algorithm=config.rate_limit_algorithm
 )
-app.add_middleware(RateLimitingMiddleware, config=rate_limit_config)
+# Only token_bucket and sliding_window keep their state in a store; the default
+# sliding log keeps it in the middleware
+rate_limiter = None
+if rate_limit_config.algorithm != "sliding_log":
+    rate_limiter = create_limiter(rate_limit_config, create_store(config.rate_limit_store))
+
+if config.middleware_stack == "pipeline":
+    # The same six steps in a single pure-ASGI layer (see src/asgi_middleware.py)
+    app.add_middleware(
+        MiddlewarePipeline,
+        include_debug_info=config.debug,
+        log_body=config.debug,
+        sink=access_log_sink,
+        rate_limit=rate_limit_config,
+        rate_limiter=rate_limiter,
+        max_request_size=config.max_request_size,
+        size_exclude_paths=["/health", "/metrics"]
+    )
+else:
+    # Error handling should be outermost
+    app.add_middleware(ErrorHandlingMiddleware, include_debug_info=config.debug)
 
-# Request size limiting
-app.add_middleware(
-    RequestSizeMiddleware,
-    max_size=config.max_request_size,
-    exclude_paths=["/health", "/metrics"]  # Exclude monitoring endpoints
-)
+    # Logging and correlation
+    app.add_middleware(CorrelationIDMiddleware)
+    app.add_middleware(RequestLoggingMiddleware, log_body=config.debug, sink=access_log_sink)
+
+    # Security
+    app.add_middleware(SecurityHeadersMiddleware)
 
-# Built-in compression
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+    # Rate limiting
+    app.add_middleware(RateLimitingMiddleware, config=rate_limit_config, limiter=rate_limiter)
+
+    # Request size limiting
+    app.add_middleware(
+        RequestSizeMiddleware,
+        max_size=config.max_request_size,
+        exclude_paths=["/health", "/metrics"]  # Exclude monitoring endpoints
+    )
+
+# Streaming compression: brotli/gzip/deflate by Accept-Encoding q values (see src/compression.py)
+app.add_middleware(ResponseCompressionMiddleware, minimum_size=1000)
 
 # CORS middleware
 app.add_middleware(
@@ -140,19 +185,50 @@ if not config.debug:
 
 # In-memory database (replace with actual database in production)
 class ItemDatabase:
+    """Items keyed by id, with sorted indexes on price and created_at."""
+
     def __init__(self):
-        self.items: List[Dict[str, Any]] = [
+        self.repository = IndexedRepository(key="id", indexes=("price", "created_at"))
+        self.items = [
             {"id": 1, "name": "Item 1", "price": 10.0, "created_at": time.time(), "description": "First item"},
             {"id": 2, "name": "Item 2", "price": 20.0, "created_at": time.time(), "description": "Second item"},
             {"id": 3, "name": "Item 3", "price": 15.0, "created_at": time.time(), "description": "Third item"},
         ]
         self._next_id = 4
 
+    @property
+    def items(self) -> List[Dict[str, Any]]:
+        return self.repository.all()
+
+    @items.setter
+    def items(self, items: List[Dict[str, Any]]) -> None:
+        self.repository.clear()
+        self.repository.extend(items)
+
+    def __len__(self) -> int:
+        return len(self.repository)
+
     def get_all(self) -> List[Dict[str, Any]]:
-        return self.items.copy()
+        return self.repository.all()
 
     def get_by_id(self, item_id: int) -> Optional[Dict[str, Any]]:
-        return next((item for item in self.items if item["id"] == item_id), None)
+        return self.repository.get(item_id)
+
+    def get_page(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        after: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Items in id order, optionally within a price range and after a given id."""
+        if min_price is None and max_price is None:
+            return self.repository.page(limit=limit, after=after)
+        items = self.repository.range("price", min_price, max_price)
+        if after is not None:
+            items = (item for item in items if item["id"] > after)
+        # the price index yields price order; pages are in id order
+        return sorted(items, key=itemgetter("id"))[:limit]
 
     def create(self, item_data: ItemCreate) -> Dict[str, Any]:
         new_item = {
@@ -162,26 +238,19 @@ class ItemDatabase:
             "description": item_data.description,
             "created_at": time.time()
         }
-        self.items.append(new_item)
+        self.repository.insert(new_item)
         self._next_id += 1
         return new_item
 
     def update(self, item_id: int, item_data: ItemCreate) -> Optional[Dict[str, Any]]:
-        item = self.get_by_id(item_id)
-        if item:
-            item.update({
-                "name": item_data.name,
-                "price": item_data.price,
-                "description": item_data.description
-            })
-        return item
+        return self.repository.update(item_id, {
+            "name": item_data.name,
+            "price": item_data.price,
+            "description": item_data.description
+        })
 
     def delete(self, item_id: int) -> bool:
-        item = self.get_by_id(item_id)
-        if item:
-            self.items.remove(item)
-            return True
-        return False
+        return self.repository.delete(item_id)
 
 
 # Database instance
@@ -220,14 +289,20 @@ def read_root(request: Request) -> Dict[str, Any]:
     summary="Get all items",
     description="Retrieve all items from the database"
 )
-def get_items(request: Request) -> Dict[str, Any]:
+def get_items(
+    request: Request,
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum price filter"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price filter"),
+    after: Optional[int] = Query(None, description="Return items with an id greater than this"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of items to return")
+) -> Dict[str, Any]:
     """Get all items with simulated processing delay."""
     # Simulate some processing time
     time.sleep(0.1)
 
     return {
-        "items": [ItemResponse(**item) for item in db.get_all()],
-        "count": len(db.items),
+        "items": [ItemResponse(**item) for item in db.get_page(min_price, max_price, after, limit)],
+        "count": len(db),
         **get_request_info(request)
     }
 
@@ -437,7 +512,7 @@ def health_check(request: Request) -> HealthResponse:
 def get_metrics(request: Request) -> Dict[str, Any]:
     """Basic metrics endpoint."""
     return {
-        "items_count": len(db.items),
+        "items_count": len(db),
         "environment": config.environment,
         "uptime_check": "healthy",
         **get_request_info(request)
@@ -9,6 +9,11 @@ import logging
 import uuid
 import json
 
+from log_sink import BatchedLogSink
+# Compression is pure ASGI so it can compress streamed bodies chunk by chunk
+from compression import ResponseCompressionMiddleware  # noqa: F401
+from rate_limit import RateLimiter, RateLimitStore
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,6 +28,9 @@ class RateLimitConfig:
     calls: int = 100
     period: int = 60
     cleanup_interval: int = 300  # Clean old entries every 5 minutes
+    # "sliding_log" keeps every timestamp; "token_bucket" and "sliding_window" are O(1)
+    # per request and can share state across workers (see rate_limit.py)
+    algorithm: str = "sliding_log"
 
 
 @dataclass
@@ -33,12 +41,25 @@ class ClientRateData:
 
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for logging requests and responses with structured data."""
-
-    def __init__(self, app, log_body: bool = False, max_body_size: int = 1000):
+    """
+    Middleware for logging requests and responses with structured data.
+
+    Pass a started BatchedLogSink as `sink` to keep logging off the request path:
+    records are queued as dicts and serialized/written by the sink's thread.
+    Without a sink, records go through the standard logger.
+    """
+
+    def __init__(
+        self,
+        app,
+        log_body: bool = False,
+        max_body_size: int = 1000,
+        sink: Optional[BatchedLogSink] = None
+    ):
         super().__init__(app)
         self.log_body = log_body
         self.max_body_size = max_body_size
+        self.sink = sink
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # Generate request ID
@@ -66,7 +87,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             except Exception:
                 log_data["request_body"] = "<unable to decode>"
 
-        logger.info(f"Incoming request: {json.dumps(log_data)}")
+        self._log("Incoming request", log_data)
 
         # Process request
         try:
@@ -82,16 +103,21 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         response.headers["X-Process-Time"] = f"{process_time:.4f}"
 
         # Log response
-        logger.info(
-            f"Request completed: {json.dumps({
-                'request_id': request_id,
-                'status_code': response.status_code,
-                'process_time': f'{process_time:.4f}s'
-            })}"
-        )
+        self._log("Request completed", {
+            "request_id": request_id,
+            "status_code": response.status_code,
+            "process_time": f"{process_time:.4f}s"
+        })
 
         return response
 
+    def _log(self, event: str, data: Dict) -> None:
+        """Send a record to the sink if there is one, otherwise to the logger."""
+        if self.sink is not None:
+            self.sink.write({"event": event, "timestamp": time.time(), **data})
+        else:
+            logger.info(f"{event}: {json.dumps(data)}")
+
     def _get_client_ip(self, request: Request) -> str:
         """Extract client IP considering proxy headers."""
         # Check for X-Forwarded-For header (common with load balancers)
@@ -137,17 +163,54 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return response
 
 
+def create_limiter(config: RateLimitConfig, store: Optional[RateLimitStore] = None) -> Optional[RateLimiter]:
+    """An O(1) RateLimiter for the configured algorithm, or None for the built-in sliding log."""
+    if config.algorithm == "sliding_log":
+        return None
+    return RateLimiter(
+        config.calls,
+        config.period,
+        algorithm=config.algorithm,
+        store=store,
+        cleanup_interval=config.cleanup_interval
+    )
+
+
+def rate_limit_response(config: RateLimitConfig, client_ip: str, retry_after: int) -> JSONResponse:
+    """The 429 response sent when a client is over its limit."""
+    logger.warning(f"Rate limit exceeded for {client_ip}")
+    return JSONResponse(
+        status_code=429,
+        content={
+            "error": "Rate limit exceeded",
+            "message": f"Maximum {config.calls} requests per {config.period} seconds",
+            "retry_after": retry_after
+        },
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
 class RateLimitingMiddleware(BaseHTTPMiddleware):
     """Enhanced rate limiting middleware with automatic cleanup."""
 
-    def __init__(self, app, config: Optional[RateLimitConfig] = None):
+    def __init__(self, app, config: Optional[RateLimitConfig] = None, store: Optional[RateLimitStore] = None,
+                 limiter: Optional[RateLimiter] = None):
         super().__init__(app)
         self.config = config or RateLimitConfig()
         self.clients: Dict[str, ClientRateData] = defaultdict(ClientRateData)
         self._last_global_cleanup = time.time()
+        # pass a limiter built by the app to close it (and its store) on shutdown
+        self.limiter = limiter or create_limiter(self.config, store)
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         client_ip = self._get_client_ip(request)
+
+        if self.limiter is not None:
+            decision = await self.limiter.hit(client_ip)
+            if not decision.allowed:
+                return rate_limit_response(self.config, client_ip, decision.retry_after)
+            return await call_next(request)
+
         current_time = time.time()
 
         # Perform periodic cleanup
@@ -166,17 +229,7 @@ class RateLimitingMiddleware(BaseHTTPMiddleware):
         if len(client_data.requests) >= self.config.calls:
             oldest_request = min(client_data.requests)
             retry_after = int(self.config.period - (current_time - oldest_request))
-
-            logger.warning(f"Rate limit exceeded for {client_ip}")
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "error": "Rate limit exceeded",
-                    "message": f"Maximum {self.config.calls} requests per {self.config.period} seconds",
-                    "retry_after": retry_after
-                },
-                headers={"Retry-After": str(retry_after)}
-            )
+            return rate_limit_response(self.config, client_ip, retry_after)
 
         # Add current request
         client_data.requests.append(current_time)
@@ -246,46 +299,6 @@ class RequestSizeMiddleware(BaseHTTPMiddleware):
         return f"{size_bytes:.1f} TB"
 
 
-class ResponseCompressionMiddleware(BaseHTTPMiddleware):
-    """Middleware for response compression."""
-
-    def __init__(self, app, minimum_size: int = 1000, compression_level: int = 6):
-        super().__init__(app)
-        self.minimum_size = minimum_size
-        self.compression_level = compression_level
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-
-        # Check if client accepts gzip
-        accept_encoding = request.headers.get("accept-encoding", "")
-        if "gzip" not in accept_encoding.lower():
-            return response
-
-        # Check content type
-        content_type = response.headers.get("content-type", "")
-        if not self._should_compress(content_type):
-            return response
-
-        # For demonstration - in production, use FastAPI's GZipMiddleware or implement actual compression
-        response.headers["Content-Encoding"] = "gzip"
-        response.headers["Vary"] = "Accept-Encoding"
-
-        return response
-
-    def _should_compress(self, content_type: str) -> bool:
-        """Determine if content type should be compressed."""
-        compressible_types = [
-            "application/json",
-            "application/javascript",
-            "text/html",
-            "text/css",
-            "text/plain",
-            "text/xml"
-        ]
-        return any(ct in content_type.lower() for ct in compressible_types)
-
-
 class ErrorHandlingMiddleware(BaseHTTPMiddleware):
     """Enhanced error handling middleware with detailed logging."""
 
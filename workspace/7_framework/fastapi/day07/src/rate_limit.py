@@ -0,0 +1,421 @@
+"""
+O(1) rate limiting algorithms with pluggable storage.
+
+RateLimitingMiddleware's default "sliding log" keeps a timestamp per request: every
+request rebuilds the client's list (O(calls)), min() finds the oldest entry, and
+an inline sweep over all clients runs every cleanup_interval. This module keeps
+a constant amount of state per client instead:
+
+- token bucket: `calls` tokens that refill at calls/period per second; a request
+  takes one token. Allows bursts up to `calls`, then a steady rate.
+- sliding window counter: counts for the current and the previous fixed window;
+  the previous one is weighted by how much of it still overlaps the sliding window.
+
+Both are a few arithmetic operations per request. State lives in a store, whose
+per-request methods are coroutines so a store that does I/O never blocks the
+event loop:
+
+- MemoryStore: one __slots__ record per client in an OrderedDict kept in
+  last-touched order, so expiry only ever looks at the oldest entries
+- SQLiteStore: one row per client; a file shared by every worker process.
+  Transactions run in a worker thread
+- RedisStore: one hash per client, updated by a Lua script through redis.asyncio;
+  keys expire by TTL
+
+Idle clients are removed by a background thread in small batches, never on the
+request path.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import math
+import sqlite3
+import threading
+import time
+import logging
+
+import anyio
+
+logger = logging.getLogger(__name__)
+
+ALGORITHMS = ("token_bucket", "sliding_window")
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of one request against a limit."""
+    allowed: bool
+    remaining: int
+    retry_after: int = 0  # seconds until a request would be allowed (0 when allowed)
+
+
+def token_bucket_step(tokens: float, updated_at: float, capacity: int, rate: float,
+                      now: float) -> Tuple[bool, float, float]:
+    """Refill and take one token. Returns (allowed, tokens left, seconds to wait)."""
+    tokens = min(capacity, tokens + (now - updated_at) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+def sliding_window_step(window: int, current: float, previous: float, limit: int, period: float,
+                        now: float) -> Tuple[bool, int, float, float, float, float]:
+    """
+    Count one request in the sliding window.
+
+    Returns (allowed, window, current, previous, estimated count, seconds to wait).
+    """
+    now_window = int(now // period)
+    if now_window != window:
+        previous = current if now_window == window + 1 else 0.0
+        current = 0.0
+        window = now_window
+    elapsed = now - window * period
+    weight = 1 - elapsed / period
+    estimated = previous * weight + current
+    if estimated + 1 <= limit:
+        return True, window, current + 1, previous, estimated + 1, 0.0
+
+    if previous > 0 and current < limit - 1:
+        # wait until the previous window's share has shrunk enough
+        needed_weight = (limit - 1 - current) / previous
+        wait = period * (1 - needed_weight) - elapsed
+    else:
+        # the current window alone is full: wait for it to become the previous one
+        wait = period - elapsed
+    return False, window, current, previous, estimated, max(wait, 0.0)
+
+
+class RateLimitStore(ABC):
+    """
+    Interface for rate limit state; every update must be atomic per key.
+
+    token_bucket and sliding_window run on the event loop, so they must not block.
+    expire runs in the limiter's background thread.
+    """
+
+    @abstractmethod
+    async def token_bucket(self, key: str, capacity: int, rate: float, now: float) -> Tuple[bool, float, float]:
+        """Take one token from `key`'s bucket. Returns (allowed, tokens left, seconds to wait)."""
+
+    @abstractmethod
+    async def sliding_window(self, key: str, limit: int, period: float, now: float) -> Tuple[bool, float, float]:
+        """Count one request for `key`. Returns (allowed, estimated count, seconds to wait)."""
+
+    def expire(self, idle_before: float, batch: int) -> int:
+        """Delete up to `batch` keys not touched since `idle_before`; returns how many."""
+        return 0
+
+    async def close(self) -> None:
+        pass
+
+
+class _BucketState:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class _WindowState:
+    __slots__ = ("window", "current", "previous", "updated_at")
+
+    def __init__(self, window: int, current: float, previous: float, updated_at: float):
+        self.window = window
+        self.current = current
+        self.previous = previous
+        self.updated_at = updated_at
+
+
+class MemoryStore(RateLimitStore):
+    """In-process store; limits are per worker process. Updates are too short to need a thread."""
+
+    def __init__(self):
+        self.states: "OrderedDict[str, object]" = OrderedDict()
+        # shared with the expiry thread
+        self.lock = threading.Lock()
+
+    async def token_bucket(self, key: str, capacity: int, rate: float, now: float) -> Tuple[bool, float, float]:
+        with self.lock:
+            state = self.states.get(key)
+            if state is None:
+                state = self.states[key] = _BucketState(capacity, now)
+            else:
+                self.states.move_to_end(key)
+            allowed, state.tokens, wait = token_bucket_step(state.tokens, state.updated_at, capacity, rate, now)
+            state.updated_at = now
+            return allowed, state.tokens, wait
+
+    async def sliding_window(self, key: str, limit: int, period: float, now: float) -> Tuple[bool, float, float]:
+        with self.lock:
+            state = self.states.get(key)
+            if state is None:
+                state = self.states[key] = _WindowState(int(now // period), 0.0, 0.0, now)
+            else:
+                self.states.move_to_end(key)
+            allowed, state.window, state.current, state.previous, estimated, wait = sliding_window_step(
+                state.window, state.current, state.previous, limit, period, now
+            )
+            state.updated_at = now
+            return allowed, estimated, wait
+
+    def expire(self, idle_before: float, batch: int) -> int:
+        removed = 0
+        with self.lock:
+            # least recently touched first: stop at the first key that is still active
+            while removed < batch and self.states:
+                key, state = next(iter(self.states.items()))
+                if state.updated_at >= idle_before:
+                    break
+                del self.states[key]
+                removed += 1
+        return removed
+
+
+class SQLiteStore(RateLimitStore):
+    """
+    Store in a SQLite file, shared by every process that opens the same path.
+
+    Each update is a transaction that can wait up to `timeout` seconds for the
+    write lock, so it runs in a worker thread, never on the event loop.
+    """
+
+    def __init__(self, path: str = "rate_limits.db", timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, a REAL, b REAL, c REAL, updated_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS rate_limits_updated_at ON rate_limits (updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread; autocommit mode so we control the transactions
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # only ever used by this thread; close() may come from another one
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _update(self, key: str, step, now: float):
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT a, b, c FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            values, result = step(row)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, a, b, c, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (key, *values, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    async def token_bucket(self, key: str, capacity: int, rate: float, now: float) -> Tuple[bool, float, float]:
+        def step(row):
+            tokens, updated_at = (row[0], row[1]) if row else (capacity, now)
+            allowed, tokens, wait = token_bucket_step(tokens, updated_at, capacity, rate, now)
+            return (tokens, now, 0.0), (allowed, tokens, wait)
+        return await anyio.to_thread.run_sync(self._update, key, step, now)
+
+    async def sliding_window(self, key: str, limit: int, period: float, now: float) -> Tuple[bool, float, float]:
+        def step(row):
+            window, current, previous = (int(row[0]), row[1], row[2]) if row else (int(now // period), 0.0, 0.0)
+            allowed, window, current, previous, estimated, wait = sliding_window_step(
+                window, current, previous, limit, period, now
+            )
+            return (window, current, previous), (allowed, estimated, wait)
+        return await anyio.to_thread.run_sync(self._update, key, step, now)
+
+    def expire(self, idle_before: float, batch: int) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM rate_limits WHERE key IN "
+            "(SELECT key FROM rate_limits WHERE updated_at < ? LIMIT ?)",
+            (idle_before, batch)
+        )
+        return cursor.rowcount
+
+    async def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+# KEYS[1] = state hash; ARGV = capacity, rate, now, ttl
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated_at) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+return {allowed, tostring(tokens), tostring(wait)}
+"""
+
+# KEYS[1] = state hash; ARGV = limit, period, now, ttl
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'window', 'current', 'previous')
+local now_window = math.floor(now / period)
+local window = tonumber(state[1]) or now_window
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+if now_window ~= window then
+    if now_window == window + 1 then previous = current else previous = 0 end
+    current = 0
+    window = now_window
+end
+local elapsed = now - window * period
+local estimated = previous * (1 - elapsed / period) + current
+local allowed = 0
+local wait = 0
+if estimated + 1 <= limit then
+    allowed = 1
+    current = current + 1
+    estimated = estimated + 1
+elseif previous > 0 and current < limit - 1 then
+    wait = math.max(period * (1 - (limit - 1 - current) / previous) - elapsed, 0)
+else
+    wait = period - elapsed
+end
+redis.call('HSET', KEYS[1], 'window', window, 'current', current, 'previous', previous)
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+return {allowed, tostring(estimated), tostring(wait)}
+"""
+
+
+class RedisStore(RateLimitStore):
+    """
+    Store in Redis (or anything that speaks its protocol and runs Lua scripts).
+
+    Each update is one EVALSHA, so it is atomic; keys get a TTL of twice the period,
+    which makes Redis do the expiry. `client` must be a redis.asyncio client.
+    """
+
+    def __init__(self, client=None, url: str = "redis://localhost:6379/0", prefix: str = "ratelimit:"):
+        if client is None:
+            import redis.asyncio
+            client = redis.asyncio.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self._token_bucket = client.register_script(TOKEN_BUCKET_LUA)
+        self._sliding_window = client.register_script(SLIDING_WINDOW_LUA)
+
+    async def token_bucket(self, key: str, capacity: int, rate: float, now: float) -> Tuple[bool, float, float]:
+        ttl_ms = int(capacity / rate * 2000) + 1000
+        allowed, tokens, wait = await self._token_bucket(keys=[self.prefix + key], args=[capacity, rate, now, ttl_ms])
+        return bool(allowed), float(tokens), float(wait)
+
+    async def sliding_window(self, key: str, limit: int, period: float, now: float) -> Tuple[bool, float, float]:
+        ttl_ms = int(period * 2000) + 1000
+        allowed, estimated, wait = await self._sliding_window(
+            keys=[self.prefix + key], args=[limit, period, now, ttl_ms]
+        )
+        return bool(allowed), float(estimated), float(wait)
+
+    async def close(self) -> None:
+        # redis-py 5 renamed the coroutine to aclose()
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
+
+
+def create_store(url: str = "memory") -> RateLimitStore:
+    """Build a store from a URL: "memory", "sqlite:///path/to/file.db" or "redis://host:port/db"."""
+    if url == "memory":
+        return MemoryStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url=url)
+    raise ValueError(f"Unknown rate limit store: {url}")
+
+
+class RateLimiter:
+    """Applies `calls` per `period` seconds per key, with one of ALGORITHMS."""
+
+    def __init__(self, calls: int, period: float, algorithm: str = "token_bucket",
+                 store: Optional[RateLimitStore] = None, cleanup_interval: float = 300,
+                 cleanup_batch: int = 1000):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm} (expected one of {ALGORITHMS})")
+        self.calls = calls
+        self.period = period
+        self.algorithm = algorithm
+        self.store = store or MemoryStore()
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch = cleanup_batch
+        self.expired = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def hit(self, key: str, now: Optional[float] = None) -> RateLimitDecision:
+        """Count one request for `key` and say whether it is allowed."""
+        if self._thread is None:
+            self.start()
+        now = time.time() if now is None else now
+        if self.algorithm == "token_bucket":
+            allowed, tokens, wait = await self.store.token_bucket(key, self.calls, self.calls / self.period, now)
+            remaining = int(tokens + 1e-9)
+        else:
+            allowed, estimated, wait = await self.store.sliding_window(key, self.calls, self.period, now)
+            remaining = max(0, self.calls - math.ceil(estimated - 1e-9))
+        # the epsilons keep float noise (10.000000000000002) from adding a second or dropping a token
+        return RateLimitDecision(allowed, remaining, 0 if allowed else max(1, math.ceil(wait - 1e-9)))
+
+    def start(self) -> "RateLimiter":
+        """Start the background expiry thread (done on the first hit if not called)."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._expire_loop, name="rate-limit-expiry", daemon=True)
+            self._thread.start()
+        return self
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            # the thread may be in the middle of an expiry batch
+            await anyio.to_thread.run_sync(self._thread.join)
+            self._thread = None
+        await self.store.close()
+
+    def _expire_loop(self) -> None:
+        # after 2 periods of silence a client's state equals that of a new client
+        while not self._stop.wait(self.cleanup_interval):
+            idle_before = time.time() - 2 * self.period
+            try:
+                while not self._stop.is_set():
+                    removed = self.store.expire(idle_before, self.cleanup_batch)
+                    self.expired += removed
+                    if removed < self.cleanup_batch:
+                        break
+            except Exception as e:
+                logger.error(f"Rate limit expiry failed: {e}")
@@ -0,0 +1,241 @@
+import pytest
+import json
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from src.asgi_middleware import (
+    RequestLoggingASGIMiddleware,
+    SecurityHeadersASGIMiddleware,
+    RateLimitingASGIMiddleware,
+    RequestSizeASGIMiddleware,
+    ErrorHandlingASGIMiddleware,
+    CorrelationIDASGIMiddleware,
+    MiddlewarePipeline,
+    set_headers
+)
+from src.middleware import RateLimitConfig
+from src.rate_limit import MemoryStore
+
+
+def make_app(*middleware) -> FastAPI:
+    """App with the given (class, kwargs) middleware and a few test endpoints."""
+    app = FastAPI()
+    for cls, kwargs in middleware:
+        app.add_middleware(cls, **kwargs)
+
+    @app.get("/test")
+    async def test_endpoint(request: Request):
+        return {
+            "message": "test",
+            "request_id": getattr(request.state, "request_id", None),
+            "correlation_id": getattr(request.state, "correlation_id", None)
+        }
+
+    @app.post("/echo")
+    async def echo_endpoint(data: dict):
+        return data
+
+    @app.get("/boom")
+    async def boom_endpoint():
+        raise RuntimeError("boom")
+
+    return app
+
+
+class TestSetHeaders:
+    """Test cases for the raw header helper."""
+
+    def test_replaces_instead_of_duplicating(self):
+        message = {"type": "http.response.start", "status": 200, "headers": [(b"x-frame-options", b"SAMEORIGIN")]}
+        set_headers(message, [(b"x-frame-options", b"DENY")])
+        assert message["headers"] == [(b"x-frame-options", b"DENY")]
+
+
+class TestRequestLoggingASGIMiddleware:
+    """Test cases for RequestLoggingASGIMiddleware."""
+
+    def test_adds_request_id_and_process_time(self):
+        client = TestClient(make_app((RequestLoggingASGIMiddleware, {})))
+        response = client.get("/test")
+        assert len(response.headers["X-Request-ID"]) == 36
+        assert float(response.headers["X-Process-Time"]) >= 0
+        assert response.json()["request_id"] == response.headers["X-Request-ID"]
+
+    def test_logs_to_sink(self, tmp_path):
+        from log_sink import BatchedLogSink
+
+        log_path = tmp_path / "access.log"
+        sink = BatchedLogSink(str(log_path))
+        client = TestClient(make_app((RequestLoggingASGIMiddleware, {"sink": sink})))
+        response = client.get("/test?page=2", headers={"x-forwarded-for": "192.168.1.1, 10.0.0.1"})
+        sink.close()
+
+        records = [json.loads(line) for line in log_path.read_text().splitlines()]
+        assert [r["event"] for r in records] == ["Incoming request", "Request completed"]
+        assert records[0]["request_id"] == response.headers["X-Request-ID"]
+        assert records[0]["client_ip"] == "192.168.1.1"
+        assert records[0]["query_params"] == "page=2"
+        assert records[1]["status_code"] == 200
+
+    def test_logged_body_is_still_passed_to_endpoint(self, tmp_path):
+        from log_sink import BatchedLogSink
+
+        log_path = tmp_path / "access.log"
+        sink = BatchedLogSink(str(log_path))
+        client = TestClient(make_app((RequestLoggingASGIMiddleware, {"sink": sink, "log_body": True})))
+        response = client.post("/echo", json={"name": "widget"})
+        sink.close()
+
+        assert response.json() == {"name": "widget"}
+        record = json.loads(log_path.read_text().splitlines()[0])
+        assert json.loads(record["request_body"]) == {"name": "widget"}
+
+
+class TestSecurityHeadersASGIMiddleware:
+    """Test cases for SecurityHeadersASGIMiddleware."""
+
+    def test_adds_default_and_custom_headers(self):
+        client = TestClient(make_app(
+            (SecurityHeadersASGIMiddleware, {"custom_headers": {"X-Custom-Header": "custom-value"}})
+        ))
+        response = client.get("/test")
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+        assert response.headers["X-Frame-Options"] == "DENY"
+        assert response.headers["X-Custom-Header"] == "custom-value"
+
+
+class TestRateLimitingASGIMiddleware:
+    """Test cases for RateLimitingASGIMiddleware."""
+
+    def test_blocks_requests_exceeding_limit(self):
+        client = TestClient(make_app(
+            (RateLimitingASGIMiddleware, {"config": RateLimitConfig(calls=3, period=60)})
+        ))
+        for _ in range(3):
+            assert client.get("/test").status_code == 200
+
+        response = client.get("/test")
+        assert response.status_code == 429
+        assert response.json()["error"] == "Rate limit exceeded"
+        assert "Retry-After" in response.headers
+
+
+class TestRequestSizeASGIMiddleware:
+    """Test cases for RequestSizeASGIMiddleware."""
+
+    def test_blocks_large_requests(self):
+        client = TestClient(make_app((RequestSizeASGIMiddleware, {"max_size": 100})))
+        assert client.post("/echo", json={"data": "small"}).status_code == 200
+
+        response = client.post("/echo", json={"data": "x" * 200})
+        assert response.status_code == 413
+        assert response.json()["error"] == "Request too large"
+
+    def test_excluded_paths_are_not_checked(self):
+        client = TestClient(make_app((RequestSizeASGIMiddleware, {"max_size": 100, "exclude_paths": ["/echo"]})))
+        assert client.post("/echo", json={"data": "x" * 200}).status_code == 200
+
+
+class TestErrorHandlingASGIMiddleware:
+    """Test cases for ErrorHandlingASGIMiddleware."""
+
+    def test_returns_json_500(self):
+        client = TestClient(make_app((ErrorHandlingASGIMiddleware, {"include_debug_info": True})))
+        response = client.get("/boom")
+        assert response.status_code == 500
+        data = response.json()
+        assert data["error"] == "Internal Server Error"
+        assert data["debug"] == {"error_type": "RuntimeError", "error_message": "boom"}
+
+
+class TestCorrelationIDASGIMiddleware:
+    """Test cases for CorrelationIDASGIMiddleware."""
+
+    def test_generates_correlation_id_when_not_provided(self):
+        client = TestClient(make_app((CorrelationIDASGIMiddleware, {})))
+        response = client.get("/test")
+        assert len(response.headers["X-Correlation-ID"]) == 36
+        assert response.json()["correlation_id"] == response.headers["X-Correlation-ID"]
+
+    def test_uses_provided_correlation_id(self):
+        client = TestClient(make_app((CorrelationIDASGIMiddleware, {"header_name": "X-Trace-ID"})))
+        response = client.get("/test", headers={"X-Trace-ID": "trace-123"})
+        assert response.headers["X-Trace-ID"] == "trace-123"
+        assert response.json()["correlation_id"] == "trace-123"
+
+
+class TestMiddlewarePipeline:
+    """Test cases for the fused MiddlewarePipeline."""
+
+    @pytest.fixture
+    def client(self):
+        app = make_app((MiddlewarePipeline, {
+            "include_debug_info": True,
+            "rate_limit": RateLimitConfig(calls=5, period=60),
+            "max_request_size": 100
+        }))
+        return TestClient(app, raise_server_exceptions=False)
+
+    def test_applies_every_step(self, client):
+        response = client.get("/test", headers={"X-Correlation-ID": "corr-1"})
+        assert response.status_code == 200
+        assert response.headers["X-Correlation-ID"] == "corr-1"
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+        assert "X-Process-Time" in response.headers
+        data = response.json()
+        assert data["request_id"] == response.headers["X-Request-ID"]
+        assert data["correlation_id"] == "corr-1"
+
+    def test_rejections_get_tracing_and_security_headers(self, client):
+        response = client.post("/echo", json={"data": "x" * 200})
+        assert response.status_code == 413
+        assert "X-Request-ID" in response.headers
+        assert response.headers["X-Frame-Options"] == "DENY"
+
+    def test_rate_limit(self, client):
+        statuses = [client.get("/test").status_code for _ in range(6)]
+        assert statuses == [200] * 5 + [429]
+
+    def test_errors_become_json_500(self, client):
+        response = client.get("/boom")
+        assert response.status_code == 500
+        assert response.json()["request_id"] == response.headers["X-Request-ID"]
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+
+    def test_rate_limit_store_errors_become_json_500(self):
+        """A failing rate limit store gets the same JSON 500 and headers as an endpoint error."""
+        class BrokenStore(MemoryStore):
+            async def token_bucket(self, key, capacity, rate, now):
+                raise ConnectionError("store is down")
+
+        app = make_app((MiddlewarePipeline, {
+            "rate_limit": RateLimitConfig(calls=5, period=60, algorithm="token_bucket"),
+            "rate_limit_store": BrokenStore()
+        }))
+        client = TestClient(app, raise_server_exceptions=False)
+        response = client.get("/test", headers={"X-Correlation-ID": "corr-1"})
+        assert response.status_code == 500
+        assert response.json()["request_id"] == response.headers["X-Request-ID"]
+        assert response.headers["X-Correlation-ID"] == "corr-1"
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+
+    def test_matches_base_http_stack(self):
+        """The fused pipeline adds the same headers as the BaseHTTPMiddleware stack."""
+        from src.middleware import (
+            SecurityHeadersMiddleware,
+            RequestLoggingMiddleware,
+            CorrelationIDMiddleware
+        )
+        base = TestClient(make_app(
+            (SecurityHeadersMiddleware, {}),
+            (RequestLoggingMiddleware, {}),
+            (CorrelationIDMiddleware, {})
+        ))
+        fused = TestClient(make_app((MiddlewarePipeline, {})))
+        base_headers = set(base.get("/test").headers.keys())
+        fused_headers = set(fused.get("/test").headers.keys())
+        assert base_headers == fused_headers
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,160 @@
+import pytest
+import gzip
+import zlib
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.compression import ResponseCompressionMiddleware, choose_encoding
+
+LARGE_TEXT = "compress me " * 500
+
+
+class TestChooseEncoding:
+    """Test cases for Accept-Encoding negotiation."""
+
+    def test_highest_quality_wins(self):
+        assert choose_encoding("deflate;q=0.5, gzip;q=0.9") == "gzip"
+        assert choose_encoding("gzip;q=0.2, deflate") == "deflate"
+
+    def test_server_preference_breaks_ties(self):
+        assert choose_encoding("deflate, gzip", ("gzip", "deflate")) == "gzip"
+
+    def test_q_zero_refuses_an_encoding(self):
+        assert choose_encoding("gzip;q=0, deflate;q=0") is None
+        assert choose_encoding("*, gzip;q=0", ("gzip", "deflate")) == "deflate"
+
+    def test_identity_only(self):
+        assert choose_encoding("identity") is None
+        assert choose_encoding("") is None
+
+    def test_brotli_only_when_available(self):
+        assert choose_encoding("br, gzip;q=0.8", ("gzip", "deflate")) == "gzip"
+        assert choose_encoding("br, gzip;q=0.8", ("br", "gzip", "deflate")) == "br"
+
+
+class TestResponseCompression:
+    """Test cases for the streaming compression middleware."""
+
+    @pytest.fixture
+    def compression(self):
+        """The middleware wrapped around an app directly, so tests can inspect it."""
+        app = FastAPI()
+
+        @app.get("/large")
+        async def large():
+            return Response(LARGE_TEXT, media_type="text/plain")
+
+        @app.get("/small")
+        async def small():
+            return {"message": "test"}
+
+        @app.get("/stream")
+        async def stream():
+            async def chunks():
+                for i in range(50):
+                    yield f"line {i} ".encode() * 20
+            return StreamingResponse(chunks(), media_type="text/plain")
+
+        @app.get("/static")
+        async def static():
+            return Response(LARGE_TEXT, media_type="text/css", headers={"ETag": '"v1"'})
+
+        @app.get("/other-static")
+        async def other_static():
+            return Response(b"A" * len(LARGE_TEXT), media_type="text/css", headers={"ETag": '"v1"'})
+
+        @app.get("/image")
+        async def image():
+            return Response(b"\x89PNG" * 500, media_type="image/png")
+
+        return ResponseCompressionMiddleware(app, minimum_size=500)
+
+    @pytest.fixture
+    def client(self, compression):
+        return TestClient(compression)
+
+    def test_gzip_body_is_really_compressed(self, client):
+        response = client.get("/large", headers={"accept-encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        # httpx decodes the body; it must match the original
+        assert response.text == LARGE_TEXT
+        assert int(response.headers["content-length"]) < len(LARGE_TEXT) / 10
+
+    def test_deflate(self, client):
+        response = client.get("/large", headers={"accept-encoding": "deflate"})
+        assert response.headers["content-encoding"] == "deflate"
+        assert response.text == LARGE_TEXT
+
+    def test_streaming_response_is_compressed_incrementally(self, client):
+        expected = b"".join(f"line {i} ".encode() * 20 for i in range(50))
+        with client.stream("GET", "/stream", headers={"accept-encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert gzip.decompress(raw) == expected
+
+    def test_no_compression_when_not_accepted(self, client):
+        response = client.get("/large", headers={"accept-encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.text == LARGE_TEXT
+
+    def test_small_responses_are_not_compressed(self, client):
+        response = client.get("/small", headers={"accept-encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["vary"]
+
+    def test_incompressible_types_are_skipped(self, client):
+        response = client.get("/image", headers={"accept-encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_etag_responses_are_compressed_once(self, compression, client):
+        for _ in range(3):
+            response = client.get("/static", headers={"accept-encoding": "gzip"})
+            assert response.text == LARGE_TEXT
+            assert response.headers["etag"] == 'W/"v1"'
+        assert compression.cache.misses == 1 and compression.cache.hits == 2
+        assert compression.stats["compressed"] == 1
+
+    def test_shared_etag_does_not_share_cached_bodies(self, compression, client):
+        client.get("/static", headers={"accept-encoding": "gzip"})
+        response = client.get("/other-static", headers={"accept-encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == "A" * len(LARGE_TEXT)
+        response = client.get("/static?page=2", headers={"accept-encoding": "gzip"})
+        assert response.text == LARGE_TEXT
+        assert compression.cache.hits == 0 and compression.cache.misses == 3
+
+    def test_skips_compression_when_cpu_is_saturated(self, compression, client):
+        compression.cpu_monitor.utilization = 1.0
+        compression.cpu_monitor.interval = 3600
+        response = client.get("/large", headers={"accept-encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert compression.stats["skipped_cpu"] == 1
+
+    def test_cached_bodies_are_served_while_cpu_is_saturated(self, compression, client):
+        client.get("/static", headers={"accept-encoding": "gzip"})
+        compression.cpu_monitor.utilization = 1.0
+        compression.cpu_monitor.interval = 3600
+        response = client.get("/static", headers={"accept-encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert compression.stats["skipped_cpu"] == 0
+
+    def test_should_compress_ignores_parameters(self):
+        middleware = ResponseCompressionMiddleware(None)
+        assert middleware._should_compress("application/json; charset=utf-8")
+        assert not middleware._should_compress("image/png")
+
+
+def test_zlib_container_for_deflate():
+    """HTTP 'deflate' is the zlib container, not raw deflate."""
+    from src.compression import Compressor
+    compressor = Compressor("deflate", 6)
+    data = compressor.compress(b"abc" * 100) + compressor.finish()
+    assert zlib.decompress(data) == b"abc" * 100
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,4 +1,5 @@
 import pytest
+import asyncio
 import json
 from unittest.mock import Mock, patch
 from fastapi import FastAPI, Request
@@ -13,7 +14,8 @@ from src.middleware import (
     ErrorHandlingMiddleware,
     CorrelationIDMiddleware,
     RateLimitConfig,
-    ClientRateData
+    ClientRateData,
+    create_limiter
 )
 
 
@@ -50,6 +52,27 @@ class TestRequestLoggingMiddleware:
         process_time = float(response.headers["X-Process-Time"])
         assert process_time > 0
 
+    def test_logs_to_sink(self, tmp_path):
+        """Test that records go to the batched sink when one is configured."""
+        from log_sink import BatchedLogSink
+
+        log_path = tmp_path / "access.log"
+        sink = BatchedLogSink(str(log_path))
+        app = FastAPI()
+        app.add_middleware(RequestLoggingMiddleware, sink=sink)
+
+        @app.get("/test")
+        async def test_endpoint():
+            return {"message": "test"}
+
+        response = TestClient(app).get("/test")
+        sink.close()
+
+        records = [json.loads(line) for line in log_path.read_text().splitlines()]
+        assert [r["event"] for r in records] == ["Incoming request", "Request completed"]
+        assert records[0]["request_id"] == response.headers["X-Request-ID"]
+        assert records[1]["status_code"] == 200
+
     def test_client_ip_extraction_with_forwarded_header(self):
         """Test client IP extraction with X-Forwarded-For header."""
         middleware = RequestLoggingMiddleware(None)
@@ -190,6 +213,25 @@ class TestRateLimitingMiddleware:
         assert response.status_code == 429
         assert "Retry-After" in response.headers
 
+    def test_uses_limiter_from_app(self):
+        """A limiter built by the app is the one hit, and closing it stops its expiry thread."""
+        config = RateLimitConfig(calls=2, period=60, algorithm="token_bucket")
+        limiter = create_limiter(config)
+        app = FastAPI()
+        app.add_middleware(RateLimitingMiddleware, config=config, limiter=limiter)
+
+        @app.get("/test")
+        async def test_endpoint():
+            return {"message": "test"}
+
+        client = TestClient(app)
+        assert [client.get("/test").status_code for _ in range(3)] == [200, 200, 429]
+
+        thread = limiter._thread
+        assert thread.is_alive()
+        asyncio.run(limiter.close())
+        assert not thread.is_alive()
+
     def test_rate_limit_config_validation(self):
         """Test RateLimitConfig validation."""
         config = RateLimitConfig(calls=100, period=60)
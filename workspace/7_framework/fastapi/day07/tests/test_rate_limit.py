@@ -0,0 +1,226 @@
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.rate_limit import (
+    RateLimiter,
+    RateLimitStore,
+    MemoryStore,
+    SQLiteStore,
+    RedisStore,
+    create_store,
+    token_bucket_step,
+    sliding_window_step
+)
+from src.middleware import RateLimitingMiddleware, RateLimitConfig
+
+
+class TestTokenBucket:
+    """Test cases for the token bucket algorithm."""
+
+    @pytest.mark.asyncio
+    async def test_allows_burst_then_blocks(self):
+        limiter = RateLimiter(calls=3, period=60, algorithm="token_bucket")
+        decisions = [await limiter.hit("client", now=1000.0) for _ in range(4)]
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+        # one token comes back every 20 seconds
+        assert decisions[3].retry_after == 20
+        await limiter.close()
+
+    @pytest.mark.asyncio
+    async def test_refills_over_time(self):
+        limiter = RateLimiter(calls=3, period=60, algorithm="token_bucket")
+        for _ in range(3):
+            await limiter.hit("client", now=1000.0)
+        assert not (await limiter.hit("client", now=1010.0)).allowed
+        assert (await limiter.hit("client", now=1020.0)).allowed
+        await limiter.close()
+
+    def test_step_never_exceeds_capacity(self):
+        allowed, tokens, wait = token_bucket_step(5, 0.0, capacity=5, rate=1.0, now=1000.0)
+        assert allowed and tokens == 4 and wait == 0
+
+
+class TestSlidingWindow:
+    """Test cases for the sliding window counter algorithm."""
+
+    @pytest.mark.asyncio
+    async def test_blocks_at_limit(self):
+        limiter = RateLimiter(calls=2, period=60, algorithm="sliding_window")
+        assert (await limiter.hit("client", now=600.0)).allowed
+        assert (await limiter.hit("client", now=601.0)).allowed
+        decision = await limiter.hit("client", now=602.0)
+        assert not decision.allowed
+        assert decision.retry_after == 58
+        await limiter.close()
+
+    def test_previous_window_is_weighted(self):
+        # 10 requests in the previous window, 30% of it still overlaps: estimate 3 + current
+        allowed, window, current, previous, estimated, wait = sliding_window_step(
+            window=9, current=10, previous=0, limit=5, period=60, now=642.0
+        )
+        assert window == 10 and previous == 10
+        assert allowed and estimated == pytest.approx(4.0)
+
+    @pytest.mark.asyncio
+    async def test_clients_are_independent(self):
+        limiter = RateLimiter(calls=1, period=60, algorithm="sliding_window")
+        assert (await limiter.hit("a", now=600.0)).allowed
+        assert not (await limiter.hit("a", now=600.0)).allowed
+        assert (await limiter.hit("b", now=600.0)).allowed
+        await limiter.close()
+
+    def test_unknown_algorithm(self):
+        with pytest.raises(ValueError):
+            RateLimiter(calls=1, period=60, algorithm="leaky")
+
+
+class TestStores:
+    """Test cases for the storage backends."""
+
+    @pytest.mark.asyncio
+    async def test_memory_store_expires_idle_clients_oldest_first(self):
+        store = MemoryStore()
+        await store.token_bucket("old", 5, 1.0, now=100.0)
+        await store.token_bucket("active", 5, 1.0, now=100.0)
+        await store.token_bucket("active", 5, 1.0, now=200.0)  # touching moves it to the end
+        assert store.expire(idle_before=150.0, batch=10) == 1
+        assert list(store.states) == ["active"]
+
+    @pytest.mark.asyncio
+    async def test_memory_store_expire_respects_batch(self):
+        store = MemoryStore()
+        for i in range(5):
+            await store.sliding_window(f"client-{i}", 10, 60, now=100.0)
+        assert store.expire(idle_before=150.0, batch=2) == 2
+        assert len(store.states) == 3
+
+    @pytest.mark.asyncio
+    async def test_sqlite_store_is_shared_between_instances(self, tmp_path):
+        """Two stores on the same file behave like two workers sharing limits."""
+        path = str(tmp_path / "limits.db")
+        worker_a = RateLimiter(calls=2, period=60, algorithm="token_bucket", store=SQLiteStore(path))
+        worker_b = RateLimiter(calls=2, period=60, algorithm="token_bucket", store=SQLiteStore(path))
+        assert (await worker_a.hit("client", now=1000.0)).allowed
+        assert (await worker_b.hit("client", now=1000.0)).allowed
+        assert not (await worker_a.hit("client", now=1000.0)).allowed
+        await worker_a.close()
+        await worker_b.close()
+
+    @pytest.mark.asyncio
+    async def test_sqlite_store_expire(self, tmp_path):
+        store = SQLiteStore(str(tmp_path / "limits.db"))
+        await store.sliding_window("old", 10, 60, now=100.0)
+        await store.sliding_window("new", 10, 60, now=500.0)
+        assert store.expire(idle_before=300.0, batch=100) == 1
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_redis_store(self):
+        redis = pytest.importorskip("redis.asyncio")
+        client = redis.Redis()
+        try:
+            await client.ping()
+        except redis.ConnectionError:
+            pytest.skip("Redis is not running")
+        await client.delete("ratelimit-test:client")
+        limiter = RateLimiter(calls=2, period=60, algorithm="sliding_window",
+                              store=RedisStore(client, prefix="ratelimit-test:"))
+        assert [(await limiter.hit("client", now=600.0)).allowed for _ in range(3)] == [True, True, False]
+        await limiter.close()
+
+    def test_create_store(self, tmp_path):
+        assert isinstance(create_store("memory"), MemoryStore)
+        assert isinstance(create_store(f"sqlite:///{tmp_path / 'limits.db'}"), SQLiteStore)
+        with pytest.raises(ValueError):
+            create_store("postgres://localhost")
+
+
+class TestRedisLuaScripts:
+    """The Lua scripts run by fakeredis's embedded Lua, checked against the Python steps."""
+
+    @pytest.fixture
+    def client(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        return fakeredis.aioredis.FakeRedis()
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_matches_python(self, client):
+        store = RedisStore(client)
+        tokens, updated_at = 3.0, 1000.0
+        for now in (1000.0, 1000.0, 1000.0, 1000.0, 1010.0, 1020.0, 1021.0, 1200.0):
+            expected = token_bucket_step(tokens, updated_at, 3, 0.05, now)
+            tokens, updated_at = expected[1], now
+            assert await store.token_bucket("client", 3, 0.05, now) == pytest.approx(expected)
+        assert 0 < await client.pttl("ratelimit:client") <= 121_000
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_sliding_window_matches_python(self, client):
+        store = RedisStore(client)
+        window, current, previous = 10, 0.0, 0.0
+        for now in (600.0, 601.0, 602.0, 642.0, 642.5, 690.0, 700.0, 1000.0):
+            allowed, window, current, previous, estimated, wait = sliding_window_step(
+                window, current, previous, 2, 60, now
+            )
+            assert await store.sliding_window("client", 2, 60, now) == pytest.approx((allowed, estimated, wait))
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_limiter_with_redis_store(self, client):
+        limiter = RateLimiter(calls=2, period=60, algorithm="token_bucket", store=RedisStore(client, prefix="t:"))
+        decisions = [await limiter.hit("client", now=1000.0) for _ in range(3)]
+        assert [d.allowed for d in decisions] == [True, True, False]
+        assert decisions[2].retry_after == 30
+        assert await client.exists("t:client")
+        await limiter.close()
+
+
+class TestStoreInterface:
+    """Test cases for the RateLimitStore base class."""
+
+    def test_store_must_implement_both_algorithms(self):
+        class Incomplete(RateLimitStore):
+            async def token_bucket(self, key, capacity, rate, now):
+                return True, 0.0, 0.0
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    @pytest.mark.asyncio
+    async def test_sqlite_store_runs_off_the_event_loop(self, tmp_path, monkeypatch):
+        store = SQLiteStore(str(tmp_path / "limits.db"))
+        threads = []
+        update = store._update
+        monkeypatch.setattr(store, "_update", lambda *args: threads.append(threading.current_thread()) or update(*args))
+        await store.token_bucket("client", 5, 1.0, now=100.0)
+        assert threads and threads[0] is not threading.current_thread()
+        await store.close()
+
+
+class TestRateLimitingMiddlewareAlgorithms:
+    """The middleware with the O(1) algorithms."""
+
+    @pytest.mark.parametrize("algorithm", ["token_bucket", "sliding_window"])
+    def test_blocks_requests_exceeding_limit(self, algorithm):
+        app = FastAPI()
+        app.add_middleware(RateLimitingMiddleware, config=RateLimitConfig(calls=2, period=60, algorithm=algorithm))
+
+        @app.get("/test")
+        async def test_endpoint():
+            return {"message": "test"}
+
+        client = TestClient(app)
+        statuses = [client.get("/test").status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        response = client.get("/test")
+        assert response.json()["error"] == "Rate limit exceeded"
+        assert int(response.headers["Retry-After"]) >= 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,17 @@
+import pytest
+
+from src.main import ItemDatabase
+
+
+class TestItemDatabasePages:
+    """Test cases for the /items/ filters backed by the repository."""
+
+    def test_price_range_in_id_order(self):
+        db = ItemDatabase()
+        assert [item["id"] for item in db.get_page(min_price=12, max_price=25)] == [2, 3]
+        assert [item["id"] for item in db.get_page(after=1, limit=1)] == [2]
+        assert [item["id"] for item in db.get_page(min_price=12, after=2)] == [3]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,99 @@
+"""
+Per-page latency of OFFSET vs keyset (cursor) pagination in SQLite.
+
+Fills a temporary SQLite database with 1,000,000 subscriptions and fetches pages
+of 100 at increasing depths, ordered by id and by (created_at, id):
+
+"offset":  get_all_subscriptions / ORDER BY ... OFFSET page * 100
+"keyset":  get_subscriptions_page with the cursor of the previous page
+
+Run from the day09 directory:
+    python benchmarks/pagination_benchmark.py
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database.database import Base  # noqa: E402
+from newsletter.models import NewsletterSubscription  # noqa: E402
+from newsletter.pagination import encode_cursor  # noqa: E402
+from newsletter.utils import get_all_subscriptions, get_subscriptions_page  # noqa: E402
+
+ROWS = 1_000_000
+PAGE_SIZE = 100
+PAGES = (1, 100, 1_000, 10_000)
+REPEAT = 5
+
+
+def fill(engine) -> None:
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2024, 1, 1)
+    batch = 50_000
+    with engine.begin() as connection:
+        for offset in range(0, ROWS, batch):
+            connection.execute(insert(NewsletterSubscription), [
+                # a few rows share each timestamp, so the id tie-break matters
+                {"email": f"user{i}@example.com", "is_active": True, "created_at": start + timedelta(seconds=i // 3)}
+                for i in range(offset, min(offset + batch, ROWS))
+            ])
+
+
+def best_of(func) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        start = time.perf_counter()
+        fill(engine)
+        print(f"{ROWS} rows inserted in {time.perf_counter() - start:.1f} s, pages of {PAGE_SIZE}")
+        db = sessionmaker(bind=engine)()
+
+        for sort_by in ("id", "created_at"):
+            column = getattr(NewsletterSubscription, sort_by)
+            print(f"--- ORDER BY {sort_by}{', id' if sort_by != 'id' else ''} ---")
+            for page in PAGES:
+                skip = (page - 1) * PAGE_SIZE
+                if sort_by == "id":
+                    def offset_page():
+                        return get_all_subscriptions(db, skip, PAGE_SIZE)
+                else:
+                    def offset_page():
+                        return db.query(NewsletterSubscription).order_by(
+                            column, NewsletterSubscription.id
+                        ).offset(skip).limit(PAGE_SIZE).all()
+
+                # the cursor a client would hold after reading the previous page
+                cursor = None
+                if skip:
+                    last = db.query(NewsletterSubscription).order_by(
+                        column, NewsletterSubscription.id
+                    ).offset(skip - 1).limit(1).one()
+                    cursor = encode_cursor(sort_by, False, getattr(last, sort_by), last.id)
+
+                def keyset_page():
+                    return get_subscriptions_page(db, PAGE_SIZE, cursor, sort_by)
+
+                assert [row.id for row in offset_page()] == [row.id for row in keyset_page()[0]]
+                db.expire_all()
+                print(f"page {page:>6}:  offset {best_of(offset_page):8.2f} ms   keyset {best_of(keyset_page):6.2f} ms")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
 from database.database import Base
 from datetime import datetime
 
@@ -8,3 +8,6 @@ class NewsletterSubscription(Base):
     email = Column(String(255) , unique=True , nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.now)
+
+    # lets keyset pagination by created_at seek instead of scanning
+    __table_args__ = (Index("ix_newsletter_subscriptions_created_at_id", "created_at", "id"),)
@@ -0,0 +1,97 @@
+"""
+Keyset (cursor) pagination for SQLAlchemy queries.
+
+`OFFSET n` makes the database read and throw away n rows before the page starts,
+so deep pages get slower and slower. Keyset pagination remembers where the
+previous page ended, the (sort value, id) of its last row, and asks for the rows
+after it:
+
+    WHERE created_at >= :value AND (created_at > :value OR id > :id)
+    ORDER BY created_at, id
+    LIMIT :limit
+
+With an index on (created_at, id) the database seeks straight to the position,
+so page 10,000 costs the same as page 1.
+
+The position is handed to clients as an opaque cursor: URL-safe base64 of a
+small JSON document holding the sort field, the direction and the position.
+"""
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Optional, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+import base64
+import json
+
+
+class InvalidCursorError(ValueError):
+    """The cursor is malformed or was issued for a different sort order."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "datetime" in value:
+            return datetime.fromisoformat(value["datetime"])
+        if "date" in value:
+            return date.fromisoformat(value["date"])
+        raise InvalidCursorError("Malformed cursor")
+    return value
+
+
+def encode_cursor(sort_by: str, descending: bool, value: Any, key: Any) -> str:
+    """A cursor pointing just after the row with `sort_by` = value and id = key."""
+    payload = json.dumps([sort_by, descending, _encode_value(value), key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, descending: bool) -> Tuple[Any, Any]:
+    """
+    The (sort value, id) position stored in `cursor`.
+
+    Raises InvalidCursorError if the cursor cannot be decoded or was issued for a
+    different sort field or direction than the current request.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, cursor_descending, value, key = json.loads(payload)
+        value = _decode_value(value)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+    if cursor_sort_by != sort_by or cursor_descending != descending:
+        raise InvalidCursorError("Cursor does not match the requested sort order")
+    return value, key
+
+
+def keyset_filter(query: Query, sort_column, id_column, after: Optional[Tuple[Any, Any]],
+                  descending: bool = False) -> Query:
+    """
+    Order `query` by (sort_column, id_column) and keep only the rows after the
+    position `after` = (sort value, id); all rows when `after` is None.
+    """
+    if sort_column is id_column:
+        if after is not None:
+            query = query.filter(id_column < after[1] if descending else id_column > after[1])
+        return query.order_by(id_column.desc() if descending else id_column)
+
+    if after is not None:
+        value, key = after
+        # "a >= v AND (a > v OR id > k)" rather than "a > v OR (a = v AND id > k)": the
+        # leading range on the sort column is what lets the database seek in the index
+        if descending:
+            query = query.filter(and_(sort_column <= value, or_(sort_column < value, id_column < key)))
+        else:
+            query = query.filter(and_(sort_column >= value, or_(sort_column > value, id_column > key)))
+    if descending:
+        return query.order_by(sort_column.desc(), id_column.desc())
+    return query.order_by(sort_column, id_column)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
+from typing import Optional
 from database.database import get_db
 from .schemas import NewsletterSubscriptionBase , NewsletterSubscriptionCreate , NewsletterSubscriptionResponse
-from .utils import create_subscription , get_all_subscriptions , delete_subscription
+from .utils import create_subscription , get_all_subscriptions , get_subscriptions_page , delete_subscription
 router = APIRouter(prefix="/newsletter", tags=["newsletter"])
 
 @router.post("/subscribe", response_model=NewsletterSubscriptionResponse)
@@ -15,11 +16,21 @@ def subscribe(
 
 @router.get("/subscriptions", response_model=list[NewsletterSubscriptionResponse])
 def get_subscriptions(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    sort_by: str = Query("id", pattern="^(id|created_at)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
     db: Session = Depends(get_db)
 ):
-    return get_all_subscriptions(db, skip, limit)
+    # skip keeps the old OFFSET paging; otherwise page with cursors (X-Next-Cursor header)
+    if skip:
+        return get_all_subscriptions(db, skip, limit)
+    subscriptions, next_cursor = get_subscriptions_page(db, limit, cursor, sort_by, order == "desc")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return subscriptions
 
 @router.delete("/unsubscribe/{email}")
 def unsubscribe(email: str, db: Session = Depends(get_db)):
@@ -1,6 +1,14 @@
 from sqlalchemy.orm import Session
 from . import models, schemas
+from .pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_filter
 from fastapi import HTTPException, status
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+SORT_COLUMNS = {
+    "id": (models.NewsletterSubscription.id, int),
+    "created_at": (models.NewsletterSubscription.created_at, datetime),
+}
 
 def create_subscription(db: Session, subscription: schemas.NewsletterSubscriptionCreate):
     db_subscription = models.NewsletterSubscription(
@@ -24,7 +32,42 @@ def get_subscription(db: Session, email: str):
     ).first()
 
 def get_all_subscriptions(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.NewsletterSubscription).offset(skip).limit(limit).all()
+    return db.query(models.NewsletterSubscription).order_by(
+        models.NewsletterSubscription.id
+    ).offset(skip).limit(limit).all()
+
+def get_subscriptions_page(
+    db: Session,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort_by: str = "id",
+    descending: bool = False
+) -> Tuple[List[models.NewsletterSubscription], Optional[str]]:
+    """
+    One page of subscriptions after `cursor`, and the cursor for the next page
+    (None on the last page). Unlike OFFSET, the cost does not grow with the depth.
+    """
+    sort_column, value_type = SORT_COLUMNS[sort_by]
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort_by, descending)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {e}")
+        if not isinstance(after[0], value_type) or not isinstance(after[1], int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    query = keyset_filter(
+        db.query(models.NewsletterSubscription), sort_column, models.NewsletterSubscription.id,
+        after, descending
+    )
+    # one extra row tells us whether there is a next page
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort_by, descending, getattr(last, sort_by), last.id)
 
 def delete_subscription(db: Session, email: str):
     subscription = get_subscription(db, email)
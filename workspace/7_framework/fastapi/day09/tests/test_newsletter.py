@@ -159,3 +159,45 @@ def test_unsubscribe_not_found(db_session):
     response = client.delete(f"/newsletter/unsubscribe/{non_existent_email}")
     assert response.status_code == 404
     assert response.json()["detail"] == "Subscription not found"
+
+
+def test_subscriptions_cursor_pagination(db_session):
+    """
+    Test Case 6: Cursor Pagination
+    - Description: Verifies that following the X-Next-Cursor header walks through
+      every subscription exactly once, newest first, with no header on the last page.
+    - Expected Outcome: Three pages of 2, 2 and 1 subscriptions covering all five emails.
+    """
+    emails = [f"user{i}@example.com" for i in range(5)]
+    for email in emails:
+        client.post("/newsletter/subscribe", json={"email": email})
+
+    seen = []
+    url = "/newsletter/subscriptions?limit=2&sort_by=created_at&order=desc"
+    response = client.get(url)
+    while True:
+        assert response.status_code == 200
+        seen.append([item["email"] for item in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        response = client.get(f"{url}&cursor={cursor}")
+
+    assert [len(page) for page in seen] == [2, 2, 1]
+    assert [email for page in seen for email in page] == emails[::-1]
+
+
+def test_subscriptions_invalid_cursor(db_session):
+    """
+    Test Case 7: Invalid Cursor
+    - Description: Verifies that a malformed cursor, or one issued for another
+      sort order, is rejected.
+    - Expected Outcome: 400 Bad Request in both cases.
+    """
+    for email in ("a@example.com", "b@example.com"):
+        client.post("/newsletter/subscribe", json={"email": email})
+    cursor = client.get("/newsletter/subscriptions?limit=1").headers["x-next-cursor"]
+
+    assert client.get("/newsletter/subscriptions?cursor=garbage").status_code == 400
+    response = client.get(f"/newsletter/subscriptions?sort_by=created_at&cursor={cursor}")
+    assert response.status_code == 400
@@ -0,0 +1,136 @@
+"""
+Cache layer benchmark. Runs offline: nothing here needs Redis.
+
+Measures:
+  1. backend operations: get (hit) and set per second for fastapi-cache's
+     InMemoryBackend, LocalBackend, SQLiteBackend and TieredBackend (L1 + SQLite)
+  2. a burst of concurrent requests to a cold @cache(expire=30) endpoint whose
+     miss takes MISS_SECONDS:
+       "blocking":              the old /cached-data: time.sleep() inside async def
+       "threadpool":            the slow work in the threadpool, without coalescing
+       "threadpool + coalesce": the new /cached-data
+     reporting how often the slow work ran, how long the burst took, and how long
+     a request to another endpoint, sent 10 ms into the burst, took to complete
+
+Run from the day10 directory:
+    python benchmarks/cache_benchmark.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.decorator import cache
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from cache_layer import LocalBackend, SQLiteBackend, TieredBackend, coalesce  # noqa: E402
+
+KEYS = 1000
+OPERATIONS = 50_000
+BURST = 50
+MISS_SECONDS = 0.05
+
+
+async def ops_per_second(backend, operation, runs: int) -> float:
+    start = time.perf_counter()
+    for i in range(runs):
+        await operation(backend, f"key{i % KEYS}")
+    return runs / (time.perf_counter() - start)
+
+
+async def backend_benchmark(directory: str) -> None:
+    value = b'{"detail":"This is some cached data","timestamp":1700000000.0}'
+
+    async def get(backend, key):
+        assert (await backend.get_with_ttl(key))[1] is not None
+
+    async def set_(backend, key):
+        await backend.set(key, value, 30)
+
+    backends = {
+        "InMemoryBackend": InMemoryBackend(),
+        "LocalBackend": LocalBackend(),
+        "SQLiteBackend": SQLiteBackend(os.path.join(directory, "l2.db")),
+        "Tiered (L1 + SQLite)": TieredBackend(LocalBackend(), SQLiteBackend(os.path.join(directory, "tiered.db"))),
+    }
+    print(f"backend operations, {KEYS} keys, {OPERATIONS} operations")
+    for label, backend in backends.items():
+        # SQLite goes through the threadpool on every call; fewer operations keep it short
+        runs = OPERATIONS if "SQLite" not in label else OPERATIONS // 10
+        sets = await ops_per_second(backend, set_, runs)
+        gets = await ops_per_second(backend, get, runs)
+        print(f"  {label:<22} set {sets:10.0f}/s   get {gets:10.0f}/s")
+        if hasattr(backend, "close"):
+            await backend.close()
+
+
+def build_app(mode: str):
+    app = FastAPI()
+    computed = []
+
+    def slow_work():
+        computed.append(1)
+        time.sleep(MISS_SECONDS)
+        return {"detail": "This is some cached data", "timestamp": time.time()}
+
+    if mode == "threadpool + coalesce":
+        @app.get("/cached-data")
+        @cache(expire=30)
+        @coalesce()
+        async def new_cached_data():
+            return await run_in_threadpool(slow_work)
+    elif mode == "threadpool":
+        @app.get("/cached-data")
+        @cache(expire=30)
+        async def threadpool_cached_data():
+            return await run_in_threadpool(slow_work)
+    else:
+        @app.get("/cached-data")
+        @cache(expire=30)
+        async def old_cached_data():
+            return slow_work()
+
+    @app.get("/")
+    async def read_root():
+        return {"status": "API is running"}
+
+    return app, computed
+
+
+async def burst(mode: str) -> tuple:
+    FastAPICache.init(LocalBackend(), prefix="bench")
+    app, computed = build_app(mode)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def other_request():
+            await asyncio.sleep(0.01)  # arrive while the misses are being computed
+            await client.get("/")
+            # from when it was due: a blocked event loop also delays sending it
+            return time.perf_counter() - (start + 0.01)
+
+        start = time.perf_counter()
+        *responses, waited = await asyncio.gather(*(client.get("/cached-data") for _ in range(BURST)), other_request())
+        elapsed = time.perf_counter() - start
+    assert all(response.status_code == 200 for response in responses)
+    return len(computed), elapsed, waited
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        await backend_benchmark(directory)
+
+    print(f"{BURST} concurrent requests to a cold endpoint, {MISS_SECONDS * 1000:.0f} ms per miss")
+    for mode in ("blocking", "threadpool", "threadpool + coalesce"):
+        computed, elapsed, waited = await burst(mode)
+        print(f"  {mode:<22} computed {computed:3d}x   burst {elapsed * 1000:7.1f} ms"
+              f"   GET / waited {waited * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""
+Job queue throughput benchmark.
+
+Measures:
+  1. enqueue rate (one transaction per job vs. enqueue_many)
+  2. dequeue rate: how fast the workers drain sync and async no-op jobs
+  3. request latency of a small endpoint while the queue is idle vs. busy
+
+Run from the day10 directory:
+    python benchmarks/job_queue_benchmark.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from job_queue import JobQueue, SUCCEEDED  # noqa: E402
+
+JOBS = 5000
+REQUESTS = 500
+
+
+def build_queue(directory: str, name: str) -> JobQueue:
+    queue = JobQueue(db_path=os.path.join(directory, f"{name}.db"), poll_interval=0.01)
+
+    @queue.task()
+    def sync_noop(n: int):
+        return n
+
+    @queue.task()
+    async def async_noop(n: int):
+        return n
+
+    @queue.task()
+    def sync_work(n: int):
+        # a little CPU work that holds the GIL, like formatting a report
+        return sum(i * i for i in range(2000))
+
+    return queue
+
+
+def bench_enqueue(queue: JobQueue) -> None:
+    start = time.perf_counter()
+    for i in range(JOBS):
+        queue.enqueue("sync_noop", {"n": i})
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for offset in range(0, JOBS, 500):
+        queue.enqueue_many("sync_noop", [{"n": i} for i in range(offset, offset + 500)])
+    batched = time.perf_counter() - start
+
+    print(f"enqueue       {JOBS / single:>10.0f} jobs/s")
+    print(f"enqueue_many  {JOBS / batched:>10.0f} jobs/s")
+
+
+async def drain(queue: JobQueue, name: str) -> float:
+    queue.enqueue_many(name, [{"n": i} for i in range(JOBS)])
+    start = time.perf_counter()
+    await queue.start()
+    while queue.stats().get(SUCCEEDED, 0) < JOBS:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    await queue.stop()
+    return elapsed
+
+
+async def request_latencies(app: FastAPI) -> list:
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            await client.get("/")
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list) -> None:
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<28} p50 {p50:6.2f} ms   p99 {p99:6.2f} ms")
+
+
+async def bench_latency(queue: JobQueue) -> None:
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return {"status": "ok"}
+
+    report("GET / (queue idle)", await request_latencies(app))
+
+    queue.enqueue_many("sync_work", [{"n": i} for i in range(JOBS)])
+    await queue.start()
+    report("GET / (queue draining)", await request_latencies(app))
+    await queue.stop()
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        queue = build_queue(directory, "enqueue")
+        bench_enqueue(queue)
+        queue.close()
+
+        for name in ("sync_noop", "async_noop"):
+            queue = build_queue(directory, name)
+            elapsed = asyncio.run(drain(queue, name))
+            print(f"dequeue {name:<10} {JOBS / elapsed:>8.0f} jobs/s")
+            queue.close()
+
+        queue = build_queue(directory, "latency")
+        asyncio.run(bench_latency(queue))
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
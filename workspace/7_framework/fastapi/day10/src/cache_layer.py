@@ -0,0 +1,339 @@
+import asyncio
+import functools
+import heapq
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.types import Backend
+from redis import asyncio as aioredis
+
+# --- Pluggable Cache Layer for fastapi-cache ---
+# fastapi-cache talks to a single Backend. This module adds backends that work
+# without Redis, and combines them:
+#   - LocalBackend: in-process LRU with per-key expiry, bounded by entries and bytes
+#   - SQLiteBackend: on-disk cache that survives a restart, queried in the threadpool
+#   - TieredBackend: LocalBackend as L1 in front of Redis or SQLite as L2; when L2
+#     fails, it is skipped for a while and L1 keeps serving
+# `coalesce` makes concurrent cache misses on one endpoint compute the result once.
+
+logger = logging.getLogger(__name__)
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache (expires_at);
+"""
+
+
+def _remaining(expires_at: Optional[float], now: float) -> int:
+    """Seconds left as reported by get_with_ttl; -1 means no expiry, like Redis TTL."""
+    return -1 if expires_at is None else max(math.ceil(expires_at - now), 0)
+
+
+class LocalBackend(Backend):
+    """
+    In-process cache: an LRU of (value, expiry) with an expiry heap.
+
+    Entries are evicted least recently used first once there are more than
+    `max_entries` of them or their values take more than `max_bytes`. Expired
+    entries are dropped when they are read and, through the heap, whenever a
+    value is stored, so they never take space from live ones.
+
+    All methods run on the event loop without awaiting, so no lock is needed.
+    """
+
+    def __init__(self, max_entries: int = 10_000, max_bytes: Optional[int] = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        # (expires_at, key); an item is stale once its key was overwritten or deleted
+        self._expiry_heap: list = []
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # not __len__: FastAPICache checks the backend's truthiness, and an empty cache would fail it
+    @property
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: str, now: float) -> Optional[Tuple[bytes, Optional[float]]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def _expire(self, now: float) -> None:
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+        # overwritten keys leave stale items behind; rebuild before they pile up
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [(entry[1], key) for key, entry in self._entries.items() if entry[1] is not None]
+            heapq.heapify(self._expiry_heap)
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        now = time.monotonic()
+        entry = self._lookup(key, now)
+        if entry is None:
+            return 0, None
+        return _remaining(entry[1], now), entry[0]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._lookup(key, time.monotonic())
+        return None if entry is None else entry[0]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        now = time.monotonic()
+        self._expire(now)
+        if key in self._entries:
+            self._remove(key)
+        if self.max_bytes is not None and len(value) > self.max_bytes:
+            return
+        expires_at = now + expire if expire else None
+        self._entries[key] = (value, expires_at)
+        self._bytes += len(value)
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        if namespace:
+            keys = [name for name in self._entries if name.startswith(namespace)]
+        elif key:
+            keys = [key] if key in self._entries else []
+        else:
+            keys = list(self._entries)
+        for name in keys:
+            self._remove(name)
+        return len(keys)
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteBackend(Backend):
+    """
+    On-disk cache in a SQLite file (WAL mode), for an L2 without Redis.
+
+    Queries run in the threadpool so the event loop never waits on the disk.
+    Expiry times are wall-clock, so entries keep their TTL across restarts;
+    expired rows are skipped on read and deleted every `purge_every` writes.
+    """
+
+    def __init__(self, db_path: str = "cache.db", purge_every: int = 256):
+        self.db_path = db_path
+        self.purge_every = purge_every
+        self._writes = 0
+        # one connection shared by the threadpool workers
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL only fsyncs at checkpoints: a crash can lose recent entries, which a cache can afford
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SQLITE_SCHEMA)
+
+    def _get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now),
+            ).fetchone()
+        if row is None:
+            return 0, None
+        return _remaining(row[1], now), row[0]
+
+    def _set(self, key: str, value: bytes, expire: Optional[int]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + expire if expire else None),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def _clear(self, namespace: Optional[str], key: Optional[str]) -> int:
+        with self._lock:
+            if namespace:
+                cursor = self._conn.execute(
+                    "DELETE FROM cache WHERE substr(key, 1, length(?1)) = ?1", (namespace,)
+                )
+            elif key:
+                cursor = self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            else:
+                cursor = self._conn.execute("DELETE FROM cache")
+            return cursor.rowcount
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        return await run_in_threadpool(self._get_with_ttl, key)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        await run_in_threadpool(self._set, key, value, expire)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        return await run_in_threadpool(self._clear, namespace, key)
+
+    def _close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    async def close(self) -> None:
+        # waits for a query that is still running in the threadpool
+        await run_in_threadpool(self._close)
+
+
+class TieredBackend(Backend):
+    """
+    L1 (in-process) in front of a shared L2 (Redis or SQLite).
+
+    Reads try L1 first. An L2 hit is copied into L1 for what is left of its
+    TTL, at most `l1_ttl` seconds, so other processes' writes show up in L1
+    within that time. Writes and clears go to both tiers.
+
+    If L2 raises (Redis is down), it is skipped for `retry_after` seconds and
+    the cache keeps working from L1 alone.
+    """
+
+    def __init__(self, l1: LocalBackend, l2: Optional[Backend] = None, l1_ttl: int = 60, retry_after: float = 30.0):
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+        self.retry_after = retry_after
+        self._l2_down_until = 0.0
+
+    def _l2_available(self) -> bool:
+        return self.l2 is not None and time.monotonic() >= self._l2_down_until
+
+    def _l2_failed(self, operation: str) -> None:
+        self._l2_down_until = time.monotonic() + self.retry_after
+        logger.warning("L2 cache %s failed; using the in-process cache only for %.0f s",
+                       operation, self.retry_after, exc_info=True)
+
+    def _l1_expire(self, ttl: Optional[int]) -> int:
+        return self.l1_ttl if ttl is None or ttl < 0 else min(ttl, self.l1_ttl)
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        ttl, value = await self.l1.get_with_ttl(key)
+        if value is not None or not self._l2_available():
+            return ttl, value
+        try:
+            ttl, value = await self.l2.get_with_ttl(key)
+        except Exception:
+            self._l2_failed("read")
+            return 0, None
+        if value is not None and ttl != 0:
+            await self.l1.set(key, value, self._l1_expire(ttl))
+        return ttl, value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        await self.l1.set(key, value, self._l1_expire(expire))
+        if self._l2_available():
+            try:
+                await self.l2.set(key, value, expire)
+            except Exception:
+                self._l2_failed("write")
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        count = await self.l1.clear(namespace, key)
+        if self._l2_available():
+            try:
+                count = max(count, await self.l2.clear(namespace, key))
+            except Exception:
+                self._l2_failed("clear")
+        return count
+
+    async def close(self) -> None:
+        await self.l1.close()
+        if isinstance(self.l2, RedisBackend):
+            await self.l2.redis.close()
+        elif self.l2 is not None:
+            await self.l2.close()
+
+
+def build_cache_backend(url: str, l1_max_entries: int = 10_000) -> Backend:
+    """
+    Backend for a cache URL:
+        memory://               in-process only
+        redis://host[:port]     in-process L1, Redis L2
+        sqlite:///path/to.db    in-process L1, SQLite L2
+
+    Every backend returned here has an async close().
+    """
+    l1 = LocalBackend(max_entries=l1_max_entries)
+    if url.startswith("memory://"):
+        return l1
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return TieredBackend(l1, RedisBackend(aioredis.from_url(url)))
+    if url.startswith("sqlite:///"):
+        return TieredBackend(l1, SQLiteBackend(url[len("sqlite:///"):]))
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+def coalesce(key: Optional[Callable[..., Hashable]] = None):
+    """
+    Decorator for async functions: concurrent calls with the same arguments
+    share one run of the function (single flight) and get the same result or
+    exception. Put it below @cache so concurrent misses compute once.
+
+    The run is a task of its own, so a caller that disconnects does not cancel
+    it for the others. `func.coalesce_stats` counts runs and coalesced calls.
+    """
+    def decorator(func: Callable) -> Callable:
+        in_flight: Dict[Hashable, asyncio.Future] = {}
+        # a dict, so decorators that copy the wrapper's __dict__ (functools.wraps) share the counts
+        stats = {"calls": 0, "coalesced": 0}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            task = in_flight.get(call_key)
+            if task is None:
+                stats["calls"] += 1
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                in_flight[call_key] = task
+                task.add_done_callback(lambda _: in_flight.pop(call_key, None))
+            else:
+                stats["coalesced"] += 1
+            return await asyncio.shield(task)
+
+        wrapper.coalesce_stats = stats
+        return wrapper
+    return decorator
@@ -0,0 +1,380 @@
+import asyncio
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import anyio
+
+# --- Persistent Background Job Queue ---
+# FastAPI's BackgroundTasks run inside the request process and only live in memory:
+# if the server restarts, pending tasks are lost, and a heavy task still steals time
+# from the event loop. This module stores jobs in SQLite so they survive a restart
+# and runs them on a small worker pool:
+#   - sync jobs (plain `def`) run in a thread pool
+#   - async jobs (`async def`) run as asyncio tasks on the event loop
+# Several processes can share one database. A claimed job carries its worker's id and a
+# lease that the worker renews while the job runs; only jobs whose lease has run out
+# (their worker died) are handed to another worker.
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_retries INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    run_after REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority DESC, run_after, created_at);
+"""
+
+# columns added after the first version of the schema, for databases created by it
+LEASE_COLUMNS = {"owner": "TEXT", "lease_expires_at": "REAL"}
+
+
+@dataclass
+class JobDefinition:
+    """A registered job function and its retry policy."""
+    func: Callable
+    max_retries: int = 3
+    retry_backoff: float = 0.5
+
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.func)
+
+
+class UnknownJobError(Exception):
+    """Raised when a job is enqueued under a name that was never registered."""
+    pass
+
+
+class JobQueue:
+    """
+    An in-process job queue backed by SQLite in WAL mode.
+
+    Jobs are registered by name with the `task` decorator so they can be looked up again
+    after a restart. A single dispatcher coroutine claims ready jobs (highest priority
+    first), runs them and writes their outcome back in batches.
+
+    Each claimed job is leased to this queue's `worker_id` for `lease_seconds`; a
+    heartbeat renews the leases of running jobs every `lease_seconds / 3`.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "jobs.db",
+        thread_workers: int = 4,
+        async_concurrency: int = 100,
+        poll_interval: float = 0.5,
+        claim_batch_size: int = 32,
+        flush_interval: float = 0.05,
+        lease_seconds: float = 30.0,
+        worker_id: Optional[str] = None,
+    ):
+        self.db_path = db_path
+        self.thread_workers = thread_workers
+        self.async_concurrency = async_concurrency
+        self.poll_interval = poll_interval
+        self.claim_batch_size = claim_batch_size
+        self.flush_interval = flush_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._registry: Dict[str, JobDefinition] = {}
+        # the connection is shared by worker threads: the queue's own transactions and sync endpoints
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._running: set = set()
+        # finished jobs waiting to be written back: (status, result, error, run_after, job_id)
+        self._pending_updates: List[Tuple] = []
+
+    # --- Storage ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers (GET /jobs/{id}) run while a writer is committing
+        conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL only fsyncs at checkpoints; a power loss can lose the last commits, a crash cannot
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in LEASE_COLUMNS.items():
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        return conn
+
+    def _recover(self) -> int:
+        """
+        Requeues running jobs whose lease has expired: their worker died without
+        finishing them. Jobs that another live worker is running are left alone.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (QUEUED, now, RUNNING, now),
+            )
+        if cursor.rowcount:
+            self._notify()
+        return cursor.rowcount
+
+    def _renew_leases(self) -> None:
+        """Extends the lease of every job this worker is still running."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE status = ? AND owner = ?",
+                (now + self.lease_seconds, RUNNING, self.worker_id),
+            )
+
+    # --- Registration and enqueueing ---
+
+    def task(self, name: Optional[str] = None, max_retries: int = 3, retry_backoff: float = 0.5):
+        """Decorator that registers a sync or async function as a job."""
+        def decorator(func: Callable) -> Callable:
+            self._registry[name or func.__name__] = JobDefinition(func, max_retries, retry_backoff)
+            return func
+        return decorator
+
+    def enqueue(self, name: str, payload: Optional[Dict[str, Any]] = None, priority: int = 0) -> str:
+        """Stores a job and returns its id. Higher priority jobs run first."""
+        return self.enqueue_many(name, [payload or {}], priority)[0]
+
+    def enqueue_many(self, name: str, payloads: List[Dict[str, Any]], priority: int = 0) -> List[str]:
+        """Stores several jobs of the same kind in a single transaction."""
+        if name not in self._registry:
+            raise UnknownJobError(f"No job registered under the name '{name}'")
+
+        definition = self._registry[name]
+        now = time.time()
+        rows = [
+            (uuid.uuid4().hex, name, json.dumps(payload), priority, QUEUED,
+             definition.max_retries, now, now, now)
+            for payload in payloads
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO jobs (id, name, payload, priority, status, max_retries, "
+                "run_after, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("COMMIT")
+
+        self._notify()
+        return [row[0] for row in rows]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the current state of a job, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def _notify(self) -> None:
+        """Wakes the dispatcher up; safe to call from any thread."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # --- Worker pool ---
+
+    async def start(self) -> None:
+        """Starts the dispatcher; call it from the application's lifespan."""
+        await anyio.to_thread.run_sync(self._recover)
+        self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="job")
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._flusher = asyncio.create_task(self._flush_loop())
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Waits up to `timeout` seconds for running jobs, writes their results and
+        stops the workers. Jobs still running after that are abandoned: they stay
+        marked as running and another worker picks them up once their lease expires.
+        """
+        # the heartbeat keeps running until the jobs are done, so their leases stay valid
+        if self._flusher is not None:
+            self._flusher.cancel()
+        if self._dispatcher is not None:
+            # not cancelled: jobs claimed by a transaction in progress must still be run
+            self._stopping = True
+            self._wakeup.set()
+            await self._dispatcher
+        stuck = set()
+        if self._running:
+            _, stuck = await asyncio.wait(set(self._running), timeout=timeout)
+            for task in stuck:
+                # async jobs stop here; a sync job keeps its thread until it returns
+                task.cancel()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        await self._flush()
+        if self._executor is not None:
+            # do not wait for the threads of abandoned sync jobs
+            self._executor.shutdown(wait=not stuck, cancel_futures=True)
+        self._loop = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _claim(self, limit: int) -> List[sqlite3.Row]:
+        """Atomically marks up to `limit` ready jobs as running, leased to this worker, and returns them."""
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two processes never claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? AND run_after <= ? "
+                    "ORDER BY priority DESC, run_after, created_at LIMIT ?",
+                    (QUEUED, now, limit),
+                ).fetchall()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, owner = ?, "
+                        "lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                        [(RUNNING, self.worker_id, now + self.lease_seconds, now, row["id"]) for row in rows],
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    async def _dispatch_loop(self) -> None:
+        while not self._stopping:
+            # only claim as many jobs as there are free worker slots
+            capacity = self.thread_workers + self.async_concurrency
+            free = min(self.claim_batch_size, capacity - len(self._running))
+            # BEGIN IMMEDIATE may wait for another worker's write lock: keep it off the event loop
+            rows = await anyio.to_thread.run_sync(self._claim, free) if free > 0 else []
+
+            for row in rows:
+                task = asyncio.create_task(self._run(row))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            if self._stopping:
+                break
+            if len(rows) < self.claim_batch_size:
+                # nothing left or all workers busy: sleep until an enqueue, a finished job or the next poll
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(0)
+
+    async def _run(self, row: sqlite3.Row) -> None:
+        try:
+            definition = self._registry.get(row["name"])
+            if definition is None:
+                raise UnknownJobError(f"No job registered under the name '{row['name']}'")
+
+            kwargs = json.loads(row["payload"])
+            if definition.is_async:
+                result = await definition.func(**kwargs)
+            else:
+                result = await self._loop.run_in_executor(
+                    self._executor, lambda: definition.func(**kwargs)
+                )
+            self._pending_updates.append((SUCCEEDED, json.dumps(result), None, row["run_after"], row["id"]))
+        except asyncio.CancelledError:
+            # abandoned by stop(): leave the job running until its lease expires
+            raise
+        except Exception as e:
+            attempts = row["attempts"] + 1
+            if definition is not None and attempts <= row["max_retries"]:
+                # exponential backoff: 0.5s, 1s, 2s, ...
+                delay = definition.retry_backoff * (2 ** (attempts - 1))
+                self._pending_updates.append((QUEUED, None, repr(e), time.time() + delay, row["id"]))
+            else:
+                self._pending_updates.append((FAILED, None, repr(e), row["run_after"], row["id"]))
+        finally:
+            # a worker slot is free again
+            self._wakeup.set()
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await anyio.to_thread.run_sync(self._renew_leases)
+            # pick up the jobs of workers that died while this one is running
+            await anyio.to_thread.run_sync(self._recover)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
+
+    async def _flush(self) -> None:
+        """Writes the finished jobs back, from a worker thread."""
+        if not self._pending_updates:
+            return
+        # taken on the event loop, where _run appends to the list
+        updates, self._pending_updates = self._pending_updates, []
+        await anyio.to_thread.run_sync(self._write_updates, updates)
+
+    def _write_updates(self, updates: List[Tuple]) -> None:
+        """Writes all finished jobs in one transaction instead of one commit per job."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            # owner = ?: a job whose lease ran out may have been claimed by another worker since
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, run_after = ?, owner = NULL, "
+                "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND owner = ?",
+                [(status, result, error, run_after, now, job_id, self.worker_id)
+                 for status, result, error, run_after, job_id in updates],
+            )
+            self._conn.execute("COMMIT")
+
+        # retried jobs may already be due
+        if any(update[0] == QUEUED for update in updates):
+            self._notify()
@@ -1,33 +1,49 @@
+import os
 import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, BackgroundTasks
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from fastapi_cache.decorator import cache
-from redis import asyncio as aioredis
+from log_sink import BatchedLogSink
 
+from .cache_layer import build_cache_backend, coalesce
 from .dependencies import limiter
+from .job_queue import JobQueue
+
+# Persistent job queue: jobs are stored in SQLite so they survive a restart
+job_queue = JobQueue(db_path="jobs.db")
+
+# Batched log writer: the file is written by a background thread, many lines at a time.
+# Jobs run in worker threads, so they wait (block) instead of dropping lines when it is full.
+log_sink = BatchedLogSink("log.txt", flush_interval=0.1, overflow="block")
 
 # --- Lifespan Events for Caching ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     This function is executed when the application starts.
-    It initializes the Redis connection and the FastAPI Caching.
+    It initializes the cache backend and the FastAPI Caching.
     """
-    # Connect to your Redis instance
-    redis = aioredis.from_url("redis://localhost")
-    # Initialize the cache with the Redis backend
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    # CACHE_URL picks the backend: an in-process L1 in front of Redis (the default)
+    # or SQLite, or "memory://" for the in-process cache alone.
+    # If Redis is unreachable, the in-process L1 keeps serving cached responses.
+    cache_backend = build_cache_backend(os.environ.get("CACHE_URL", "redis://localhost"))
+    FastAPICache.init(cache_backend, prefix="fastapi-cache")
+    # Start the log writer and the job workers (unfinished jobs from a previous run are picked up again)
+    log_sink.start()
+    await job_queue.start()
     print("FastAPI application startup complete. Cache initialized.")
 
     try:
         yield
     finally:
-        await redis.close()
+        await job_queue.stop()
+        log_sink.close()
+        await cache_backend.close()
 
 # Create the FastAPI app instance
 app = FastAPI(lifespan=lifespan)
@@ -55,12 +71,14 @@ async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
 
 
 # --- Background Task Function ---
+@job_queue.task(max_retries=3)
 def write_log(message: str):
     """
     A simple background task that writes a message to a log file.
+    The line is queued on the log sink, which appends it as a JSON line
+    together with other pending lines instead of opening the file every time.
     """
-    with open("log.txt", mode="a") as log_file:
-        log_file.write(message)
+    log_sink.write({"message": message.strip()})
     print(f"Log written: {message.strip()}")
 
 
@@ -73,17 +91,25 @@ def read_root():
     """
     return {"status": "API is running"}
 
+def load_cached_data():
+    """
+    The slow work behind /cached-data. It blocks, so it runs in the threadpool
+    instead of freezing the event loop for every other request.
+    """
+    print("Processing request to get cached data...")
+    time.sleep(2)  # Simulate a slow operation
+    return {"detail": "This is some cached data", "timestamp": time.time()}
+
 @app.get("/cached-data")
 @cache(expire=30)  # Cache this response for 30 seconds
+@coalesce()  # Concurrent misses wait for one computation
 async def get_cached_data():
     """
     This endpoint demonstrates caching.
     The first time it's called, it will "process" for 2 seconds.
     Subsequent calls within 30 seconds will return the cached response instantly.
     """
-    print("Processing request to get cached data...")
-    time.sleep(2)  # Simulate a slow operation
-    return {"detail": "This is some cached data", "timestamp": time.time()}
+    return await run_in_threadpool(load_cached_data)
 
 @app.get("/rate-limited")
 @limiter.limit("5/minute")  # Allow 5 requests per minute
@@ -95,12 +121,38 @@ async def get_rate_limited_endpoint(request: Request):
     return {"detail": "This endpoint is rate-limited."}
 
 @app.post("/background-task")
-async def trigger_background_task(background_tasks: BackgroundTasks):
+async def trigger_background_task():
     """
     This endpoint triggers a background task.
     It immediately returns a response to the client while the task
     (writing to a log file) runs in the background.
+
+    The task is stored in the persistent job queue instead of `background_tasks`,
+    so it is not lost if the server restarts and it does not block the event loop.
+    Use the returned `job_id` with `/jobs/{job_id}` to follow its progress.
+    """
+    # the insert is a SQLite commit: run it in the threadpool, not on the event loop
+    job_id = await run_in_threadpool(
+        job_queue.enqueue,
+        "write_log",
+        {"message": "Task started: Processing data in the background.\n"},
+        priority=5,
+    )
+    return {"message": "Background task has been initiated.", "job_id": job_id}
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Returns the status of a background job: queued, running, succeeded or failed.
     """
-    # Add the task to be executed in the background
-    background_tasks.add_task(write_log, "Task started: Processing data in the background.\n")
-    return {"message": "Background task has been initiated."}
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "id": job["id"],
+        "name": job["name"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"],
+    }
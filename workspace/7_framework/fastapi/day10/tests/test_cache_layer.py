@@ -0,0 +1,183 @@
+import asyncio
+import time
+import pytest
+from fastapi_cache import FastAPICache
+from src import cache_layer
+from src.cache_layer import LocalBackend, SQLiteBackend, TieredBackend, build_cache_backend, coalesce
+
+class FailingBackend(LocalBackend):
+    """
+    An L2 that is down: every call raises, like Redis when it is unreachable.
+    """
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def get_with_ttl(self, key):
+        self.calls += 1
+        raise ConnectionError("L2 is down")
+
+    async def set(self, key, value, expire=None):
+        self.calls += 1
+        raise ConnectionError("L2 is down")
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    A controllable time.monotonic for the cache layer.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(cache_layer.time, "monotonic", lambda: now[0])
+    return now
+
+def test_local_backend_expiry(clock):
+    """
+    Entries expire after their own TTL; entries without one stay.
+    """
+    backend = LocalBackend()
+
+    async def scenario():
+        await backend.set("short", b"1", expire=5)
+        await backend.set("long", b"2", expire=50)
+        await backend.set("forever", b"3")
+        assert await backend.get_with_ttl("short") == (5, b"1")
+        assert await backend.get_with_ttl("forever") == (-1, b"3")
+        clock[0] += 10
+        assert await backend.get("short") is None
+        await backend.set("other", b"4", expire=5)
+        assert backend.size == 3
+        assert await backend.get_with_ttl("long") == (40, b"2")
+
+    asyncio.run(scenario())
+
+def test_local_backend_lru_bounds():
+    """
+    The least recently used entries are evicted past max_entries or max_bytes.
+    """
+    backend = LocalBackend(max_entries=3, max_bytes=10)
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            await backend.set(key, b"xx", expire=60)
+        await backend.get("a")
+        await backend.set("d", b"xx", expire=60)
+        assert await backend.get("b") is None
+        assert {key for key in ("a", "c", "d") if await backend.get(key)} == {"a", "c", "d"}
+        await backend.set("e", b"x" * 6, expire=60)
+        assert await backend.get("a") is None
+        assert backend.size == 3 and backend._bytes == 10
+        await backend.set("huge", b"x" * 11, expire=60)
+        assert await backend.get("huge") is None
+        assert backend.evictions == 2
+        assert await backend.clear(namespace="e") == 1
+
+    asyncio.run(scenario())
+
+def test_local_backend_heap_stays_small(clock):
+    """
+    Rewriting the same keys does not grow the expiry heap without bound.
+    """
+    backend = LocalBackend()
+
+    async def scenario():
+        for i in range(1000):
+            await backend.set(f"key{i % 10}", b"v", expire=30)
+        assert len(backend._expiry_heap) <= 2 * 10 + 64 + 1
+
+    asyncio.run(scenario())
+
+def test_sqlite_backend(tmp_path):
+    """
+    The SQLite backend keeps entries across instances and honours expiry and namespaces.
+    """
+    path = str(tmp_path / "cache.db")
+
+    async def scenario():
+        backend = SQLiteBackend(path)
+        await backend.set("ns:a", b"1", expire=60)
+        await backend.set("ns:b", b"2", expire=-1)
+        await backend.set("NS:c", b"3")
+        await backend.close()
+
+        backend = SQLiteBackend(path)
+        ttl, value = await backend.get_with_ttl("ns:a")
+        assert value == b"1" and 59 <= ttl <= 60
+        assert await backend.get("ns:b") is None
+        assert await backend.clear(namespace="ns:") == 2
+        assert await backend.get("NS:c") == b"3"
+        await backend.close()
+
+    asyncio.run(scenario())
+
+def test_tiered_backend_fills_l1_from_l2(tmp_path):
+    """
+    An L2 hit is copied into L1, with its TTL capped by l1_ttl.
+    """
+    async def scenario():
+        l2 = SQLiteBackend(str(tmp_path / "cache.db"))
+        await l2.set("key", b"value", expire=600)
+        tiered = TieredBackend(LocalBackend(), l2, l1_ttl=10)
+        assert (await tiered.get_with_ttl("key"))[1] == b"value"
+        assert await tiered.l1.get_with_ttl("key") == (10, b"value")
+        await tiered.set("new", b"v", expire=5)
+        assert await l2.get("new") == b"v"
+        await tiered.close()
+
+    asyncio.run(scenario())
+
+def test_tiered_backend_survives_l2_outage(clock):
+    """
+    When L2 fails it is skipped for retry_after seconds and L1 keeps serving.
+    """
+    l2 = FailingBackend()
+    tiered = TieredBackend(LocalBackend(), l2, retry_after=30)
+
+    async def scenario():
+        assert await tiered.get_with_ttl("key") == (0, None)
+        await tiered.set("key", b"value", expire=20)
+        assert await tiered.get("key") == b"value"
+        assert l2.calls == 1
+        clock[0] += 31
+        assert await tiered.get("missing") is None
+        assert l2.calls == 2
+
+    asyncio.run(scenario())
+
+def test_build_cache_backend(tmp_path):
+    """
+    Cache URLs select the backend.
+    """
+    local = build_cache_backend("memory://")
+    assert isinstance(local, LocalBackend)
+    FastAPICache.init(local)
+    assert FastAPICache.get_backend() is local
+    tiered = build_cache_backend(f"sqlite:///{tmp_path / 'cache.db'}")
+    assert isinstance(tiered.l2, SQLiteBackend)
+    asyncio.run(tiered.close())
+    with pytest.raises(ValueError):
+        build_cache_backend("memcached://localhost")
+
+def test_coalesce_runs_concurrent_calls_once():
+    """
+    Concurrent calls with the same arguments share one run, and its exception.
+    """
+    runs = []
+
+    @coalesce()
+    async def load(name):
+        runs.append(name)
+        await asyncio.sleep(0.01)
+        if name == "bad":
+            raise ValueError(name)
+        return {"name": name, "at": time.monotonic()}
+
+    async def scenario():
+        results = await asyncio.gather(*(load("a") for _ in range(5)), load("b"))
+        assert all(result is results[0] for result in results[:5])
+        errors = await asyncio.gather(load("bad"), load("bad"), return_exceptions=True)
+        assert all(isinstance(error, ValueError) for error in errors)
+        await load("a")
+
+    asyncio.run(scenario())
+    assert runs == ["a", "b", "bad", "a"]
+    assert load.coalesce_stats == {"calls": 4, "coalesced": 5}
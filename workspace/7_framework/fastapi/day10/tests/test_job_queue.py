@@ -0,0 +1,254 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.job_queue import JobQueue, UnknownJobError, FAILED, QUEUED, SUCCEEDED
+
+@pytest.fixture
+def queue(tmp_path):
+    """
+    A job queue stored in a temporary SQLite file with fast polling.
+    """
+    q = JobQueue(db_path=str(tmp_path / "jobs.db"), poll_interval=0.01, flush_interval=0.01)
+    yield q
+    q.close()
+
+async def wait_for_status(queue, job_id, statuses, timeout=2.0):
+    """
+    Polls the queue until the job reaches one of the given statuses.
+    """
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {statuses}")
+
+def test_enqueue_unknown_job(queue):
+    """
+    Enqueueing a job that was never registered raises an error.
+    """
+    with pytest.raises(UnknownJobError):
+        queue.enqueue("missing")
+
+def test_sync_and_async_jobs(queue):
+    """
+    Sync jobs run in the thread pool, async jobs on the event loop.
+    """
+    @queue.task()
+    def add(a, b):
+        return a + b
+
+    @queue.task()
+    async def multiply(a, b):
+        await asyncio.sleep(0)
+        return a * b
+
+    async def scenario():
+        await queue.start()
+        try:
+            add_id = queue.enqueue("add", {"a": 2, "b": 3})
+            multiply_id = queue.enqueue("multiply", {"a": 2, "b": 3})
+            add_job = await wait_for_status(queue, add_id, {SUCCEEDED})
+            multiply_job = await wait_for_status(queue, multiply_id, {SUCCEEDED})
+        finally:
+            await queue.stop()
+        return add_job, multiply_job
+
+    add_job, multiply_job = asyncio.run(scenario())
+    assert add_job["result"] == 5
+    assert multiply_job["result"] == 6
+
+def test_retries_then_fails(queue):
+    """
+    A failing job is retried `max_retries` times before being marked as failed.
+    """
+    calls = []
+
+    @queue.task(max_retries=2, retry_backoff=0.01)
+    def flaky():
+        calls.append(1)
+        raise ValueError("boom")
+
+    async def scenario():
+        await queue.start()
+        try:
+            job_id = queue.enqueue("flaky")
+            return await wait_for_status(queue, job_id, {FAILED})
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert len(calls) == 3
+    assert job["attempts"] == 3
+    assert "boom" in job["error"]
+
+def test_priority_order(queue):
+    """
+    Jobs with a higher priority are claimed first.
+    """
+    @queue.task()
+    def record(name):
+        return name
+
+    queue.enqueue("record", {"name": "low"}, priority=0)
+    queue.enqueue("record", {"name": "high"}, priority=10)
+    rows = queue._claim(2)
+    assert [row["payload"] for row in rows] == ['{"name": "high"}', '{"name": "low"}']
+
+def test_jobs_survive_restart(tmp_path):
+    """
+    Jobs left queued or running by a stopped process are executed by the next one
+    once their lease has expired.
+    """
+    db_path = str(tmp_path / "jobs.db")
+    first = JobQueue(db_path=db_path, lease_seconds=0.01)
+
+    @first.task()
+    def echo(value):
+        return value
+
+    job_id = first.enqueue("echo", {"value": "hello"})
+    # simulate a crash while the job was running
+    first._claim(1)
+    first.close()
+    time.sleep(0.02)
+
+    second = JobQueue(db_path=db_path, poll_interval=0.01, flush_interval=0.01)
+    second.task()(echo)
+
+    async def scenario():
+        await second.start()
+        try:
+            return await wait_for_status(second, job_id, {SUCCEEDED})
+        finally:
+            await second.stop()
+
+    job = asyncio.run(scenario())
+    second.close()
+    assert job["result"] == "hello"
+
+def test_enqueue_many(queue):
+    """
+    enqueue_many stores every job in one transaction.
+    """
+    @queue.task()
+    def noop():
+        return None
+
+    ids = queue.enqueue_many("noop", [{} for _ in range(10)])
+    assert len(set(ids)) == 10
+    assert queue.stats() == {QUEUED: 10}
+
+def test_live_leases_are_not_recovered(tmp_path):
+    """
+    Starting a second worker on the same database leaves the jobs that the first
+    one is running alone; only jobs with an expired lease are requeued.
+    """
+    db_path = str(tmp_path / "jobs.db")
+    first = JobQueue(db_path=db_path, lease_seconds=60)
+    second = JobQueue(db_path=db_path, lease_seconds=60)
+
+    @first.task()
+    def echo(value):
+        return value
+
+    live_id, stale_id = first.enqueue_many("echo", [{"value": "live"}, {"value": "stale"}])
+    first._claim(2)
+    with first._lock:
+        first._conn.execute("UPDATE jobs SET lease_expires_at = ? WHERE id = ?", (time.time() - 1, stale_id))
+
+    assert second._recover() == 1
+    assert first.get(live_id)["status"] == "running"
+    assert first.get(live_id)["owner"] == first.worker_id
+    assert first.get(stale_id)["status"] == QUEUED
+    assert first.get(stale_id)["owner"] is None
+    first.close()
+    second.close()
+
+def test_heartbeat_renews_leases(tmp_path):
+    """
+    A job that runs longer than its lease keeps it, and its result is written back.
+    """
+    queue = JobQueue(db_path=str(tmp_path / "jobs.db"), poll_interval=0.01, flush_interval=0.01,
+                     lease_seconds=0.06)
+
+    @queue.task()
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "done"
+
+    async def scenario():
+        await queue.start()
+        try:
+            job_id = queue.enqueue("slow")
+            await asyncio.sleep(0.1)
+            running = queue.get(job_id)
+            assert running["status"] == "running"
+            assert running["lease_expires_at"] > time.time()
+            return await wait_for_status(queue, job_id, {SUCCEEDED, FAILED})
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    queue.close()
+    assert job["result"] == "done"
+    assert job["attempts"] == 1
+
+def test_queue_stays_off_the_event_loop(queue):
+    """
+    Claims, lease renewals and result writes run in worker threads, so a locked
+    database does not stall the event loop.
+    """
+    loop_thread = []
+    used_threads = set()
+
+    for name in ("_claim", "_recover", "_renew_leases", "_write_updates"):
+        method = getattr(queue, name)
+
+        def record(*args, _method=method):
+            used_threads.add(threading.get_ident())
+            return _method(*args)
+
+        setattr(queue, name, record)
+
+    @queue.task()
+    def echo(value):
+        return value
+
+    async def scenario():
+        loop_thread.append(threading.get_ident())
+        queue.lease_seconds = 0.03
+        await queue.start()
+        try:
+            job_id = queue.enqueue("echo", {"value": 1})
+            job = await wait_for_status(queue, job_id, {SUCCEEDED})
+            await asyncio.sleep(0.02)
+        finally:
+            await queue.stop()
+        return job
+
+    assert asyncio.run(scenario())["result"] == 1
+    assert used_threads and loop_thread[0] not in used_threads
+
+def test_stop_does_not_wait_forever_for_a_stuck_job(queue):
+    """
+    stop() gives up on jobs that are still running after its timeout; they keep
+    their running status so another worker can take them over once the lease expires.
+    """
+    @queue.task()
+    async def stuck():
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        await queue.start()
+        job_id = queue.enqueue("stuck")
+        await wait_for_status(queue, job_id, {"running"})
+        started = time.monotonic()
+        await queue.stop(timeout=0.05)
+        return job_id, time.monotonic() - started
+
+    job_id, elapsed = asyncio.run(scenario())
+    assert elapsed < 1
+    assert queue.get(job_id)["status"] == "running"
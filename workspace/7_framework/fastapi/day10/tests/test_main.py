@@ -1,6 +1,8 @@
 import time
 import os
+import threading
 import pytest
+from fastapi_cache import FastAPICache
 from fastapi.testclient import TestClient
 from src.main import app
 
@@ -50,6 +52,33 @@ def test_caching(client):
     # The timestamp should be the same, proving it's cached data
     assert data1["timestamp"] == data2["timestamp"]
 
+def test_cache_miss_is_computed_once_off_the_event_loop(client):
+    """
+    Test that concurrent misses share one computation, and that the slow
+    work runs in the threadpool so other endpoints answer meanwhile.
+    """
+    from src.main import get_cached_data
+    client.portal.call(FastAPICache.clear)
+    calls = get_cached_data.coalesce_stats["calls"]
+    responses = []
+
+    def fetch():
+        responses.append(client.get("/cached-data").json())
+
+    threads = [threading.Thread(target=fetch) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+
+    start_time = time.time()
+    assert client.get("/").status_code == 200
+    assert time.time() - start_time < 1.0
+
+    for thread in threads:
+        thread.join()
+    assert len({data["timestamp"] for data in responses}) == 1
+    assert get_cached_data.coalesce_stats["calls"] == calls + 1
+
 def test_rate_limiting(client):
     """
     Test the rate limiting functionality.
@@ -80,11 +109,18 @@ def test_background_task(client):
     # Trigger the background task
     response = client.post("/background-task")
     assert response.status_code == 200
-    assert response.json() == {"message": "Background task has been initiated."}
+    data = response.json()
+    assert data["message"] == "Background task has been initiated."
+    assert "job_id" in data
 
     # Give the background task a moment to run
     time.sleep(0.5)
 
+    # The job status endpoint reports the finished job
+    status = client.get(f"/jobs/{data['job_id']}")
+    assert status.status_code == 200
+    assert status.json()["status"] == "succeeded"
+
     # Check if the log file was created and contains the correct message
     assert os.path.exists(log_file)
     with open(log_file, "r") as f:
@@ -93,3 +129,11 @@ def test_background_task(client):
 
     # Clean up the log file after the test
     os.remove(log_file)
+
+def test_job_status_not_found(client):
+    """
+    Test that an unknown job id returns 404.
+    """
+    response = client.get("/jobs/does-not-exist")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Job not found"}
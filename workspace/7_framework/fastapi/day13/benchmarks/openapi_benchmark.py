@@ -0,0 +1,79 @@
+"""
+Cold start and first /api/v1/openapi.json latency, with and without the
+prebuilt schema.
+
+"lazy":     no usable src/static/openapi.json, so the first request runs
+            get_openapi over every route and encodes and gzips the result
+"prebuilt": the schema written by `python -m src.docs_cache`, loaded and
+            fingerprint-checked while src.main is imported
+
+Each run is a fresh interpreter: "import" is the time to import src.main,
+"first" and "second" are the first two schema requests through httpx's ASGI
+transport, and "304" is a revalidation with the ETag of the second one.
+
+Run from the day13 directory (this writes the prebuilt schema, which is
+ignored by git):
+    python benchmarks/openapi_benchmark.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DAY13 = os.path.join(os.path.dirname(__file__), "..")
+# the children import src.main, which needs the shared indexed_repository package
+SHARED = os.path.abspath(os.path.join(DAY13, "..", "..", "shared"))
+ENV = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, (SHARED, os.environ.get("PYTHONPATH"))))}
+RUNS = 7
+
+CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+if sys.argv[1] == "lazy":
+    import src.docs_cache
+    src.docs_cache.load_schema = lambda fingerprint: None  # as if the build step never ran
+from src.main import app
+imported = time.perf_counter()
+import httpx
+
+async def requests():
+    timings = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(2):
+            begin = time.perf_counter()
+            response = await client.get("/api/v1/openapi.json")
+            timings.append(time.perf_counter() - begin)
+        begin = time.perf_counter()
+        revalidated = await client.get("/api/v1/openapi.json", headers={"If-None-Match": response.headers["etag"]})
+        timings.append(time.perf_counter() - begin)
+        assert revalidated.status_code == 304
+    return timings, len(response.content), int(response.headers["content-length"])
+
+timings, size, sent = asyncio.run(requests())
+print(json.dumps({"import": imported - start, "first": timings[0], "second": timings[1],
+                  "304": timings[2], "size": size, "sent": sent}))
+"""
+
+
+def run(mode: str) -> dict:
+    output = subprocess.run([sys.executable, "-c", CHILD, mode], cwd=DAY13, env=ENV, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    subprocess.run([sys.executable, "-m", "src.docs_cache"], cwd=DAY13, env=ENV, check=True)
+    print(f"median of {RUNS} fresh interpreters")
+    for mode in ("lazy", "prebuilt"):
+        results = [run(mode) for _ in range(RUNS)]
+        median = {key: statistics.median(result[key] for result in results) * 1000
+                  for key in ("import", "first", "second", "304")}
+        print(f"  {mode:<9} import {median['import']:7.1f} ms   first {median['first']:6.2f} ms"
+              f"   second {median['second']:5.2f} ms   304 {median['304']:5.2f} ms"
+              f"   ({results[0]['size']} bytes, {results[0]['sent']} sent gzipped)")
+
+
+if __name__ == "__main__":
+    main()
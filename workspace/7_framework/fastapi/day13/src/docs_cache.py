@@ -0,0 +1,211 @@
+"""
+Prebuilt documentation: the OpenAPI schema and the Swagger UI / ReDoc assets.
+
+The schema is generated at build time, from the day13 directory:
+
+    python -m src.docs_cache            # writes src/static/openapi.json (+ .gz)
+    python -m src.docs_cache --assets   # also vendors the Swagger UI and ReDoc bundles
+
+and loaded at startup when its fingerprint matches the running code. The
+fingerprint covers the src/ modules, the settings and the FastAPI and pydantic
+versions, so a stale file is ignored and the schema is built on the first
+request instead, as it was before.
+
+Both are served from memory as `CachedBody` responses: encoded and gzipped
+once, with a strong ETag so clients can revalidate with If-None-Match.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import urllib.request
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import fastapi
+import pydantic
+from fastapi import HTTPException, Request, Response, status
+from pydantic_settings import BaseSettings
+
+SOURCE_DIR = Path(__file__).parent
+STATIC_DIR = SOURCE_DIR / "static"
+SCHEMA_PATH = STATIC_DIR / "openapi.json"
+ASSETS_DIR = STATIC_DIR / "docs"
+
+# Where the assets are vendored from, and where the docs pages load them from
+# if they have not been vendored
+ASSET_URLS = {
+    "swagger-ui-bundle.js": "https://cdn.jsdelivr.net/npm/swagger-ui-dist@5/swagger-ui-bundle.js",
+    "swagger-ui.css": "https://cdn.jsdelivr.net/npm/swagger-ui-dist@5/swagger-ui.css",
+    "redoc.standalone.js": "https://cdn.jsdelivr.net/npm/redoc@2.1.3/bundles/redoc.standalone.js",
+}
+MEDIA_TYPES = {".js": "application/javascript", ".css": "text/css"}
+
+# The schema can change with any deploy, so clients revalidate it after a few
+# minutes; asset URLs carry their content hash and never change
+SCHEMA_CACHE_CONTROL = "public, max-age=300"
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _etag_matches(if_none_match: Optional[str], etags: Iterable[str]) -> bool:
+    """Weak comparison of an If-None-Match header against our ETags (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or not candidates.isdisjoint(etags)
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            params = params.strip().lower()
+            try:
+                return not params.startswith("q=") or float(params[2:]) > 0
+            except ValueError:
+                return False
+    return False
+
+
+class CachedBody:
+    """A response body encoded once, with its gzip form and a strong ETag per encoding."""
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str, gzip_body: Optional[bytes] = None):
+        self.body = body
+        self.gzip_body = gzip_body if gzip_body is not None else gzip.compress(body, 9, mtime=0)
+        self.media_type = media_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+    def response(self, request: Request) -> Response:
+        """The body for this request: 304 if the client has it, gzipped if it accepts gzip."""
+        gzipped = _accepts_gzip(request.headers.get("accept-encoding", ""))
+        headers = {
+            "ETag": self.gzip_etag if gzipped else self.etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if _etag_matches(request.headers.get("if-none-match"), (self.etag, self.gzip_etag)):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzip_body, media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+
+def source_fingerprint(settings: BaseSettings) -> str:
+    """Hash of everything the generated schema depends on."""
+    digest = hashlib.sha256()
+    for path in sorted(SOURCE_DIR.rglob("*.py")):
+        source = path.read_bytes()
+        digest.update(f"{path.relative_to(SOURCE_DIR).as_posix()}\0{len(source)}\0".encode())
+        digest.update(source)
+    digest.update(f"fastapi {fastapi.__version__}\0pydantic {pydantic.VERSION}\0".encode())
+    digest.update(settings.model_dump_json().encode())
+    return digest.hexdigest()
+
+
+def schema_document(schema: dict) -> CachedBody:
+    """The schema encoded the way FastAPI's JSONResponse would encode it."""
+    body = json.dumps(schema, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"))
+    return CachedBody(body.encode("utf-8"), "application/json", SCHEMA_CACHE_CONTROL)
+
+
+def _gzip_path(path: Path) -> Path:
+    return path.with_name(path.name + ".gz")
+
+
+def _fingerprint_path(path: Path) -> Path:
+    return path.with_name(path.name + ".fingerprint")
+
+
+def write_schema(schema: dict, fingerprint: str, path: Path = SCHEMA_PATH) -> CachedBody:
+    """Write the schema, its gzip form and the fingerprint they were built from."""
+    document = schema_document(schema)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # The fingerprint goes last, so an interrupted build leaves the files stale
+    _fingerprint_path(path).unlink(missing_ok=True)
+    path.write_bytes(document.body)
+    _gzip_path(path).write_bytes(document.gzip_body)
+    _fingerprint_path(path).write_text(fingerprint)
+    return document
+
+
+def load_schema(fingerprint: str, path: Path = SCHEMA_PATH) -> Optional[CachedBody]:
+    """The prebuilt schema, or None if it is missing or was built from other sources."""
+    try:
+        if _fingerprint_path(path).read_text().strip() != fingerprint:
+            return None
+        return CachedBody(path.read_bytes(), "application/json", SCHEMA_CACHE_CONTROL,
+                          gzip_body=_gzip_path(path).read_bytes())
+    except OSError:
+        return None
+
+
+def fetch_assets(directory: Path = ASSETS_DIR, timeout: float = 30) -> None:
+    """Download the Swagger UI and ReDoc bundles, with their gzip forms."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, url in ASSET_URLS.items():
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            body = response.read()
+        (directory / name).write_bytes(body)
+        _gzip_path(directory / name).write_bytes(gzip.compress(body, 9, mtime=0))
+
+
+class DocsAssets:
+    """The vendored docs assets, served from memory under `prefix`, with CDN URLs for the rest."""
+
+    def __init__(self, directory: Path = ASSETS_DIR, prefix: str = "/static/docs"):
+        self.directory = directory
+        self.prefix = prefix
+        self.vendored = {name for name in ASSET_URLS if (directory / name).is_file()}
+        self._bodies: Dict[str, CachedBody] = {}
+
+    @property
+    def complete(self) -> bool:
+        """True when the docs pages need nothing from the network."""
+        return len(self.vendored) == len(ASSET_URLS)
+
+    def body(self, name: str) -> CachedBody:
+        if name not in self._bodies:
+            path = self.directory / name
+            gzip_path = _gzip_path(path)
+            self._bodies[name] = CachedBody(
+                path.read_bytes(), MEDIA_TYPES[path.suffix], ASSET_CACHE_CONTROL,
+                gzip_body=gzip_path.read_bytes() if gzip_path.is_file() else None,
+            )
+        return self._bodies[name]
+
+    def url(self, name: str) -> str:
+        if name not in self.vendored:
+            return ASSET_URLS[name]
+        version = self.body(name).etag.strip('"')[:12]
+        return f"{self.prefix}/{name}?v={version}"
+
+    def response(self, name: str, request: Request) -> Response:
+        if name not in self.vendored:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asset not found")
+        return self.body(name).response(request)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Prebuild the OpenAPI schema served by src.main.")
+    parser.add_argument("--assets", action="store_true",
+                        help="also download the Swagger UI and ReDoc bundles into src/static/docs")
+    args = parser.parse_args(argv)
+
+    # Imported here because src.main loads the prebuilt schema through this module
+    from src.config import settings
+    from src.main import app
+
+    document = write_schema(app.openapi(), source_fingerprint(settings))
+    print(f"Wrote {SCHEMA_PATH} ({len(document.body)} bytes, {len(document.gzip_body)} gzipped)")
+    if args.assets:
+        fetch_assets()
+        print(f"Vendored {', '.join(ASSET_URLS)} into {ASSETS_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
-from fastapi import FastAPI
+import json
+
+from fastapi import FastAPI, Request
 from fastapi.openapi.docs import (
     get_redoc_html,
     get_swagger_ui_html,
@@ -7,13 +9,23 @@ from fastapi.openapi.docs import (
 from fastapi.openapi.utils import get_openapi
 
 from src.config import settings
+from src.docs_cache import DocsAssets, load_schema, schema_document, source_fingerprint
 from src.routers import users, products, orders
 
+OPENAPI_URL = "/api/v1/openapi.json"
+
+# Built by `python -m src.docs_cache`; None if missing or stale, until the first request
+openapi_document = load_schema(source_fingerprint(settings))
+docs_assets = DocsAssets()
+
 
 def custom_openapi():
     """Generate custom OpenAPI schema with enhanced metadata"""
     if app.openapi_schema:
         return app.openapi_schema
+    if openapi_document is not None:
+        app.openapi_schema = json.loads(openapi_document.body)
+        return app.openapi_schema
 
     openapi_schema = get_openapi(
         title=settings.app_name,
@@ -97,7 +109,7 @@ app = FastAPI(
     openapi_tags=settings.tags_metadata,
     docs_url=None,  # Disable default docs
     redoc_url=None,  # Disable default redoc
-    openapi_url="/api/v1/openapi.json"  # Custom OpenAPI URL
+    openapi_url=None  # Served by openapi_json below
 )
 
 # Set custom OpenAPI schema
@@ -120,15 +132,30 @@ async def root():
     }
 
 
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def openapi_json(request: Request):
+    """OpenAPI schema, encoded and gzipped once, with ETag revalidation"""
+    global openapi_document
+    if openapi_document is None:
+        openapi_document = schema_document(app.openapi())
+    return openapi_document.response(request)
+
+
+@app.get(docs_assets.prefix + "/{name}", include_in_schema=False)
+async def docs_asset(name: str, request: Request):
+    """Vendored Swagger UI and ReDoc files"""
+    return docs_assets.response(name, request)
+
+
 @app.get("/docs", include_in_schema=False)
 async def custom_swagger_ui_html():
     """Custom Swagger UI with enhanced styling"""
     return get_swagger_ui_html(
-        openapi_url=app.openapi_url,
+        openapi_url=OPENAPI_URL,
         title=f"{app.title} - API Documentation",
         oauth2_redirect_url=app.swagger_ui_oauth2_redirect_url,
-        swagger_js_url="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5/swagger-ui-bundle.js",
-        swagger_css_url="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5/swagger-ui.css",
+        swagger_js_url=docs_assets.url("swagger-ui-bundle.js"),
+        swagger_css_url=docs_assets.url("swagger-ui.css"),
         swagger_ui_parameters={
             "deepLinking": True,
             "displayRequestDuration": True,
@@ -148,10 +175,11 @@ async def custom_swagger_ui_html():
 async def redoc_html():
     """Custom ReDoc documentation"""
     return get_redoc_html(
-        openapi_url=app.openapi_url,
+        openapi_url=OPENAPI_URL,
         title=f"{app.title} - API Documentation",
-        redoc_js_url="https://cdn.jsdelivr.net/npm/redoc@2.1.3/bundles/redoc.standalone.js",
-        with_google_fonts=True,
+        redoc_js_url=docs_assets.url("redoc.standalone.js"),
+        # Vendored docs make no requests to other hosts
+        with_google_fonts=not docs_assets.complete,
     )
 
 
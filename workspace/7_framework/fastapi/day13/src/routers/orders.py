@@ -1,14 +1,15 @@
 from fastapi import APIRouter, HTTPException, Path, status
 from src.models.schemas import OrderCreate, OrderResponse, ErrorResponse
+from indexed_repository import IndexedRepository
 
 router = APIRouter(prefix="/api/v1/orders", tags=["orders"])
 
 # Mock databases
-fake_orders_db = []
-fake_products_db = [
+fake_orders_db = IndexedRepository(key="id")
+fake_products_db = IndexedRepository(key="id", records=[
     {"id": 1, "name": "Wireless Headphones", "price": 99.99, "stock_quantity": 50},
     {"id": 2, "name": "Smartphone Case", "price": 19.99, "stock_quantity": 100}
-]
+])
 
 
 @router.post(
@@ -61,7 +62,7 @@ async def create_order(order: OrderCreate):
     total_amount = 0.0
 
     for item in order.items:
-        product = next((p for p in fake_products_db if p["id"] == item.product_id), None)
+        product = fake_products_db.get(item.product_id)
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -86,7 +87,7 @@ async def create_order(order: OrderCreate):
         })
 
     new_order = {
-        "id": len(fake_orders_db) + 1,
+        "id": fake_orders_db.next_id(),
         "user_id": 1,  # Mock user ID
         "items": order_items,
         "total_amount": total_amount,
@@ -96,7 +97,7 @@ async def create_order(order: OrderCreate):
         "updated_at": None
     }
 
-    fake_orders_db.append(new_order)
+    fake_orders_db.insert(new_order)
     return new_order
 
 
@@ -114,7 +115,7 @@ async def get_order(
     order_id: int = Path(..., gt=0, description="The unique identifier of the order")
 ):
     """Get detailed information about a specific order."""
-    order = next((order for order in fake_orders_db if order["id"] == order_id), None)
+    order = fake_orders_db.get(order_id)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
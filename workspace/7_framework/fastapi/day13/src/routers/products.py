@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Query, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from itertools import islice, takewhile
 from typing import List, Optional
+from fast_json import fast_json_response
 from src.models.schemas import (
     ProductCreate, ProductResponse
 )
+from indexed_repository.pagination import decode_cursor, keyset_page
+from indexed_repository import IndexedRepository
 
 router = APIRouter(prefix="/api/v1/products", tags=["products"])
 
-# Mock database
-fake_products_db = [
+# Mock database: products by id, indexed by category for the category filter
+fake_products_db = IndexedRepository(key="id", indexes={"category": str.lower}, records=[
     {
         "id": 1,
         "name": "Wireless Headphones",
@@ -28,7 +32,7 @@ fake_products_db = [
         "created_at": "2023-01-01T00:00:00",
         "updated_at": None
     }
-]
+])
 
 
 @router.get(
@@ -67,24 +71,44 @@ fake_products_db = [
         }
     }
 )
+@fast_json_response(List[ProductResponse])
 async def get_products(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of products to skip"),
     limit: int = Query(10, ge=1, le=100, description="Maximum number of products to return"),
     category: Optional[str] = Query(None, description="Filter by product category"),
     min_price: Optional[float] = Query(None, ge=0, description="Minimum price filter"),
-    max_price: Optional[float] = Query(None, ge=0, description="Maximum price filter")
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price filter"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page")
 ):
-    """Get products with optional filtering and pagination."""
-    products = fake_products_db.copy()
+    """
+    Get products with optional filtering and pagination.
+
+    Products are returned in id order. When there are more, the X-Next-Cursor
+    response header holds the cursor for the next page.
+    """
+    try:
+        after = decode_cursor(cursor, "id", False) if cursor else None
+        if category:
+            # the category index is ordered by (category, id): start inside the category
+            products = fake_products_db.seek("category", (category, after[1] if after else 0))
+        else:
+            products = fake_products_db.seek("id", after)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {e}")
 
     if category:
-        products = [p for p in products if p["category"].lower() == category.lower()]
-    if min_price is not None:
-        products = [p for p in products if p["price"] >= min_price]
-    if max_price is not None:
-        products = [p for p in products if p["price"] <= max_price]
+        products = takewhile(lambda p: p["category"].lower() == category.lower(), products)
+    if min_price is not None or max_price is not None:
+        products = (
+            p for p in products
+            if (min_price is None or p["price"] >= min_price) and (max_price is None or p["price"] <= max_price)
+        )
 
-    return products[skip:skip + limit]
+    page, next_cursor = keyset_page(islice(products, skip, None), limit, "id", False)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 
 @router.post(
@@ -100,7 +124,7 @@ async def get_products(
 async def create_product(product: ProductCreate):
     """Create a new product in the catalog."""
     new_product = {
-        "id": len(fake_products_db) + 1,
+        "id": fake_products_db.next_id(),
         "name": product.name,
         "description": product.description,
         "price": product.price,
@@ -109,5 +133,5 @@ async def create_product(product: ProductCreate):
         "created_at": "2023-11-01T10:30:00",
         "updated_at": None
     }
-    fake_products_db.append(new_product)
+    fake_products_db.insert(new_product)
     return new_product
@@ -4,11 +4,12 @@ from typing import List, Optional
 from src.models.schemas import (
     UserCreate, UserResponse, UserUpdate, ErrorResponse, ValidationErrorResponse
 )
+from indexed_repository import IndexedRepository
 
 router = APIRouter(prefix="/api/v1/users", tags=["users"])
 
-# Mock database
-fake_users_db = [
+# Mock database: users by id, indexed for the email check and the role filter
+fake_users_db = IndexedRepository(key="id", indexes=("email", "role"), records=[
     {
         "id": 1,
         "email": "john.doe@example.com",
@@ -27,7 +28,7 @@ fake_users_db = [
         "is_active": True,
         "created_at": "2023-01-01T00:00:00"
     }
-]
+])
 
 
 @router.get(
@@ -69,12 +70,9 @@ async def get_users(
     - **limit**: Maximum number of users to return (1-100)
     - **role**: Optional role filter (customer, admin, moderator)
     """
-    users = fake_users_db.copy()
-
     if role:
-        users = [user for user in users if user["role"] == role]
-
-    return users[skip:skip + limit]
+        return fake_users_db.select("role", role, role, offset=skip, limit=limit)
+    return fake_users_db.page(offset=skip, limit=limit)
 
 
 @router.get(
@@ -121,7 +119,7 @@ async def get_user(
 
     Returns detailed information about a user including their profile data and account status.
     """
-    user = next((user for user in fake_users_db if user["id"] == user_id), None)
+    user = fake_users_db.get(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -173,14 +171,14 @@ async def create_user(user: UserCreate):
     - role: Defaults to 'customer'
     """
     # Check if email already exists
-    if any(u["email"] == user.email for u in fake_users_db):
+    if fake_users_db.find("email", user.email):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Email already registered"
         )
 
     new_user = {
-        "id": len(fake_users_db) + 1,
+        "id": fake_users_db.next_id(),
         "email": user.email,
         "first_name": user.first_name,
         "last_name": user.last_name,
@@ -188,7 +186,7 @@ async def create_user(user: UserCreate):
         "is_active": True,
         "created_at": "2023-11-01T10:30:00"
     }
-    fake_users_db.append(new_user)
+    fake_users_db.insert(new_user)
     return new_user
 
 
@@ -207,18 +205,18 @@ async def update_user(
     user_update: UserUpdate = Body(...)
 ):
     """Update an existing user's information."""
-    user_index = next((i for i, user in enumerate(fake_users_db) if user["id"] == user_id), None)
-    if user_index is None:
+    user = fake_users_db.get(user_id)
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
     # Update user data
-    user_data = fake_users_db[user_index].copy()
+    user_data = user.copy()
     update_data = user_update.dict(exclude_unset=True)
     user_data.update(update_data)
-    fake_users_db[user_index] = user_data
+    fake_users_db.replace(user_id, user_data)
 
     return user_data
 
@@ -241,12 +239,10 @@ async def delete_user(
 
     ⚠️ **Warning**: This action cannot be undone!
     """
-    user_index = next((i for i, user in enumerate(fake_users_db) if user["id"] == user_id), None)
-    if user_index is None:
+    if not fake_users_db.delete(user_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    fake_users_db.pop(user_index)
     return JSONResponse(status_code=status.HTTP_204_NO_CONTENT, content=None)
@@ -252,5 +252,100 @@ class TestHealthAndMonitoring:
         assert "Health check" in health_endpoint["summary"]
 
 
+class TestFastJSONResponses:
+    """Test the product list sent without response_model validation"""
+
+    def test_products_schema_is_unchanged(self):
+        """Test that the fast path keeps the documented response model and parameters"""
+        schema = client.get("/api/v1/openapi.json").json()
+        products_get = schema["paths"]["/api/v1/products/"]["get"]
+        response_schema = products_get["responses"]["200"]["content"]["application/json"]["schema"]
+        assert response_schema["type"] == "array"
+        assert response_schema["items"]["$ref"].endswith("/ProductResponse")
+        names = {param["name"] for param in products_get["parameters"]}
+        assert {"skip", "limit", "category", "cursor"} <= names
+        assert not any("response" in name for name in names)
+
+    def test_products_body_matches_the_model(self):
+        """Test that the body is what response_model validation would have produced"""
+        from typing import List
+        from pydantic import TypeAdapter
+        from src.models.schemas import ProductResponse
+        from src.routers.products import fake_products_db
+
+        response = client.get("/api/v1/products/?limit=1")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["X-Next-Cursor"]
+        adapter = TypeAdapter(List[ProductResponse])
+        expected = adapter.dump_python(adapter.validate_python(fake_products_db.all()[:1]), mode="json")
+        assert response.json() == expected
+
+
+class TestPrebuiltDocumentation:
+    """Test the prebuilt schema, its caching headers and the vendored docs assets"""
+
+    def test_openapi_caching_headers(self):
+        """Test that the schema carries an ETag and revalidates with 304"""
+        response = client.get("/api/v1/openapi.json")
+        assert response.headers["cache-control"] == "public, max-age=300"
+        assert response.headers["vary"] == "Accept-Encoding"
+
+        revalidated = client.get("/api/v1/openapi.json", headers={"If-None-Match": response.headers["etag"]})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["etag"] == response.headers["etag"]
+
+    def test_openapi_gzip_body(self):
+        """Test that gzip and identity bodies carry the same schema under different ETags"""
+        gzipped = client.get("/api/v1/openapi.json", headers={"Accept-Encoding": "gzip"})
+        plain = client.get("/api/v1/openapi.json", headers={"Accept-Encoding": "identity"})
+        refused = client.get("/api/v1/openapi.json", headers={"Accept-Encoding": "gzip;q=0"})
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert "content-encoding" not in plain.headers
+        assert "content-encoding" not in refused.headers
+        assert gzipped.content == plain.content
+        assert gzipped.headers["etag"] != plain.headers["etag"]
+
+    def test_prebuilt_schema_round_trip(self, tmp_path):
+        """Test that a written schema loads only with the fingerprint it was built from"""
+        from src.docs_cache import load_schema, write_schema
+
+        path = tmp_path / "openapi.json"
+        written = write_schema(app.openapi(), "build-1", path)
+        loaded = load_schema("build-1", path)
+        assert loaded.body == written.body == client.get("/api/v1/openapi.json").content
+        assert loaded.etag == written.etag
+        assert load_schema("build-2", path) is None
+        assert load_schema("build-1", tmp_path / "missing.json") is None
+
+    def test_fingerprint_tracks_settings(self):
+        """Test that a settings change makes the prebuilt schema stale"""
+        from src.config import settings
+        from src.docs_cache import source_fingerprint
+
+        assert source_fingerprint(settings) == source_fingerprint(settings)
+        assert source_fingerprint(settings) != source_fingerprint(settings.model_copy(update={"app_version": "9.9"}))
+
+    def test_docs_use_vendored_assets(self, tmp_path, monkeypatch):
+        """Test that vendored assets replace the CDN URLs and are served locally"""
+        from src import main
+        from src.docs_cache import DocsAssets
+
+        (tmp_path / "swagger-ui-bundle.js").write_text("window.SwaggerUIBundle = {};")
+        monkeypatch.setattr(main, "docs_assets", DocsAssets(tmp_path))
+
+        page = client.get("/docs").text
+        assert "/static/docs/swagger-ui-bundle.js?v=" in page
+        assert "https://cdn.jsdelivr.net/npm/swagger-ui-dist@5/swagger-ui.css" in page
+        assert "fonts.googleapis.com" in client.get("/redoc").text
+
+        asset = client.get(main.docs_assets.url("swagger-ui-bundle.js"))
+        assert asset.status_code == 200
+        assert asset.text == "window.SwaggerUIBundle = {};"
+        assert "immutable" in asset.headers["cache-control"]
+        assert client.get("/static/docs/redoc.standalone.js").status_code == 404
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,329 @@
+from gevent import monkey
+
+# The load generator reuses a10_http_client (requests), so patch before anything else is imported
+monkey.patch_all()
+
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import gevent
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+
+from a10_http_client import ConcurrentHttpRequests, HttpClientConfig
+from a11_http_server import HttpServerConfig, SimpleWsgiServer
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+JSON_HEADERS = [('Content-Type', 'application/json')]
+
+STATUS_LINES = {
+    200: '200 OK',
+    201: '201 Created',
+    400: '400 Bad Request',
+    404: '404 Not Found',
+    405: '405 Method Not Allowed',
+    500: '500 Internal Server Error',
+}
+
+
+class Response:
+    """
+    An encoded response: status line, headers and body bytes.
+
+    Content-Length is always set, so pywsgi can keep the connection alive
+    instead of falling back to chunked encoding.
+    """
+    __slots__ = ('status', 'headers', 'body')
+
+    def __init__(self, status: int, body: bytes, headers: Optional[List[Tuple[str, str]]] = None):
+        self.status = STATUS_LINES.get(status, f'{status} Unknown')
+        self.body = body
+        self.headers = (headers or JSON_HEADERS) + [('Content-Length', str(len(body)))]
+
+    def __call__(self, start_response: Callable) -> List[bytes]:
+        start_response(self.status, self.headers)
+        return [self.body]
+
+
+def json_response(data: Any, status: int = 200) -> Response:
+    """Encodes a JSON response (use it for data that changes per request)."""
+    return Response(status, json.dumps(data).encode('utf-8'))
+
+
+# Responses that never change are encoded once, not on every request
+NOT_FOUND = json_response({'error': 'Route not found'}, 404)
+METHOD_NOT_ALLOWED = json_response({'error': 'Method not allowed'}, 405)
+
+CONVERTERS: Dict[str, Callable[[str], Any]] = {'str': str, 'int': int}
+
+
+class _TrieNode:
+    """One path segment of the route trie."""
+    __slots__ = ('children', 'param', 'handlers')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        # (name, converter, node) for a "{name}" segment
+        self.param: Optional[Tuple[str, Callable[[str], Any], '_TrieNode']] = None
+        # method -> handler
+        self.handlers: Dict[str, Callable] = {}
+
+
+class Router:
+    """
+    Precompiled request router.
+
+    Routes without parameters are stored in a dict keyed by (method, path), so the
+    common case is a single lookup. Routes with parameters ("/items/{item_id:int}")
+    are stored in a trie of path segments; literal segments win over parameters.
+    """
+
+    def __init__(self):
+        self.static_routes: Dict[Tuple[str, str], Callable] = {}
+        self.static_paths: Dict[str, set] = {}
+        self.root = _TrieNode()
+
+    def add_route(self, method: str, path: str, handler: Callable) -> None:
+        if '{' not in path:
+            self.static_routes[(method, path)] = handler
+            self.static_paths.setdefault(path, set()).add(method)
+            return
+
+        node = self.root
+        for segment in path.strip('/').split('/'):
+            if segment.startswith('{') and segment.endswith('}'):
+                name, _, kind = segment[1:-1].partition(':')
+                converter = CONVERTERS[kind or 'str']
+                if node.param is None:
+                    node.param = (name, converter, _TrieNode())
+                node = node.param[2]
+            else:
+                node = node.children.setdefault(segment, _TrieNode())
+        node.handlers[method] = handler
+
+    def route(self, path: str, methods: Tuple[str, ...] = ('GET',)) -> Callable:
+        """Decorator form of add_route."""
+        def decorator(handler: Callable) -> Callable:
+            for method in methods:
+                self.add_route(method, path, handler)
+            return handler
+        return decorator
+
+    def static(self, path: str, data: Any, status: int = 200) -> None:
+        """Registers a GET route whose response is encoded once at startup."""
+        response = json_response(data, status)
+        self.add_route('GET', path, lambda environ: response)
+
+    def match(self, method: str, path: str) -> Tuple[Optional[Callable], Dict[str, Any], bool]:
+        """Returns (handler, path params, path_exists)."""
+        handler = self.static_routes.get((method, path))
+        if handler is not None:
+            return handler, {}, True
+        if path in self.static_paths:
+            return None, {}, True
+
+        node = self.root
+        params: Dict[str, Any] = {}
+        for segment in path.strip('/').split('/'):
+            child = node.children.get(segment)
+            if child is not None:
+                node = child
+                continue
+            if node.param is None:
+                return None, {}, False
+            name, converter, child = node.param
+            try:
+                params[name] = converter(segment)
+            except ValueError:
+                return None, {}, False
+            node = child
+
+        if not node.handlers:
+            return None, {}, False
+        return node.handlers.get(method), params, True
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> List[bytes]:
+        """The router itself is a WSGI application."""
+        handler, params, path_exists = self.match(environ['REQUEST_METHOD'], environ.get('PATH_INFO', '/'))
+        if handler is None:
+            return (METHOD_NOT_ALLOWED if path_exists else NOT_FOUND)(start_response)
+        try:
+            return handler(environ, **params)(start_response)
+        except Exception as e:
+            logger.error(f"Handler failed: {e}")
+            return json_response({'error': 'Internal server error'}, 500)(start_response)
+
+
+class RouterServerConfig(HttpServerConfig):
+    """Configuration for the routed server; no artificial delay by default."""
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8710,
+        request_delay: float = 0.0,
+        server_timeout: float = 10.0,
+        max_connections: int = 1000,
+        backlog: int = 1024,
+        access_log: bool = False
+    ):
+        super().__init__(host, port, request_delay, server_timeout)
+        self.max_connections = max_connections
+        self.backlog = backlog
+        self.access_log = access_log
+
+
+class RoutedWsgiServer(SimpleWsgiServer):
+    """
+    SimpleWsgiServer with the if/elif chain replaced by a Router.
+
+    Tuning compared to the plain example:
+      - a Pool bounds the number of connection greenlets (max_connections)
+      - a larger listen backlog absorbs bursts of new connections
+      - the per-request access log line is off unless access_log=True
+      - every response has Content-Length, so HTTP/1.1 keep-alive connections are reused
+    """
+    def __init__(self, config: RouterServerConfig, router: Optional[Router] = None):
+        super().__init__(config)
+        self.start_time = time.time()
+        self.router = router or self.default_router()
+
+    def default_router(self) -> Router:
+        """The same routes as SimpleWsgiServer, plus a route with a path parameter."""
+        router = Router()
+
+        @router.route('/')
+        def index(environ):
+            return json_response({'message': 'Welcome to the routed WSGI server!', 'time': time.time()})
+
+        @router.route('/health')
+        def health(environ):
+            return json_response({'status': 'healthy', 'uptime': time.time() - self.start_time})
+
+        @router.route('/items/{item_id:int}')
+        def get_item(environ, item_id: int):
+            return json_response({'item_id': item_id})
+
+        router.static('/version', {'version': '1.0.0'})
+        return router
+
+    def simple_wsgi_app(self, environ: Dict[str, Any], start_response: Callable) -> List[bytes]:
+        if self.config.request_delay:
+            gevent.sleep(self.config.request_delay)
+        return self.router(environ, start_response)
+
+    def build_server(self) -> WSGIServer:
+        return WSGIServer(
+            (self.config.host, self.config.port),
+            self.simple_wsgi_app,
+            spawn=Pool(self.config.max_connections),
+            backlog=self.config.backlog,
+            log=logger if self.config.access_log else None
+        )
+
+    def run(self) -> None:
+        """Runs the routed WSGI server."""
+        logger.info("*** Routed WSGI HTTP Server ***")
+        try:
+            self.server = self.build_server()
+            logger.info(f"Starting server at http://{self.config.host}:{self.config.port}")
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Shutting down routed WSGI server")
+            if self.server:
+                self.server.stop()
+
+
+class RouterBenchmark:
+    """Drives a server with greenlets from a10_http_client and reports req/s and latency."""
+    def __init__(self, total_requests: int = 2000, concurrency: int = 50):
+        self.total_requests = total_requests
+        self.concurrency = concurrency
+        self.client = ConcurrentHttpRequests(HttpClientConfig(default_timeout=5.0))
+
+    def run(self, base_url: str, paths: List[str]) -> Dict[str, float]:
+        pool = Pool(self.concurrency)
+        urls = [base_url + paths[i % len(paths)] for i in range(self.total_requests)]
+
+        start_time = time.time()
+        results = list(pool.imap_unordered(lambda args: self.client.fetch_url(*args), zip(urls, range(len(urls)))))
+        total_time = time.time() - start_time
+
+        latencies = sorted(r['response_time'] * 1000 for r in results if r['success'])
+        if not latencies:
+            return {'requests_per_second': 0.0, 'errors': len(results)}
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        return {
+            'requests_per_second': len(latencies) / total_time,
+            'p50_ms': percentile(0.50),
+            'p90_ms': percentile(0.90),
+            'p99_ms': percentile(0.99),
+            'errors': len(results) - len(latencies)
+        }
+
+
+def dispatch_benchmark(app: Callable, paths: List[str], iterations: int = 100_000) -> float:
+    """Calls a WSGI app directly (no sockets) and returns microseconds per request."""
+    environs = [{'REQUEST_METHOD': 'GET', 'PATH_INFO': path} for path in paths]
+    start_response = lambda status, headers: None
+    start_time = time.perf_counter()
+    for i in range(iterations):
+        app(environs[i % len(environs)], start_response)
+    return (time.perf_counter() - start_time) / iterations * 1_000_000
+
+
+def main():
+    """Benchmarks the if/elif SimpleWsgiServer against the RoutedWsgiServer."""
+    # fetch_url logs every request; keep the benchmark output readable
+    logging.getLogger('a10_http_client').setLevel(logging.WARNING)
+    logging.getLogger('a11_http_server').setLevel(logging.WARNING)
+
+    # 1. Routing and serialization only, without the network
+    paths = ['/', '/health', '/missing']
+    baseline_app = SimpleWsgiServer(HttpServerConfig(request_delay=0.0))
+    baseline_app.start_time = time.time()
+    routed_app = RoutedWsgiServer(RouterServerConfig())
+    logger.info(f"Dispatch SimpleWsgiServer: {dispatch_benchmark(baseline_app.simple_wsgi_app, paths):6.2f} us/request")
+    logger.info(f"Dispatch RoutedWsgiServer: {dispatch_benchmark(routed_app.simple_wsgi_app, paths):6.2f} us/request")
+
+    # 2. Over HTTP, driven by greenlets
+    benchmark = RouterBenchmark()
+
+    # Baseline: the original server (request_delay=0 so only routing/serialization is measured)
+    baseline = SimpleWsgiServer(HttpServerConfig(port=8700, request_delay=0.0))
+    baseline.start_time = time.time()
+    baseline.server = WSGIServer(('127.0.0.1', 8700), baseline.simple_wsgi_app, log=None)
+    baseline.server.start()
+
+    routed = RoutedWsgiServer(RouterServerConfig(port=8710))
+    routed.server = routed.build_server()
+    routed.server.start()
+
+    try:
+        for name, url, paths in [
+            ('SimpleWsgiServer', 'http://127.0.0.1:8700', ['/', '/health']),
+            ('RoutedWsgiServer', 'http://127.0.0.1:8710', ['/', '/health', '/version', '/items/42']),
+        ]:
+            result = benchmark.run(url, paths)
+            logger.info(
+                f"{name:<18} {result['requests_per_second']:8.0f} req/s  "
+                f"p50 {result.get('p50_ms', 0):6.2f} ms  p90 {result.get('p90_ms', 0):6.2f} ms  "
+                f"p99 {result.get('p99_ms', 0):6.2f} ms  errors {result['errors']}"
+            )
+    finally:
+        baseline.server.stop()
+        routed.server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+# Framed binary protocol and buffer-reusing TCP echo server
+#
+# TCP is a byte stream, not a message stream: one send() can arrive as two recv()s and
+# two send()s can arrive as one recv(). a4_socket.py assumes one recv() == one message,
+# which breaks as soon as the server is under load.
+#
+# This example adds a length-prefixed framing layer:
+#   | 4 bytes: payload length (big-endian) | payload bytes |
+# and avoids allocations on the hot path:
+#   - recv_into() fills one reusable bytearray per connection
+#   - frames are handed out as memoryview slices of that buffer (no copies)
+#   - replies are appended to one reusable output buffer and sent with a single sendall()
+
+import argparse
+import logging
+import resource
+import struct
+import time
+from typing import Callable, Dict, List, Optional
+
+import gevent
+from gevent import socket
+from gevent.pool import Pool
+from gevent.server import StreamServer
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('!I')
+HEADER_SIZE = HEADER.size
+
+
+class ProtocolError(Exception):
+    """Raised when the peer sends a frame that breaks the protocol."""
+    pass
+
+
+class FramedServerConfig:
+    """Configuration for the framed echo server."""
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 12400,
+        max_connections: int = 20000,
+        backlog: int = 4096,
+        buffer_size: int = 64 * 1024,
+        max_frame_size: int = 1024 * 1024
+    ):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.backlog = backlog
+        self.buffer_size = buffer_size
+        self.max_frame_size = max_frame_size
+
+
+class FrameReader:
+    """
+    Reads length-prefixed frames from a socket into a reusable buffer.
+
+    Frames are returned as memoryviews into the buffer, so they are only valid
+    until the next call to read_frames(); release() them before that call so the
+    buffer can be resized for a large frame.
+    """
+    def __init__(self, sock: socket.socket, buffer_size: int = 64 * 1024, max_frame_size: int = 1024 * 1024):
+        self.sock = sock
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # first byte not consumed yet
+        self.end = 0    # first free byte
+
+    def _compact(self) -> None:
+        """Moves the unconsumed bytes to the front of the buffer (growing it if a frame needs more room)."""
+        pending = self.end - self.start
+        if self.start:
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+            self.start, self.end = 0, pending
+
+        # a frame header says how much room the next frame needs
+        if pending >= HEADER_SIZE:
+            needed = HEADER_SIZE + HEADER.unpack_from(self.buffer, 0)[0]
+            if needed > len(self.buffer):
+                self.view.release()
+                self.buffer.extend(bytes(needed - len(self.buffer)))
+                self.view = memoryview(self.buffer)
+
+    def read_frames(self) -> Optional[List[memoryview]]:
+        """Waits for data and returns every complete frame received; None when the peer closed."""
+        frames: List[memoryview] = []
+        while not frames:
+            if self.end == len(self.buffer):
+                self._compact()
+            received = self.sock.recv_into(self.view[self.end:])
+            if received == 0:
+                return None
+            self.end += received
+
+            # one recv can contain many frames (and the start of the next one)
+            while self.end - self.start >= HEADER_SIZE:
+                (length,) = HEADER.unpack_from(self.buffer, self.start)
+                if length > self.max_frame_size:
+                    raise ProtocolError(f"Frame of {length} bytes exceeds {self.max_frame_size}")
+                frame_end = self.start + HEADER_SIZE + length
+                if frame_end > self.end:
+                    break
+                frames.append(self.view[self.start + HEADER_SIZE:frame_end])
+                self.start = frame_end
+
+            if self.start == self.end:
+                # everything consumed: reuse the buffer from the beginning
+                self.start = self.end = 0
+        return frames
+
+
+class FrameWriter:
+    """Collects outgoing frames in a reusable buffer and sends them with one sendall()."""
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.out = bytearray()
+
+    def add(self, payload) -> None:
+        self.out += HEADER.pack(len(payload))
+        self.out += payload
+
+    def flush(self) -> None:
+        if self.out:
+            # sendall() keeps sending until every byte is written; send() may write only part
+            self.sock.sendall(self.out)
+            del self.out[:]
+
+
+class FramedEchoServer:
+    """StreamServer-based echo server speaking the framed protocol."""
+    def __init__(self, config: FramedServerConfig, handler: Optional[Callable] = None):
+        self.config = config
+        # handler(payload) -> reply payload; echo by default
+        self.handler = handler or (lambda payload: payload)
+        self.server: Optional[StreamServer] = None
+        self.messages = 0
+        self.bytes = 0
+
+    def handle_connection(self, sock: socket.socket, address) -> None:
+        reader = FrameReader(sock, self.config.buffer_size, self.config.max_frame_size)
+        writer = FrameWriter(sock)
+        try:
+            while True:
+                frames = reader.read_frames()
+                if frames is None:
+                    break
+                for frame in frames:
+                    writer.add(self.handler(frame))
+                    self.bytes += len(frame)
+                self.messages += len(frames)
+                # one write for all the replies to this batch of frames
+                writer.flush()
+                for frame in frames:
+                    frame.release()
+        except (ProtocolError, ConnectionError) as e:
+            logger.info(f"Closing {address}: {e}")
+        finally:
+            sock.close()
+
+    def start(self) -> None:
+        # the Pool caps concurrent connections; extra clients wait in the listen backlog
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.config.host, self.config.port))
+        listener.listen(self.config.backlog)
+        self.server = StreamServer(
+            listener,
+            self.handle_connection,
+            spawn=Pool(self.config.max_connections)
+        )
+        self.server.start()
+        logger.info(f"Framed echo server listening on {self.config.host}:{self.config.port}")
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.stop(timeout=1)
+
+
+class EchoLoadGenerator:
+    """Opens many connections and pipelines framed messages over each of them."""
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        connections: int,
+        messages_per_connection: int = 100,
+        payload_size: int = 128,
+        window: int = 10
+    ):
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.messages_per_connection = messages_per_connection
+        self.payload = b'x' * payload_size
+        # how many messages are sent before waiting for their echoes
+        self.window = window
+
+    def client(self) -> int:
+        sock = socket.create_connection((self.host, self.port))
+        reader = FrameReader(sock, buffer_size=16 * 1024)
+        writer = FrameWriter(sock)
+        received = 0
+        try:
+            remaining = self.messages_per_connection
+            while remaining:
+                batch = min(self.window, remaining)
+                for _ in range(batch):
+                    writer.add(self.payload)
+                writer.flush()
+                got = 0
+                while got < batch:
+                    frames = reader.read_frames()
+                    if frames is None:
+                        raise ConnectionError("Server closed the connection")
+                    got += len(frames)
+                    for frame in frames:
+                        frame.release()
+                received += got
+                remaining -= batch
+        finally:
+            sock.close()
+        return received
+
+    def run(self) -> Dict[str, float]:
+        pool = Pool(self.connections)
+        start_time = time.time()
+        greenlets = [pool.spawn(self.client) for _ in range(self.connections)]
+        gevent.joinall(greenlets)
+        elapsed = time.time() - start_time
+
+        messages = sum(g.value for g in greenlets if g.successful())
+        failed = sum(1 for g in greenlets if not g.successful())
+        return {
+            'connections': self.connections,
+            'failed_connections': failed,
+            'messages': messages,
+            'seconds': elapsed,
+            'messages_per_second': messages / elapsed,
+            'bytes_per_second': messages * len(self.payload) * 2 / elapsed  # sent + echoed
+        }
+
+
+def raise_file_limit(needed: int) -> None:
+    """Each connection uses two file descriptors here (client and server side)."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        if target < needed:
+            logger.warning(f"File descriptor limit is {target}; {needed} are needed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Framed echo server benchmark")
+    parser.add_argument('--connections', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--messages', type=int, default=50, help="messages per connection")
+    parser.add_argument('--payload-size', type=int, default=128)
+    args = parser.parse_args()
+
+    raise_file_limit(max(args.connections) * 2 + 100)
+
+    config = FramedServerConfig()
+    server = FramedEchoServer(config)
+    server.start()
+    try:
+        for connections in args.connections:
+            generator = EchoLoadGenerator(
+                config.host, config.port, connections,
+                messages_per_connection=args.messages,
+                payload_size=args.payload_size
+            )
+            result = generator.run()
+            logger.info(
+                f"{result['connections']:>6} connections: "
+                f"{result['messages_per_second']:>10.0f} msg/s  "
+                f"{result['bytes_per_second'] / 1024 / 1024:>8.2f} MiB/s  "
+                f"({result['messages']} messages in {result['seconds']:.2f}s, "
+                f"{result['failed_connections']} failed connections)"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
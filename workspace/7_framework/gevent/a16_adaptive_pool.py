@@ -0,0 +1,338 @@
+# Adaptive Pool
+#
+# a6_gevent-pools.py and a6_gevent-pools-advanced.py use a fixed Pool(size=...).
+# The right size depends on what the tasks talk to: too small and a burst of work
+# waits in the queue, too large and the downstream service (database, API) gets
+# overloaded and every task slows down.
+#
+# AdaptivePool picks its size while it runs. Every `adjust_interval` seconds a
+# controller looks at the latency of the tasks that finished and at the backlog:
+#   - "gradient": limit = limit * (tolerance * min_latency / latency), plus sqrt(limit)
+#     when tasks are waiting. Latency at the no-load minimum lets the limit grow;
+#     rising latency shrinks it in proportion.
+#   - "aimd": additive increase (+1) while there is a backlog and latency is fine,
+#     multiplicative decrease (x decrease_factor) when latency goes above the target.
+
+import logging
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+import gevent
+from gevent.event import AsyncResult
+from gevent.pool import Pool
+from gevent.queue import Empty, Queue
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePoolConfig:
+    """Configuration for the AdaptivePool controller."""
+    def __init__(
+        self,
+        min_size: int = 2,
+        max_size: int = 500,
+        initial_size: int = 4,
+        max_queue: int = 1000,
+        strategy: str = "gradient",
+        adjust_interval: float = 0.05,
+        tolerance: float = 1.5,
+        decrease_factor: float = 0.8,
+        min_latency_drift: float = 0.01
+    ):
+        if strategy not in ("gradient", "aimd"):
+            raise ValueError("strategy must be 'gradient' or 'aimd'")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.initial_size = initial_size
+        # spawn() blocks once this many tasks are waiting (backpressure)
+        self.max_queue = max_queue
+        self.strategy = strategy
+        self.adjust_interval = adjust_interval
+        # latency up to tolerance * min_latency counts as "not overloaded"
+        self.tolerance = tolerance
+        self.decrease_factor = decrease_factor
+        # let the observed minimum creep up, so it follows a downstream that got slower
+        self.min_latency_drift = min_latency_drift
+
+
+class AdaptivePool:
+    """
+    A worker pool whose size follows the observed task latency and backlog.
+
+    Tasks go into a bounded queue and are run by worker greenlets. The number of
+    workers is adjusted between min_size and max_size by a controller greenlet.
+    """
+    def __init__(self, config: Optional[AdaptivePoolConfig] = None):
+        self.config = config or AdaptivePoolConfig()
+        self.limit = float(self.config.initial_size)
+        self.min_latency: Optional[float] = None
+        self.latency: Optional[float] = None
+
+        self._queue = Queue(maxsize=self.config.max_queue)
+        self._workers: Set[gevent.Greenlet] = set()
+        self._latencies: List[float] = []
+        self._closed = False
+
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.completed_per_second = 0.0
+        self._last_completed = 0
+        self._last_adjust = time.perf_counter()
+        # (time, limit) samples, handy for plotting how the controller behaved
+        self.history: deque = deque(maxlen=10_000)
+
+        self._resize()
+        self._controller = gevent.spawn(self._control_loop)
+
+    # --- Submitting work ---
+
+    def spawn(self, func: Callable, *args, **kwargs) -> AsyncResult:
+        """Queues func(*args, **kwargs); blocks while the queue is full."""
+        if self._closed:
+            raise RuntimeError("AdaptivePool is closed")
+        result = AsyncResult()
+        self._queue.put((func, args, kwargs, result))
+        return result
+
+    def imap_unordered(self, func: Callable, iterable: Iterable) -> Iterator[Any]:
+        """
+        Yields func(item) for every item, in completion order.
+
+        Items are pulled from `iterable` only as fast as the queue accepts them,
+        so a huge (or endless) generator is never read far ahead of the workers.
+        An exception raised by `iterable` is re-raised here.
+        """
+        results = Queue()
+        submitted = [0]
+        failure: List[BaseException] = []
+
+        def feed():
+            try:
+                for item in iterable:
+                    self.spawn(func, item).rawlink(results.put)
+                    submitted[0] += 1
+            except Exception as e:
+                # the consumer re-raises it; a dead feeder must not leave it waiting
+                failure.append(e)
+            finally:
+                results.put(None)  # all items are queued, or the iterable failed
+
+        feeder = gevent.spawn(feed)
+        received = 0
+        feeding = True
+        try:
+            while feeding or received < submitted[0]:
+                result = results.get()
+                if result is None:
+                    feeding = False
+                    continue
+                received += 1
+                yield result.get()  # re-raises the task's exception
+            if failure:
+                # after the results of the items read before it
+                raise failure[0]
+        finally:
+            feeder.kill()
+
+    def join(self) -> None:
+        """Waits until every queued task has run."""
+        while self._queue.qsize() or self.in_flight:
+            gevent.sleep(self.config.adjust_interval / 5)
+
+    def close(self) -> None:
+        """Finishes queued work, then stops the workers and the controller."""
+        self.join()
+        self._closed = True
+        self._controller.kill()
+        gevent.killall(list(self._workers))
+
+    # --- Workers ---
+
+    def _worker(self) -> None:
+        current = gevent.getcurrent()
+        try:
+            while len(self._workers) <= int(self.limit):
+                try:
+                    # a timeout, so idle workers notice when the pool shrinks
+                    func, args, kwargs, result = self._queue.get(timeout=self.config.adjust_interval)
+                except Empty:
+                    continue
+                self.in_flight += 1
+                start_time = time.perf_counter()
+                try:
+                    result.set(func(*args, **kwargs))
+                except Exception as e:
+                    self.failed += 1
+                    result.set_exception(e)
+                finally:
+                    self._latencies.append(time.perf_counter() - start_time)
+                    self.in_flight -= 1
+                    self.completed += 1
+        finally:
+            self._workers.discard(current)
+
+    def _resize(self) -> None:
+        while len(self._workers) < int(self.limit):
+            self._workers.add(gevent.spawn(self._worker))
+
+    # --- Controller ---
+
+    def _control_loop(self) -> None:
+        while True:
+            gevent.sleep(self.config.adjust_interval)
+            self._adjust()
+
+    def _adjust(self) -> None:
+        config = self.config
+        now = time.perf_counter()
+        self.completed_per_second = (self.completed - self._last_completed) / (now - self._last_adjust)
+        self._last_completed, self._last_adjust = self.completed, now
+
+        samples, self._latencies = self._latencies, []
+        backlog = self._queue.qsize()
+        if samples:
+            latency = sum(samples) / len(samples)
+            self.latency = latency
+            if self.min_latency is None:
+                self.min_latency = latency
+            else:
+                self.min_latency = min(self.min_latency * (1 + config.min_latency_drift), latency)
+            target = config.tolerance * self.min_latency
+
+            if config.strategy == "gradient":
+                # never cut more than half the workers in one step
+                gradient = max(0.5, min(1.0, target / latency))
+                limit = self.limit * gradient
+                if backlog:
+                    limit += math.sqrt(limit)
+            else:
+                if latency > target:
+                    limit = self.limit * config.decrease_factor
+                elif backlog:
+                    limit = self.limit + 1
+                else:
+                    limit = self.limit
+        elif backlog and not self.in_flight:
+            # nothing finished and nothing running: the pool is idle with work waiting
+            limit = self.limit + 1
+        else:
+            limit = self.limit
+
+        self.limit = max(config.min_size, min(config.max_size, limit))
+        self.history.append((now, self.limit))
+        self._resize()
+
+    def metrics(self) -> Dict[str, Any]:
+        """A snapshot of the pool's state."""
+        return {
+            'limit': int(self.limit),
+            'workers': len(self._workers),
+            'in_flight': self.in_flight,
+            'queued': self._queue.qsize(),
+            'completed': self.completed,
+            'failed': self.failed,
+            'completed_per_second': self.completed_per_second,
+            'latency_ms': (self.latency or 0.0) * 1000,
+            'min_latency_ms': (self.min_latency or 0.0) * 1000,
+        }
+
+
+# --- Benchmark ---
+
+class Downstream:
+    """
+    A simulated service with a fixed capacity.
+
+    Up to `capacity` concurrent calls take `base_latency`; beyond that every call
+    slows down with the square of the overload (lock contention, thrashing).
+    """
+    def __init__(self, capacity: int = 20, base_latency: float = 0.01):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.active = 0
+
+    def call(self, payload: Any) -> Any:
+        self.active += 1
+        try:
+            overload = max(1.0, self.active / self.capacity)
+            gevent.sleep(self.base_latency * overload * overload * random.uniform(0.8, 1.2))
+            return payload
+        finally:
+            self.active -= 1
+
+
+class BurstyBenchmark:
+    """Sends bursts of tasks and measures latency from the burst's arrival to each task's completion."""
+    def __init__(self, bursts: int = 5, burst_size: int = 500, gap: float = 1.0):
+        self.bursts = bursts
+        self.burst_size = burst_size
+        self.gap = gap
+
+    def run(self, spawn: Callable, join: Callable) -> Dict[str, float]:
+        downstream = Downstream()
+        latencies: List[float] = []
+
+        def task(submitted_at: float) -> None:
+            downstream.call(None)
+            latencies.append(time.perf_counter() - submitted_at)
+
+        start_time = time.perf_counter()
+        for burst in range(self.bursts):
+            # bursts arrive on a fixed schedule; a producer held up by a full pool
+            # does not make the next burst "arrive" later
+            arrived_at = start_time + burst * self.gap
+            gevent.sleep(max(0.0, arrived_at - time.perf_counter()))
+            for _ in range(self.burst_size):
+                spawn(task, arrived_at)
+        join()
+        elapsed = time.perf_counter() - start_time
+
+        latencies.sort()
+        return {
+            'seconds': elapsed,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+            'tasks': len(latencies)
+        }
+
+
+def main():
+    """Compares fixed pools with the adaptive pool under bursty load."""
+    benchmark = BurstyBenchmark()
+
+    def report(label: str, result: Dict[str, float]) -> None:
+        logger.info(
+            f"{label:<24} {result['tasks']} tasks in {result['seconds']:5.2f}s  "
+            f"p50 {result['p50_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms"
+        )
+
+    for size in (4, 20, 200):
+        pool = Pool(size)
+        report(f"fixed Pool({size})", benchmark.run(pool.spawn, pool.join))
+
+    for strategy in ("gradient", "aimd"):
+        pool = AdaptivePool(AdaptivePoolConfig(strategy=strategy))
+        report(f"AdaptivePool({strategy})", benchmark.run(pool.spawn, pool.join))
+        limits = [limit for _, limit in pool.history]
+        logger.info(f"  limit ranged {min(limits):.0f}-{max(limits):.0f}, final metrics {pool.metrics()}")
+        pool.close()
+
+    # imap_unordered with backpressure: the generator is consumed as the workers keep up
+    pool = AdaptivePool()
+    downstream = Downstream()
+    total = sum(1 for _ in pool.imap_unordered(downstream.call, range(5000)))
+    logger.info(f"imap_unordered processed {total} items, limit settled at {int(pool.limit)}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# Deadline-aware Scheduling on gevent Queues
+#
+# In a8_queues.py, consumers of Queue/JoinableQueue handle items in arrival order and
+# PriorityQueueSync.Task compares on priority only. Two problems show up under load:
+#   - strict priority starves low-priority work for as long as high-priority work keeps coming
+#   - nothing has a deadline, so a consumer happily spends time on a request whose
+#     caller gave up long ago, making the requests behind it late too
+#
+# DeadlineQueue keeps one heap ordered by a policy:
+#   "fifo"      arrival order (what a plain Queue does)
+#   "priority"  strict priority, FIFO within a priority (PriorityQueueSync)
+#   "aged"      priority with aging: waiting `aging_interval` seconds is worth one priority
+#               level, so old low-priority work eventually overtakes fresh high-priority work
+#   "edf"       earliest deadline first
+# and drops items whose deadline already passed when they reach the front.
+
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import gevent
+from gevent.event import Event
+from gevent.queue import Empty
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+POLICIES = ("fifo", "priority", "aged", "edf")
+
+
+class Job:
+    """A queued item: priority (lower is more urgent), absolute deadline and payload."""
+    __slots__ = ('priority', 'deadline', 'enqueued_at', 'payload')
+
+    def __init__(self, priority: int, deadline: float, payload: Any = None):
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued_at = time.perf_counter()
+        self.payload = payload
+
+    def __repr__(self) -> str:
+        return f"Job(priority={self.priority}, deadline_in={self.deadline - time.perf_counter():.3f}s)"
+
+
+class DeadlineQueue:
+    """
+    A gevent queue with a pluggable ordering policy that drops expired jobs.
+
+    The sort key of every policy is fixed when the job is queued, so a plain heap
+    works. For "aged" that holds because the aged priority
+        priority - (now - enqueued_at) / aging_interval
+    orders jobs exactly like priority * aging_interval + enqueued_at: `now` is the
+    same for every job in the queue at the moment of comparison.
+    """
+    def __init__(self, policy: str = "edf", aging_interval: float = 0.5, drop_expired: bool = True):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.policy = policy
+        self.aging_interval = aging_interval
+        self.drop_expired = drop_expired
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()  # tie-breaker: FIFO among equal keys
+        self._not_empty = Event()
+
+        self.started_at = time.perf_counter()
+        self.enqueued: Dict[int, int] = defaultdict(int)
+        self.dispatched: Dict[int, int] = defaultdict(int)
+        self.expired: Dict[int, int] = defaultdict(int)
+
+    def _key(self, job: Job) -> float:
+        if self.policy == "fifo":
+            return job.enqueued_at
+        if self.policy == "priority":
+            return job.priority
+        if self.policy == "aged":
+            return job.priority * self.aging_interval + job.enqueued_at
+        return job.deadline
+
+    def put(self, job: Job) -> None:
+        heapq.heappush(self._heap, (self._key(job), next(self._counter), job))
+        self.enqueued[job.priority] += 1
+        self._not_empty.set()
+
+    def get(self, timeout: Optional[float] = None) -> Job:
+        """Returns the next job that can still meet its deadline; raises Empty on timeout."""
+        end_time = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            while not self._heap:
+                self._not_empty.clear()
+                remaining = None if end_time is None else end_time - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    raise Empty
+                self._not_empty.wait(remaining)
+
+            job = heapq.heappop(self._heap)[2]
+            if self.drop_expired and job.deadline < time.perf_counter():
+                # stale: the caller has given up, spend the time on someone who hasn't
+                self.expired[job.priority] += 1
+                continue
+            self.dispatched[job.priority] += 1
+            return job
+
+    def qsize(self) -> int:
+        return len(self._heap)
+
+    def stats(self) -> Dict[int, Dict[str, float]]:
+        """Per-priority counters and dispatch throughput (jobs/s since creation)."""
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            priority: {
+                'enqueued': self.enqueued[priority],
+                'dispatched': self.dispatched[priority],
+                'expired': self.expired[priority],
+                'dispatched_per_second': self.dispatched[priority] / elapsed
+            }
+            for priority in sorted(self.enqueued)
+        }
+
+
+class SloBenchmarkConfig:
+    """Load shape for the SLO benchmark."""
+    def __init__(
+        self,
+        num_workers: int = 4,
+        service_time: float = 0.005,
+        duration: float = 3.0,
+        overload_rate: float = 1200.0,
+        normal_rate: float = 500.0,
+        # priority -> (share of traffic, SLO in seconds)
+        classes: Optional[Dict[int, tuple]] = None,
+        seed: int = 42
+    ):
+        self.num_workers = num_workers
+        self.service_time = service_time
+        self.duration = duration
+        self.overload_rate = overload_rate
+        self.normal_rate = normal_rate
+        self.classes = classes or {0: (0.2, 0.05), 1: (0.3, 0.2), 2: (0.5, 1.0)}
+        self.seed = seed
+
+
+class SloBenchmark:
+    """
+    Sends the same arrival schedule through every policy.
+
+    Capacity is num_workers / service_time (800 jobs/s by default). The first half of
+    the run arrives faster than that, the second half slower, so the queue builds up
+    and drains again. A job meets its SLO when it finishes before its deadline.
+    """
+    def __init__(self, config: SloBenchmarkConfig):
+        self.config = config
+        self.schedule = self._make_schedule()
+
+    def _make_schedule(self) -> List[tuple]:
+        rng = random.Random(self.config.seed)
+        priorities = list(self.config.classes)
+        weights = [share for share, _ in self.config.classes.values()]
+        schedule, t = [], 0.0
+        while t < self.config.duration:
+            rate = self.config.overload_rate if t < self.config.duration / 2 else self.config.normal_rate
+            t += rng.expovariate(rate)
+            schedule.append((t, rng.choices(priorities, weights)[0]))
+        return schedule
+
+    def run(self, queue: DeadlineQueue) -> Dict[int, Dict[str, float]]:
+        config = self.config
+        latencies: Dict[int, List[float]] = defaultdict(list)
+        met: Dict[int, int] = defaultdict(int)
+        done = Event()
+
+        def producer() -> None:
+            start_time = time.perf_counter()
+            for offset, priority in self.schedule:
+                delay = start_time + offset - time.perf_counter()
+                if delay > 0:
+                    gevent.sleep(delay)
+                slo = config.classes[priority][1]
+                queue.put(Job(priority, time.perf_counter() + slo))
+            done.set()
+
+        def worker() -> None:
+            while True:
+                try:
+                    job = queue.get(timeout=0.05)
+                except Empty:
+                    if done.is_set():
+                        return
+                    continue
+                gevent.sleep(config.service_time)
+                finished = time.perf_counter()
+                latencies[job.priority].append(finished - job.enqueued_at)
+                if finished <= job.deadline:
+                    met[job.priority] += 1
+
+        gevent.joinall([gevent.spawn(producer)] + [gevent.spawn(worker) for _ in range(config.num_workers)])
+
+        results = {}
+        for priority, counters in queue.stats().items():
+            values = sorted(latencies[priority]) or [0.0]
+            results[priority] = {
+                'jobs': counters['enqueued'],
+                'met': met[priority],
+                'slo_met': met[priority] / counters['enqueued'],
+                'p99_ms': values[int(len(values) * 0.99)] * 1000,
+                'expired': counters['expired'],
+                'dispatched_per_second': counters['dispatched_per_second']
+            }
+        return results
+
+
+def main():
+    """
+    Compares queue policies on SLO attainment under a temporary overload.
+
+    No policy wins everywhere: strict priority protects p0/p1 and sacrifices p2, aging
+    moves the pain to the middle class, and EDF spreads misses over every class once
+    the overload is deep enough that not every deadline can be met.
+    """
+    benchmark = SloBenchmark(SloBenchmarkConfig())
+    logger.info(f"{len(benchmark.schedule)} jobs, SLOs per priority: "
+                f"{ {p: slo for p, (_, slo) in benchmark.config.classes.items()} }")
+
+    scenarios = [
+        ("fifo, no dropping", DeadlineQueue("fifo", drop_expired=False)),
+        ("fifo", DeadlineQueue("fifo")),
+        ("strict priority", DeadlineQueue("priority")),
+        ("priority + aging", DeadlineQueue("aged")),
+        ("edf", DeadlineQueue("edf")),
+    ]
+    for label, queue in scenarios:
+        results = benchmark.run(queue)
+        summary = "  ".join(
+            f"p{priority}: {r['slo_met']:6.1%} met, p99 {r['p99_ms']:7.1f} ms, {r['expired']:4} dropped"
+            for priority, r in results.items()
+        )
+        overall = sum(r['met'] for r in results.values()) / sum(r['jobs'] for r in results.values())
+        logger.info(f"{label:<18} all: {overall:6.1%} met  {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+from gevent import monkey
+
+# requests must use gevent sockets, so patch before anything else is imported
+monkey.patch_all()
+
+# Tail-latency tooling for the gevent HTTP client
+#
+# a10_http_client.py has a few habits that hurt the slowest requests most:
+#   - ResilientHttpRequests retries serially: a slow first attempt is waited out in full
+#   - ConcurrentHttpRequests.fetch_url calls requests.get(), which opens a new TCP
+#     connection for every request
+#   - gevent.joinall(..., timeout) returns at the timeout but leaves the stragglers running
+#   - a host that is down is still hit by every request, each waiting for its timeout
+#
+# This example adds:
+#   - hedged requests: if the first attempt has not answered after the host's p95
+#     latency, send a duplicate and take whichever answers first
+#   - a per-host circuit breaker (closed -> open -> half-open probe -> closed)
+#   - one pooled requests.Session shared by a greenlet pool
+#   - killing stragglers when a batch times out
+# and a local WSGI server that injects latency, so the benchmark needs no network.
+
+import logging
+import random
+import socket
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import gevent
+import requests
+from gevent.lock import BoundedSemaphore
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+from requests.adapters import HTTPAdapter
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class TailClientConfig:
+    """Configuration for the tail-tolerant client."""
+    def __init__(
+        self,
+        pool_size: int = 20,
+        timeout: float = 2.0,
+        hedge_percentile: float = 0.95,
+        min_hedge_delay: float = 0.005,
+        default_hedge_delay: float = 0.05,
+        max_hedge_ratio: float = 0.1,
+        failure_threshold: int = 5,
+        reset_timeout: float = 1.0
+    ):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        # never hedge sooner than this, and use the default until latencies are known
+        self.min_hedge_delay = min_hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        # at most this share of requests may send a duplicate (hedging adds load)
+        self.max_hedge_ratio = max_hedge_ratio
+        # consecutive failures that open a host's circuit, and how long it stays open
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+
+class CircuitOpenError(Exception):
+    """Raised without sending anything when the host's circuit is open."""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    closed:    requests flow; `failure_threshold` consecutive failures open the circuit
+    open:      requests fail immediately for `reset_timeout` seconds
+    half_open: a single probe request is let through; success closes the circuit,
+               failure opens it again
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 1.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.time() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Circuit closed again")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.info(f"Circuit opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.time()
+
+
+class LatencyTracker:
+    """Keeps the last `window` latencies of a host and answers percentile queries."""
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self._sorted: Optional[List[float]] = None
+
+    def add(self, latency: float) -> None:
+        self.samples.append(latency)
+        self._sorted = None
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.samples) < 20:
+            return None  # not enough data to trust yet
+        if self._sorted is None:
+            self._sorted = sorted(self.samples)
+        return self._sorted[min(len(self._sorted) - 1, int(len(self._sorted) * p))]
+
+
+class TailTolerantClient:
+    """
+    HTTP client for many concurrent greenlets.
+
+    All greenlets of the pool share one requests.Session, whose connection pool is
+    sized to the greenlet pool, so connections are reused instead of reopened.
+    """
+    def __init__(self, config: Optional[TailClientConfig] = None, hedge: bool = True, breaker: bool = True):
+        self.config = config or TailClientConfig()
+        self.hedge = hedge
+        self.breaker = breaker
+        # a semaphore rather than Pool.spawn: Pool.spawn blocks the caller when the pool
+        # is full, which would delay the start of fetch_all's batch timeout
+        self.slots = BoundedSemaphore(self.config.pool_size)
+
+        self.session = requests.Session()
+        # one extra connection per greenlet for its hedge
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=self.config.pool_size * 2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.trackers: Dict[str, LatencyTracker] = {}
+        self.requests_sent = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(self.config.failure_threshold, self.config.reset_timeout)
+        return self.breakers[host]
+
+    def _hedge_delay(self, host: str) -> float:
+        p95 = self.trackers.setdefault(host, LatencyTracker()).percentile(self.config.hedge_percentile)
+        if p95 is None:
+            return self.config.default_hedge_delay
+        return max(self.config.min_hedge_delay, p95)
+
+    def _attempt(self, url: str, timeout: float) -> Any:
+        """Returns the response, or the exception (so a failed attempt doesn't print a traceback)."""
+        try:
+            response = self.session.get(url, timeout=timeout)
+            if response.status_code >= 500:
+                # server errors count as failures for the breaker (and lose the hedge race)
+                response.raise_for_status()
+            return response
+        except Exception as e:
+            return e
+
+    def get(self, url: str, timeout: Optional[float] = None) -> requests.Response:
+        timeout = timeout or self.config.timeout
+        host = urlsplit(url).netloc
+        breaker = self._breaker(host)
+        if self.breaker and not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        start_time = time.time()
+        self.requests_sent += 1
+        attempts = [gevent.spawn(self._attempt, url, timeout)]
+        try:
+            response = self._first_success(url, attempts, host, start_time + timeout)
+        except Exception:
+            breaker.record_failure()
+            raise
+        finally:
+            # the losing attempt is a straggler: kill it so it doesn't hold a connection
+            gevent.killall(attempts, block=False)
+
+        self.trackers.setdefault(host, LatencyTracker()).add(time.time() - start_time)
+        breaker.record_success()
+        return response
+
+    def _first_success(
+        self, url: str, attempts: List[gevent.Greenlet], host: str, deadline: float
+    ) -> requests.Response:
+        if self.hedge:
+            done = gevent.wait(attempts, timeout=self._hedge_delay(host), count=1)
+            if not done and self.hedges_sent < self.config.max_hedge_ratio * self.requests_sent:
+                self.hedges_sent += 1
+                attempts.append(gevent.spawn(self._attempt, url, deadline - time.time()))
+
+        pending = list(attempts)
+        error: Exception = TimeoutError("Request timed out")
+        while pending:
+            done = gevent.wait(pending, timeout=max(0.0, deadline - time.time()), count=1)
+            if not done:
+                break
+            for finished in done:
+                pending.remove(finished)
+                if not isinstance(finished.value, Exception):
+                    if finished is not attempts[0]:
+                        self.hedges_won += 1
+                    return finished.value
+                error = finished.value
+        raise error
+
+    def fetch_all(self, urls: List[str], batch_timeout: float) -> List[Dict[str, Any]]:
+        """Fetches every URL through the pool; whatever is still running at batch_timeout is killed."""
+        def fetch(url: str) -> Dict[str, Any]:
+            with self.slots:
+                # latency is measured from when the request gets a slot, not from the batch start
+                start_time = time.time()
+                try:
+                    response = self.get(url)
+                    return {'url': url, 'success': True, 'status_code': response.status_code,
+                            'response_time': time.time() - start_time}
+                except Exception as e:
+                    return {'url': url, 'success': False, 'error': type(e).__name__,
+                            'response_time': time.time() - start_time}
+
+        greenlets = [gevent.spawn(fetch, url) for url in urls]
+        gevent.joinall(greenlets, timeout=batch_timeout)
+        finished = [g.value for g in greenlets if g.ready()]
+        stragglers = [g for g in greenlets if not g.ready()]
+        if stragglers:
+            logger.info(f"Killing {len(stragglers)} stragglers after {batch_timeout}s")
+            gevent.killall(stragglers)
+        return finished
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class LatencyInjectingServer:
+    """
+    Local stand-in for a remote service.
+
+    Most requests take about `base_delay`; a `slow_ratio` share take `slow_delay`
+    (a GC pause, a cold cache, a noisy neighbour). set_failing(True) makes every
+    request return 503, to exercise the circuit breaker.
+    """
+    def __init__(self, port: int, base_delay: float = 0.005, slow_delay: float = 0.25, slow_ratio: float = 0.05):
+        self.port = port
+        self.base_delay = base_delay
+        self.slow_delay = slow_delay
+        self.slow_ratio = slow_ratio
+        self.failing = False
+        self.requests = 0
+        # pywsgi sends the headers and the body of a response in separate writes. On a
+        # kept-alive connection Nagle's algorithm then holds the body back until the
+        # client's delayed ACK (~40 ms), which would hide every gain from the Session.
+        # Accepted sockets inherit TCP_NODELAY from the listener on Linux.
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        listener.bind(('127.0.0.1', port))
+        listener.listen(1024)
+        self.server = WSGIServer(listener, self.app, log=None)
+
+    def app(self, environ: Dict[str, Any], start_response: Callable) -> List[bytes]:
+        self.requests += 1
+        if self.failing:
+            start_response('503 Service Unavailable', [('Content-Length', '0')])
+            return [b'']
+        delay = self.slow_delay if random.random() < self.slow_ratio else self.base_delay
+        gevent.sleep(delay * random.uniform(0.8, 1.2))
+        body = b'{"status": "ok"}'
+        start_response('200 OK', [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+        return [body]
+
+    def set_failing(self, failing: bool) -> None:
+        self.failing = failing
+
+    def start(self) -> None:
+        self.server.start()
+
+    def stop(self) -> None:
+        self.server.stop()
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, float]:
+    latencies = sorted(r['response_time'] * 1000 for r in results if r['success'])
+    if not latencies:
+        return {'ok': 0, 'failed': len(results), 'p50_ms': 0.0, 'p99_ms': 0.0}
+    return {
+        'ok': len(latencies),
+        'failed': len(results) - len(latencies),
+        'p50_ms': latencies[len(latencies) // 2],
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    }
+
+
+def plain_fetch_all(urls: List[str], pool_size: int, timeout: float) -> List[Dict[str, Any]]:
+    """The a10 approach: requests.get() per request, no session, no hedging."""
+    def fetch(url: str) -> Dict[str, Any]:
+        start_time = time.time()
+        try:
+            response = requests.get(url, timeout=timeout)
+            return {'url': url, 'success': response.status_code < 500, 'response_time': time.time() - start_time}
+        except Exception as e:
+            return {'url': url, 'success': False, 'error': type(e).__name__, 'response_time': time.time() - start_time}
+
+    return list(Pool(pool_size).imap_unordered(fetch, urls))
+
+
+def main():
+    """Benchmarks p99 with and without hedging, then shows the circuit breaker."""
+    server = LatencyInjectingServer(port=8720)
+    server.start()
+    url = 'http://127.0.0.1:8720/'
+    urls = [url] * 2000
+
+    try:
+        # 1. Tail latency
+        config = TailClientConfig()
+        scenarios = [
+            ("requests.get (a10)", lambda: plain_fetch_all(urls, config.pool_size, config.timeout)),
+            ("pooled Session", lambda: TailTolerantClient(config, hedge=False).fetch_all(urls, 60)),
+        ]
+        hedged_client = TailTolerantClient(config, hedge=True)
+        scenarios.append(("Session + hedging", lambda: hedged_client.fetch_all(urls, 60)))
+
+        for label, run in scenarios:
+            start_time = time.time()
+            stats = summarize(run())
+            elapsed = time.time() - start_time
+            logger.info(
+                f"{label:<20} {stats['ok'] / elapsed:7.0f} req/s  p50 {stats['p50_ms']:6.1f} ms  "
+                f"p99 {stats['p99_ms']:6.1f} ms  failed {stats['failed']}"
+            )
+        logger.info(
+            f"Hedging sent {hedged_client.hedges_sent} duplicates "
+            f"({hedged_client.hedges_sent / hedged_client.requests_sent:.1%} extra load), "
+            f"{hedged_client.hedges_won} of them answered first"
+        )
+        hedged_client.close()
+
+        # 2. Circuit breaker: the server fails for a while, then recovers
+        client = TailTolerantClient(TailClientConfig(reset_timeout=0.5))
+        server.set_failing(True)
+        before = server.requests
+        results = client.fetch_all([url] * 200, batch_timeout=10)
+        logger.info(
+            f"While failing: {summarize(results)['failed']} requests failed, but only "
+            f"{server.requests - before} reached the server "
+            f"({client.breakers['127.0.0.1:8720'].rejected} rejected by the open circuit)"
+        )
+        server.set_failing(False)
+        gevent.sleep(0.6)  # past reset_timeout: the next request is the half-open probe
+        client.get(url)
+        results = client.fetch_all([url] * 50, batch_timeout=10)
+        logger.info(f"After recovery: {summarize(results)['ok']} of 50 requests succeeded")
+        client.close()
+
+        # 3. Kill-on-timeout: a batch timeout shorter than the slow requests
+        client = TailTolerantClient(TailClientConfig(), hedge=False)
+        server.slow_ratio = 0.5
+        results = client.fetch_all([url] * 100, batch_timeout=0.1)
+        logger.info(f"Batch with 0.1s timeout returned {len(results)} of 100 results; the rest were killed")
+        client.close()
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
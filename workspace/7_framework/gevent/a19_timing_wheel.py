@@ -0,0 +1,353 @@
+# Hierarchical Timing Wheel
+#
+# a9_timeouts-sleep.py wraps every operation in `with Timeout(seconds):`. Each Timeout
+# registers its own libev timer, and libev keeps timers in a heap: arming and
+# cancelling cost O(log n) and every timer is a separate watcher object. That is fine
+# for a handful, but a server with 100k in-flight requests, each with a deadline that
+# almost never fires, spends real time and memory on timers it then throws away.
+#
+# A timing wheel trades precision for cost:
+#   - time is cut into ticks (10 ms by default); a deadline is rounded up to a tick
+#   - level 0 has one slot per tick for the next `slots` ticks; each higher level has
+#     one slot per full turn of the level below, like the hands of a clock
+#   - arming a timer adds it to one slot (a set), cancelling removes it: both O(1)
+#   - one repeating libev timer advances the wheel; when a lower level wraps, the next
+#     slot of the level above is "cascaded" down into finer slots
+# Deadlines fire up to one tick late, never early.
+
+import gc
+import logging
+import math
+import time
+import tracemalloc
+from typing import Any, Callable, List, Optional, Set
+
+import gevent
+from gevent.timeout import Timeout
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class TimingWheelConfig:
+    """Configuration for the timing wheel."""
+    def __init__(self, tick: float = 0.01, slots: int = 256, levels: int = 4):
+        self.tick = tick
+        self.slots = slots
+        # 256 slots * 4 levels at 10 ms covers 256**4 * 0.01s (about 500 days)
+        self.levels = levels
+
+
+class TimerHandle:
+    """One armed timer; cancel() removes it from its slot."""
+    __slots__ = ('wheel', 'expires', 'callback', 'args', 'slot')
+
+    def __init__(self, wheel: 'TimingWheel', expires: int, callback: Callable, args: tuple):
+        self.wheel = wheel
+        self.expires = expires  # absolute tick number
+        self.callback = callback
+        self.args = args
+        self.slot: Optional[Set['TimerHandle']] = None
+
+    @property
+    def pending(self) -> bool:
+        return self.slot is not None
+
+    def cancel(self) -> None:
+        if self.slot is not None:
+            self.slot.discard(self)
+            self.slot = None
+            self.wheel.count -= 1
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel driven by a single libev timer.
+
+    Callbacks run in the hub, like gevent's own timer callbacks: they must not block.
+    """
+    def __init__(self, config: Optional[TimingWheelConfig] = None):
+        self.config = config or TimingWheelConfig()
+        self.tick = self.config.tick
+        self.slots = self.config.slots
+        self.wheels: List[List[Set[TimerHandle]]] = [
+            [set() for _ in range(self.slots)] for _ in range(self.config.levels)
+        ]
+        self.started_at = time.monotonic()
+        self.current_tick = 0
+        self.count = 0
+        self.fired = 0
+        self._timer = None
+
+    def _now_tick(self) -> int:
+        return int((time.monotonic() - self.started_at) / self.tick)
+
+    def _place(self, handle: TimerHandle) -> None:
+        delta = handle.expires - self.current_tick
+        if delta <= 0:
+            # already due: fire on the next tick
+            handle.expires = self.current_tick + 1
+            delta = 1
+        span = self.slots
+        for level, wheel in enumerate(self.wheels):
+            if delta < span or level == len(self.wheels) - 1:
+                index = (handle.expires // (span // self.slots)) % self.slots
+                slot = wheel[index]
+                slot.add(handle)
+                handle.slot = slot
+                return
+            span *= self.slots
+
+    def call_later(self, seconds: float, callback: Callable, *args: Any) -> TimerHandle:
+        """Runs callback(*args) in the hub after at least `seconds`."""
+        if self.count == 0:
+            # the wheel was idle: skip the empty ticks instead of replaying them
+            self.current_tick = self._now_tick()
+            self._start()
+        expires = math.ceil((time.monotonic() - self.started_at + seconds) / self.tick)
+        handle = TimerHandle(self, expires, callback, args)
+        self._place(handle)
+        self.count += 1
+        return handle
+
+    def _start(self) -> None:
+        if self._timer is None:
+            self._timer = gevent.get_hub().loop.timer(self.tick, self.tick)
+            self._timer.start(self._on_tick)
+
+    def _stop(self) -> None:
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer.close()
+            self._timer = None
+
+    def _on_tick(self) -> None:
+        # a busy hub can run this late: catch up on every tick that has passed
+        target = self._now_tick()
+        while self.current_tick < target and self.count:
+            self._advance()
+        self.current_tick = max(self.current_tick, target)
+        if self.count == 0:
+            self._stop()
+
+    def _advance(self) -> None:
+        self.current_tick += 1
+        tick = self.current_tick
+
+        # cascade: when a level wraps, redistribute the matching slot of the level above
+        span = self.slots
+        for level in range(1, len(self.wheels)):
+            if tick % span:
+                break
+            slot = self.wheels[level][(tick // span) % self.slots]
+            if slot:
+                handles = list(slot)
+                slot.clear()
+                for handle in handles:
+                    self._place(handle)
+            span *= self.slots
+
+        slot = self.wheels[0][tick % self.slots]
+        if not slot:
+            return
+        due = list(slot)
+        slot.clear()
+        for handle in due:
+            handle.slot = None
+            self.count -= 1
+            self.fired += 1
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                logger.error(f"Timer callback failed: {e}")
+
+
+_default_wheel: Optional[TimingWheel] = None
+
+
+def get_wheel() -> TimingWheel:
+    """The shared wheel used by deadline()."""
+    global _default_wheel
+    if _default_wheel is None:
+        _default_wheel = TimingWheel()
+    return _default_wheel
+
+
+class DeadlineExceeded(Timeout):
+    """
+    Raised when a deadline() expires.
+
+    It subclasses gevent.Timeout, so existing `except Timeout:` handlers keep working.
+    It is created with seconds=None, which makes gevent skip creating a libev timer.
+    """
+    def __init__(self, seconds: float):
+        Timeout.__init__(self, None)
+        self.deadline_seconds = seconds
+
+    def __str__(self) -> str:
+        return f"{self.deadline_seconds} seconds"
+
+
+class deadline:
+    """
+    Drop-in replacement for `with Timeout(seconds[, exception]):` backed by the wheel.
+
+        with deadline(2.0):                    # raises DeadlineExceeded (a Timeout)
+        with deadline(2.0, CustomTimeoutError): # raises that exception instead
+        with deadline(2.0, False):              # silently leaves the block
+    """
+    __slots__ = ('seconds', 'exception', 'wheel', '_handle', '_raised')
+
+    def __init__(self, seconds: float, exception: Any = None, wheel: Optional[TimingWheel] = None):
+        self.seconds = seconds
+        self.exception = exception
+        self.wheel = wheel or get_wheel()
+        self._handle: Optional[TimerHandle] = None
+        self._raised: Optional[BaseException] = None
+
+    def _expire(self, glet: gevent.Greenlet) -> None:
+        # runs in the hub, the same way gevent.Timeout throws into the greenlet
+        if self.exception is None or self.exception is False:
+            self._raised = DeadlineExceeded(self.seconds)
+        elif isinstance(self.exception, BaseException):
+            self._raised = self.exception
+        else:
+            self._raised = self.exception()
+        glet.throw(self._raised)
+
+    def __enter__(self) -> 'deadline':
+        self._handle = self.wheel.call_later(self.seconds, self._expire, gevent.getcurrent())
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self._handle.cancel()
+        # swallow our own exception only in silent mode; never someone else's
+        return exc_value is not None and exc_value is self._raised and self.exception is False
+
+
+# --- Benchmark ---
+
+def arm_cancel_benchmark(count: int, seconds: float = 30.0) -> dict:
+    """Arms `count` timeouts at once, then cancels them all (the usual fate of a deadline)."""
+    results = {}
+
+    start_time = time.perf_counter()
+    timeouts = []
+    for _ in range(count):
+        timeout = Timeout(seconds)
+        timeout.start()
+        timeouts.append(timeout)
+    armed = time.perf_counter()
+    for timeout in timeouts:
+        timeout.close()
+    results['gevent.Timeout'] = ((armed - start_time) / count * 1e9, (time.perf_counter() - armed) / count * 1e9)
+    del timeouts
+
+    wheel = TimingWheel()
+    start_time = time.perf_counter()
+    handles = [wheel.call_later(seconds, None) for _ in range(count)]
+    armed = time.perf_counter()
+    for handle in handles:
+        handle.cancel()
+    results['TimingWheel'] = ((armed - start_time) / count * 1e9, (time.perf_counter() - armed) / count * 1e9)
+    return results
+
+
+def memory_benchmark(count: int, seconds: float = 30.0) -> dict:
+    """Bytes allocated per armed timeout, measured with tracemalloc."""
+    def arm_timeout() -> Timeout:
+        timeout = Timeout(seconds)
+        timeout.start()
+        return timeout
+
+    wheel = TimingWheel()
+    results = {}
+    for name, arm, cancel in [
+        ('gevent.Timeout', arm_timeout, Timeout.close),
+        ('TimingWheel', lambda: wheel.call_later(seconds, None), TimerHandle.cancel),
+    ]:
+        gc.collect()
+        tracemalloc.start()
+        armed = [arm() for _ in range(count)]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = current / count
+        for item in armed:
+            cancel(item)
+        del armed
+    return results
+
+
+def firing_benchmark(count: int = 100_000) -> dict:
+    """Lets `count` deadlines expire across 1s and measures how late they fire."""
+    wheel = TimingWheel()
+    lateness: List[float] = []
+
+    def fired(expected: float) -> None:
+        lateness.append(time.monotonic() - expected)
+
+    for i in range(count):
+        delay = 0.1 + (i % 1000) / 1000
+        wheel.call_later(delay, fired, time.monotonic() + delay)
+    while wheel.count:
+        gevent.sleep(0.05)
+    lateness.sort()
+    return {
+        'fired': len(lateness),
+        'p50_ms': lateness[len(lateness) // 2] * 1000,
+        'max_ms': lateness[-1] * 1000,
+        'early': sum(1 for late in lateness if late < -1e-6)
+    }
+
+
+def deadline_demo() -> None:
+    """The a9 TimeoutContextExample cases, with deadline() in place of Timeout()."""
+    def operation_with_deadline(operation_id: int, duration: float, seconds: float) -> str:
+        try:
+            with deadline(seconds):
+                gevent.sleep(duration)
+                return f"Result from operation {operation_id}"
+        except Timeout:
+            return f"Operation {operation_id}: TIMED OUT"
+
+    greenlets = [
+        gevent.spawn(operation_with_deadline, op_id, duration, seconds)
+        for op_id, duration, seconds in [(1, 0.1, 0.2), (2, 0.3, 0.2), (3, 0.05, 0.1), (4, 0.4, 0.1)]
+    ]
+    gevent.joinall(greenlets)
+    for g in greenlets:
+        logger.info(f"  {g.value}")
+
+    with deadline(0.05, False):
+        gevent.sleep(1)
+    logger.info("  Silent deadline left the block without an exception")
+
+
+def main():
+    logger.info("=== deadline() with the a9 test cases ===")
+    deadline_demo()
+
+    logger.info("=== Arm/cancel cost (ns per timer) ===")
+    for count in (100_000, 1_000_000):
+        for name, (arm_ns, cancel_ns) in arm_cancel_benchmark(count).items():
+            logger.info(f"{count:>9,} {name:<16} arm {arm_ns:7.0f} ns  cancel {cancel_ns:7.0f} ns")
+
+    logger.info("=== Memory (bytes per armed timer, tracemalloc) ===")
+    for count in (100_000, 1_000_000):
+        for name, per_timer in memory_benchmark(count).items():
+            logger.info(f"{count:>9,} {name:<16} {per_timer:7.0f} bytes")
+
+    logger.info("=== Expiry precision ===")
+    result = firing_benchmark()
+    logger.info(
+        f"{result['fired']:,} deadlines fired: lateness p50 {result['p50_ms']:.2f} ms, "
+        f"max {result['max_ms']:.2f} ms, {result['early']} early"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# Broadcast Fan-out with Versioned Snapshots
+#
+# BasicEventSync in a7_event-synchronization.py has consumers wait on one Event and read
+# shared data once it is set. Reused for a stream of updates (a config change pushed
+# to thousands of greenlets), that pattern has three costs:
+#   - every update wakes every subscriber, even when the next update follows 1 ms later
+#   - all subscribers are woken in one go, so the hub runs nothing else (no sockets, no
+#     timers) until the last of 10k greenlets has handled the update
+#   - a greenlet that starts waiting after set() has no way to tell "new" from "seen"
+#
+# Broadcast fixes them with:
+#   - versioned snapshots: wait(after_version) returns at once when a newer snapshot
+#     exists, so late subscribers get the latest value without a wakeup
+#   - coalescing: updates published within `coalesce_window` are delivered as one
+#     wakeup carrying the newest value
+#   - batched wakeups: subscribers are spread over `shards` Events that are set one at a
+#     time, yielding to the hub between shards
+
+import logging
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import gevent
+from gevent.event import Event
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class BroadcastConfig:
+    """Configuration for the Broadcast primitive."""
+    def __init__(self, coalesce_window: float = 0.005, shards: int = 16):
+        # 0 disables coalescing: every publish schedules its own wakeup
+        self.coalesce_window = coalesce_window
+        # subscribers are woken one shard at a time; 1 wakes everyone at once
+        self.shards = shards
+
+
+class Snapshot:
+    """An immutable published value and its version."""
+    __slots__ = ('version', 'value', 'published_at')
+
+    def __init__(self, version: int, value: Any, published_at: float):
+        self.version = version
+        self.value = value
+        self.published_at = published_at
+
+    def __repr__(self) -> str:
+        return f"Snapshot(version={self.version}, value={self.value!r})"
+
+
+class Broadcast:
+    """Single-writer, many-reader broadcast of the latest value."""
+    def __init__(self, initial: Any = None, config: Optional[BroadcastConfig] = None):
+        self.config = config or BroadcastConfig()
+        self._latest = Snapshot(0, initial, time.perf_counter())
+        self._events: List[Event] = [Event() for _ in range(self.config.shards)]
+        self._flush_scheduled = False
+        self.published = 0
+        self.flushes = 0
+
+    def latest(self) -> Snapshot:
+        return self._latest
+
+    def publish(self, value: Any) -> int:
+        """Stores a new snapshot and schedules (at most one pending) wakeup."""
+        self._latest = Snapshot(self._latest.version + 1, value, time.perf_counter())
+        self.published += 1
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            gevent.spawn_later(self.config.coalesce_window, self._flush)
+        return self._latest.version
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        self.flushes += 1
+        for index, event in enumerate(self._events):
+            # waiters hold the old Event; new waiters go to a fresh one
+            self._events[index] = Event()
+            event.set()
+            # let this shard's subscribers, timers and I/O run before waking the next shard
+            # (sleep(0) would only requeue us behind the callbacks; idle() waits for the loop)
+            gevent.idle()
+
+    def wait(self, after_version: int = 0, timeout: Optional[float] = None) -> Snapshot:
+        """Returns the first snapshot newer than after_version (the latest one on timeout)."""
+        snapshot = self._latest
+        if snapshot.version > after_version:
+            return snapshot
+        # greenlet ids are aligned to 16 bytes, so drop the low bits before picking a shard
+        shard = (id(gevent.getcurrent()) >> 4) % len(self._events)
+        self._events[shard].wait(timeout)
+        return self._latest
+
+    def subscribe(self, after_version: int = 0) -> Iterator[Snapshot]:
+        """Yields every snapshot this subscriber gets to see (intermediate ones may be coalesced)."""
+        while True:
+            snapshot = self.wait(after_version)
+            after_version = snapshot.version
+            yield snapshot
+
+
+class NaiveBroadcast:
+    """The a7 pattern extended to repeated updates: one Event per update, everyone woken each time."""
+    def __init__(self, initial: Any = None):
+        self._latest = Snapshot(0, initial, time.perf_counter())
+        self._event = Event()
+        self.published = 0
+
+    def publish(self, value: Any) -> int:
+        self._latest = Snapshot(self._latest.version + 1, value, time.perf_counter())
+        self.published += 1
+        event, self._event = self._event, Event()
+        event.set()
+        return self._latest.version
+
+    def wait(self, after_version: int = 0, timeout: Optional[float] = None) -> Snapshot:
+        if self._latest.version > after_version:
+            return self._latest
+        self._event.wait(timeout)
+        return self._latest
+
+
+class FanoutBenchmark:
+    """Pushes bursts of updates to many subscribers and measures delivery."""
+    def __init__(self, subscribers: int = 10_000, bursts: int = 10, updates_per_burst: int = 10, gap: float = 0.05):
+        self.subscribers = subscribers
+        self.bursts = bursts
+        self.updates_per_burst = updates_per_burst
+        self.gap = gap
+
+    def run(self, broadcast) -> Dict[str, float]:
+        latencies: List[float] = []
+        wakeups = [0]
+        final_version = self.bursts * self.updates_per_burst
+
+        def subscriber() -> None:
+            version = 0
+            while version < final_version:
+                snapshot = broadcast.wait(version)
+                version = snapshot.version
+                wakeups[0] += 1
+                # per-subscriber work: apply the new config
+                _ = snapshot.value['limit'] * 2
+                latencies.append(time.perf_counter() - snapshot.published_at)
+
+        # a ticker that should run every millisecond shows how long the hub was busy
+        longest_stall = [0.0]
+
+        def ticker() -> None:
+            while True:
+                before = time.perf_counter()
+                gevent.sleep(0.001)
+                longest_stall[0] = max(longest_stall[0], time.perf_counter() - before - 0.001)
+
+        greenlets = [gevent.spawn(subscriber) for _ in range(self.subscribers)]
+        gevent.sleep(0)  # let every subscriber start waiting
+        tick = gevent.spawn(ticker)
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        for burst in range(self.bursts):
+            for update in range(self.updates_per_burst):
+                broadcast.publish({'limit': burst * self.updates_per_burst + update})
+                gevent.sleep(0)  # updates of one burst arrive back to back
+            gevent.sleep(self.gap)
+        gevent.joinall(greenlets)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        tick.kill()
+
+        latencies.sort()
+        return {
+            'wakeups': wakeups[0],
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+            'cpu_s': cpu,
+            'wall_s': wall,
+            'stall_ms': longest_stall[0] * 1000
+        }
+
+
+def late_subscriber_demo() -> None:
+    broadcast = Broadcast({'feature_x': False})
+    broadcast.publish({'feature_x': True})
+    start_time = time.perf_counter()
+    snapshot = broadcast.wait(after_version=0)
+    logger.info(
+        f"Late subscriber got {snapshot} in {(time.perf_counter() - start_time) * 1e6:.1f} us without waiting"
+    )
+
+
+def main():
+    """Benchmarks fan-out to 10k subscribers."""
+    late_subscriber_demo()
+
+    benchmark = FanoutBenchmark()
+    scenarios = [
+        ("one Event per update (a7)", NaiveBroadcast({'limit': 0})),
+        ("coalescing only", Broadcast({'limit': 0}, BroadcastConfig(coalesce_window=0.005, shards=1))),
+        ("batched wakeups only", Broadcast({'limit': 0}, BroadcastConfig(coalesce_window=0.0, shards=16))),
+        ("coalescing + batching", Broadcast({'limit': 0}, BroadcastConfig(coalesce_window=0.005, shards=16))),
+    ]
+    logger.info(
+        f"{benchmark.subscribers:,} subscribers, {benchmark.bursts} bursts of {benchmark.updates_per_burst} updates"
+    )
+    for label, broadcast in scenarios:
+        result = benchmark.run(broadcast)
+        logger.info(
+            f"{label:<26} {result['wakeups']:>9,} wakeups  CPU {result['cpu_s']:5.2f}s  "
+            f"latency p50 {result['p50_ms']:6.1f} ms  p99 {result['p99_ms']:6.1f} ms  "
+            f"longest hub stall {result['stall_ms']:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
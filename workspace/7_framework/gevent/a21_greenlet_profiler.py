@@ -0,0 +1,294 @@
+# Greenlet Profiler and Hub Blocking Detector
+#
+# a5_monkey-patching.py only measures total wall time. When a gevent program is slow the
+# question is usually "which greenlet kept the hub from running?", and cProfile can't
+# answer it: it doesn't know about greenlets.
+#
+# This module combines two hooks:
+#   - greenlet.settrace(): called on every switch, so we can charge CPU time to the
+#     greenlet that was running, count switches and measure how long each greenlet
+#     ran without yielding (a long run = the hub and every other greenlet were stuck)
+#   - gevent's monitoring thread (a native thread): it samples the stack of the hub's
+#     thread every few milliseconds, for the blocking reports and for a folded-stack
+#     file that flamegraph.pl / speedscope can render
+# Long runs whose stack shows a call into a module that was not monkey-patched
+# (time.sleep, socket, select, ...) are flagged as un-patched blocking calls.
+#
+# Usage, either
+#   import a21_greenlet_profiler          # first line of a demo (or right after patch_all)
+# or, without editing the demo:
+#   python a21_greenlet_profiler.py a9_timeouts-sleep.py
+# The report is logged at exit and the stacks are written to gevent_profile.folded
+# (override with GEVENT_PROFILE_OUTPUT; set GEVENT_PROFILE=0 to disable the import hook).
+
+import atexit
+import linecache
+import logging
+import os
+import runpy
+import sys
+import time
+import warnings
+import weakref
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import gevent
+import gevent.events
+import greenlet
+from gevent import monkey
+from gevent._monitor import MonitorWarning
+from gevent.hub import Hub
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# the monitoring thread warns once that it can't watch memory without psutil; we don't need it
+warnings.filterwarnings('ignore', category=MonitorWarning)
+
+Frame = Tuple[str, str, int]  # (filename, function, line number)
+
+# source text that means "this call blocks unless <module> is monkey-patched"
+BLOCKING_CALLS = {
+    'time.sleep': 'time',
+    'socket.': 'socket',
+    'select.': 'select',
+    'subprocess.': 'subprocess',
+    'requests.': 'socket',
+    'urllib': 'socket',
+    'threading.': 'threading',
+}
+
+
+class ProfilerConfig:
+    """Configuration for the greenlet profiler."""
+    def __init__(
+        self,
+        blocking_threshold: float = 0.1,
+        sample_interval: float = 0.005,
+        max_stretches: int = 20,
+        output_path: str = "gevent_profile.folded"
+    ):
+        # a greenlet that runs this long without switching is reported as blocking
+        self.blocking_threshold = blocking_threshold
+        self.sample_interval = sample_interval
+        self.max_stretches = max_stretches
+        self.output_path = output_path
+
+
+class GreenletStats:
+    """Totals for every greenlet that ran the same function."""
+    __slots__ = ('greenlets', 'switches', 'cpu', 'wall', 'longest_run')
+
+    def __init__(self):
+        self.greenlets = 0
+        self.switches = 0
+        self.cpu = 0.0
+        self.wall = 0.0
+        self.longest_run = 0.0
+
+
+def greenlet_label(glet: Any) -> str:
+    """A readable name: the function a greenlet runs, 'Hub' or 'main'."""
+    if isinstance(glet, Hub):
+        return 'Hub'
+    if getattr(glet, 'parent', None) is None:
+        return 'main'
+    run = getattr(glet, '_run', None) or getattr(glet, 'run', None)
+    name = getattr(run, '__qualname__', None) or getattr(run, '__name__', None)
+    return name or type(glet).__name__
+
+
+class GreenletProfiler:
+    def __init__(self, config: Optional[ProfilerConfig] = None):
+        self.config = config or ProfilerConfig()
+        self.stats: Dict[str, GreenletStats] = defaultdict(GreenletStats)
+        self.folded: Counter = Counter()
+        # (duration, label, stack, un-patched module or None)
+        self.stretches: List[Tuple[float, str, List[Frame], Optional[str]]] = []
+        self.hub_blocked_reports = 0
+
+        self._labels: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self._current_label = 'main'
+        self._run_started_cpu = time.thread_time()
+        self._run_started_wall = time.perf_counter()
+        self._run_stack: List[Frame] = []  # latest stack sampled during the current run
+        self._previous_trace = None
+        self._hub_thread_ident: Optional[int] = None
+        self.installed = False
+
+    # --- greenlet.settrace hook (runs in the hub's thread on every switch) ---
+
+    def _label_for(self, glet: Any) -> str:
+        try:
+            return self._labels[glet]
+        except (KeyError, TypeError):
+            label = greenlet_label(glet)
+            try:
+                self._labels[glet] = label
+                self.stats[label].greenlets += 1
+            except TypeError:
+                pass
+            return label
+
+    def _trace(self, event: str, args: Tuple[Any, Any]) -> None:
+        if event in ('switch', 'throw'):
+            origin, target = args
+            cpu, wall = time.thread_time(), time.perf_counter()
+            label = self._label_for(origin)
+            stats = self.stats[label]
+            run_time = wall - self._run_started_wall
+            stats.cpu += cpu - self._run_started_cpu
+            stats.wall += run_time
+            # the hub's "runs" include waiting for I/O, so they don't count as blocking
+            if label != 'Hub':
+                if run_time > stats.longest_run:
+                    stats.longest_run = run_time
+                if run_time >= self.config.blocking_threshold:
+                    self._record_stretch(run_time, label, self._run_stack)
+
+            target_label = self._label_for(target)
+            self.stats[target_label].switches += 1
+            self._current_label = target_label
+            self._run_stack = []
+            self._run_started_cpu, self._run_started_wall = cpu, wall
+        if self._previous_trace is not None:
+            self._previous_trace(event, args)
+
+    def _record_stretch(self, duration: float, label: str, stack: List[Frame]) -> None:
+        self.stretches.append((duration, label, stack, unpatched_call(stack)))
+        self.stretches.sort(key=lambda stretch: -stretch[0])
+        del self.stretches[self.config.max_stretches:]
+
+    # --- monitoring thread hooks (run in gevent's native monitor thread) ---
+
+    def _sample(self, hub: Hub) -> None:
+        frame = sys._current_frames().get(self._hub_thread_ident)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append((frame.f_code.co_filename, frame.f_code.co_name, frame.f_lineno))
+            frame = frame.f_back
+        stack.reverse()
+        label = self._current_label
+        self.folded[';'.join([label] + [f"{os.path.basename(path)}:{name}" for path, name, _ in stack])] += 1
+        if label != 'Hub':
+            self._run_stack = stack
+
+    def _on_monitor_started(self, event: Any) -> None:
+        if isinstance(event, gevent.events.PeriodicMonitorThreadStartedEvent):
+            self._hub_thread_ident = event.monitor.hub.thread_ident
+            event.monitor.add_monitoring_function(self._sample, self.config.sample_interval)
+        elif isinstance(event, gevent.events.EventLoopBlocked):
+            # our own report covers it; keep gevent from printing the greenlet tree too
+            self.hub_blocked_reports += 1
+            logger.warning(f"Hub blocked for over {event.blocking_time}s by {greenlet_label(event.greenlet)}")
+            del event.info[:]
+
+    # --- install / report ---
+
+    def install(self) -> 'GreenletProfiler':
+        if self.installed:
+            return self
+        self.installed = True
+        gevent.config.monitor_thread = True
+        gevent.config.max_blocking_time = self.config.blocking_threshold
+        gevent.events.subscribers.append(self._on_monitor_started)
+        self._previous_trace = greenlet.settrace(self._trace)
+        hub = gevent.hub._get_hub()  # None until something has used the hub
+        if hub is not None and hub.periodic_monitoring_thread is None:
+            # the hub already exists (created before this import): start monitoring now
+            hub.start_periodic_monitoring_thread()
+        atexit.register(self.report)
+        return self
+
+    def report(self) -> None:
+        # charge the run that is still going on
+        self._trace('switch', (greenlet.getcurrent(), greenlet.getcurrent()))
+
+        logger.info("=== Greenlet profile ===")
+        logger.info(f"{'greenlet function':<40} {'count':>6} {'switches':>9} {'CPU ms':>9} {'longest run ms':>15}")
+        for label, stats in sorted(self.stats.items(), key=lambda item: -item[1].cpu)[:25]:
+            logger.info(
+                f"{label[:40]:<40} {stats.greenlets:>6} {stats.switches:>9} "
+                f"{stats.cpu * 1000:>9.1f} {stats.longest_run * 1000:>15.1f}"
+            )
+
+        unpatched = [name for name in ('socket', 'time', 'select', 'ssl', 'threading', 'subprocess')
+                     if not monkey.is_module_patched(name)]
+        if unpatched:
+            logger.info(f"Not monkey-patched: {', '.join(unpatched)}")
+
+        if self.stretches:
+            logger.info(f"=== Longest runs without yielding (>= {self.config.blocking_threshold * 1000:.0f} ms) ===")
+            for duration, label, stack, module in self.stretches:
+                where = "no stack sample"
+                if stack:
+                    path, name, lineno = stack[-1]
+                    where = f"{os.path.basename(path)}:{lineno} in {name}()"
+                flag = f"  <-- blocking call, '{module}' is not monkey-patched" if module else ""
+                logger.info(f"{duration * 1000:8.1f} ms in {label} at {where}{flag}")
+
+        if self.folded:
+            with open(self.config.output_path, 'w') as f:
+                for stack, count in self.folded.most_common():
+                    f.write(f"{stack} {count}\n")
+            logger.info(f"Wrote {len(self.folded)} folded stacks to {self.config.output_path} "
+                        f"(render with flamegraph.pl or speedscope)")
+
+
+def unpatched_call(stack: List[Frame]) -> Optional[str]:
+    """Returns the un-patched module a sampled stack is blocked in, if the source shows one."""
+    for path, _, lineno in reversed(stack[-3:]):
+        line = linecache.getline(path, lineno)
+        for call, module in BLOCKING_CALLS.items():
+            if call in line and not monkey.is_module_patched(module):
+                return module
+    return None
+
+
+profiler = GreenletProfiler(
+    ProfilerConfig(output_path=os.environ.get("GEVENT_PROFILE_OUTPUT", "gevent_profile.folded"))
+)
+
+
+# --- Demo ---
+
+def demo() -> None:
+    """A workload with one well-behaved, one CPU-heavy and one blocking greenlet."""
+    def polite_worker(n: int) -> None:
+        for _ in range(20):
+            gevent.sleep(0.01)
+
+    def cpu_heavy() -> int:
+        total = 0
+        for i in range(3_000_000):
+            total += i * i
+        return total
+
+    def blocking_sleeper() -> None:
+        # time is not monkey-patched in this demo, so this stops the whole hub
+        time.sleep(0.3)
+
+    greenlets = [gevent.spawn(polite_worker, i) for i in range(50)]
+    greenlets += [gevent.spawn(cpu_heavy), gevent.spawn(blocking_sleeper)]
+    gevent.joinall(greenlets)
+
+
+if __name__ == "__main__":
+    profiler.install()
+    if len(sys.argv) > 1:
+        # profile another demo: python a21_greenlet_profiler.py a9_timeouts-sleep.py [args]
+        script = sys.argv[1]
+        sys.argv = sys.argv[1:]
+        sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+        runpy.run_path(script, run_name="__main__")
+    else:
+        demo()
+elif os.environ.get("GEVENT_PROFILE", "1") != "0":
+    profiler.install()
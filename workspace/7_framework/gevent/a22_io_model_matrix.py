@@ -0,0 +1,375 @@
+# I/O Model Benchmark Matrix
+#
+# a5_monkey-patching-option.py shows that patch_all(thread=False) lets greenlets and
+# native threads live side by side, but not what each choice costs. This runner puts
+# numbers on it: the same workloads under four I/O models.
+#
+#   gevent-full      patch_all(); everything runs in greenlets
+#   gevent-partial   patch_all(thread=False); greenlets for sockets and sleeps, blocking
+#                    work (file reads, CPU) handed to gevent's native threadpool
+#   threads          no patching; a ThreadPoolExecutor with one thread per concurrent task
+#   asyncio          an event loop; file reads via asyncio.to_thread, CPU inline
+#
+# Workloads: "echo" (round trips to a local echo server), "file" (chunked reads of a
+# file), "sleep" (10 ms timer waits) and "cpu" (pure-Python arithmetic).
+#
+# Monkey-patching is process-wide and cannot be undone, so every (model, workload) cell
+# runs in its own subprocess. The echo server runs in a separate process as well, so
+# it is the same for every model.
+#
+#   python a22_io_model_matrix.py                          # full matrix
+#   python a22_io_model_matrix.py --models threads asyncio --workloads echo
+#   python a22_io_model_matrix.py --flame-dir flames       # also write folded stacks
+
+import _thread
+import argparse
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+# keep the real versions before any model monkey-patches them (the stack sampler needs both)
+_start_native_thread = _thread.start_new_thread
+_native_sleep = time.sleep
+
+MODELS = ('gevent-full', 'gevent-partial', 'threads', 'asyncio')
+WORKLOADS = ('echo', 'file', 'sleep', 'cpu')
+
+PAYLOAD = b'x' * 1024
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class MatrixConfig:
+    """Size of every workload; tasks run `concurrency` at a time."""
+    def __init__(
+        self,
+        concurrency: int = 100,
+        echo_tasks: int = 2000,
+        echo_round_trips: int = 5,
+        file_tasks: int = 500,
+        file_size: int = 256 * 1024,
+        sleep_tasks: int = 2000,
+        sleep_seconds: float = 0.01,
+        cpu_tasks: int = 200,
+        cpu_iterations: int = 50_000
+    ):
+        self.concurrency = concurrency
+        self.echo_tasks = echo_tasks
+        self.echo_round_trips = echo_round_trips
+        self.file_tasks = file_tasks
+        self.file_size = file_size
+        self.sleep_tasks = sleep_tasks
+        self.sleep_seconds = sleep_seconds
+        self.cpu_tasks = cpu_tasks
+        self.cpu_iterations = cpu_iterations
+
+    def tasks_for(self, workload: str) -> int:
+        return getattr(self, f"{workload}_tasks")
+
+
+# --- Echo server (its own process, plain threads) ---
+
+def run_echo_server(port: int) -> None:
+    import socketserver
+
+    class EchoHandler(socketserver.BaseRequestHandler):
+        def handle(self):
+            while True:
+                data = self.request.recv(65536)
+                if not data:
+                    break
+                self.request.sendall(data)
+
+    class Server(socketserver.ThreadingTCPServer):
+        allow_reuse_address = True
+        daemon_threads = True
+        request_queue_size = 1024
+
+    with Server(('127.0.0.1', port), EchoHandler) as server:
+        server.serve_forever()
+
+
+def recv_exactly(sock: socket.socket, size: int) -> None:
+    received = 0
+    while received < size:
+        chunk = sock.recv(size - received)
+        if not chunk:
+            raise ConnectionError("Echo server closed the connection")
+        received += len(chunk)
+
+
+# --- Blocking workloads (gevent and threads models) ---
+
+def make_blocking_tasks(config: MatrixConfig, port: int, file_path: str) -> Dict[str, Callable[[], None]]:
+    def echo() -> None:
+        with socket.create_connection(('127.0.0.1', port)) as sock:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            for _ in range(config.echo_round_trips):
+                sock.sendall(PAYLOAD)
+                recv_exactly(sock, len(PAYLOAD))
+
+    def read_file() -> None:
+        with open(file_path, 'rb') as f:
+            while f.read(64 * 1024):
+                pass
+
+    def sleep() -> None:
+        time.sleep(config.sleep_seconds)
+
+    def cpu() -> None:
+        total = 0
+        for i in range(config.cpu_iterations):
+            total += i * i
+
+    return {'echo': echo, 'file': read_file, 'sleep': sleep, 'cpu': cpu}
+
+
+def timed(task: Callable[[], None]) -> Callable[[int], float]:
+    def run(_: int) -> float:
+        start_time = time.perf_counter()
+        task()
+        return time.perf_counter() - start_time
+    return run
+
+
+def run_gevent(model: str, workload: str, config: MatrixConfig, port: int, file_path: str) -> List[float]:
+    from gevent import monkey
+    if model == 'gevent-full':
+        monkey.patch_all()
+    else:
+        monkey.patch_all(thread=False)
+    import gevent
+    from gevent.pool import Pool
+
+    task = make_blocking_tasks(config, port, file_path)[workload]
+    if model == 'gevent-partial' and workload in ('file', 'cpu'):
+        # hand blocking work to native threads; the greenlet waits cooperatively
+        threadpool = gevent.get_hub().threadpool
+        threadpool.maxsize = config.concurrency
+        blocking_task = task
+        task = lambda: threadpool.apply(blocking_task)
+
+    pool = Pool(config.concurrency)
+    return list(pool.imap_unordered(timed(task), range(config.tasks_for(workload))))
+
+
+def run_threads(workload: str, config: MatrixConfig, port: int, file_path: str) -> List[float]:
+    from concurrent.futures import ThreadPoolExecutor
+
+    task = make_blocking_tasks(config, port, file_path)[workload]
+    with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+        return list(executor.map(timed(task), range(config.tasks_for(workload))))
+
+
+def run_asyncio(workload: str, config: MatrixConfig, port: int, file_path: str) -> List[float]:
+    import asyncio
+
+    blocking = make_blocking_tasks(config, port, file_path)
+
+    async def echo() -> None:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            for _ in range(config.echo_round_trips):
+                writer.write(PAYLOAD)
+                await writer.drain()
+                await reader.readexactly(len(PAYLOAD))
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def read_file() -> None:
+        await asyncio.to_thread(blocking['file'])
+
+    async def sleep() -> None:
+        await asyncio.sleep(config.sleep_seconds)
+
+    async def cpu() -> None:
+        blocking['cpu']()  # runs on the event loop, like any un-awaited Python code
+
+    task = {'echo': echo, 'file': read_file, 'sleep': sleep, 'cpu': cpu}[workload]
+
+    async def main() -> List[float]:
+        semaphore = asyncio.Semaphore(config.concurrency)
+
+        async def run_one() -> float:
+            async with semaphore:
+                start_time = time.perf_counter()
+                await task()
+                return time.perf_counter() - start_time
+
+        return await asyncio.gather(*(run_one() for _ in range(config.tasks_for(workload))))
+
+    return asyncio.run(main())
+
+
+# --- Flame data ---
+
+class StackSampler:
+    """Samples every thread's stack from a native thread and counts folded stacks."""
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.folded: Counter = Counter()
+        self.running = False
+
+    def _run(self) -> None:
+        me = _thread.get_ident()
+        while self.running:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                self.folded[';'.join(reversed(stack))] += 1
+            _native_sleep(self.interval)
+
+    def start(self) -> None:
+        self.running = True
+        _start_native_thread(self._run, ())
+
+    def stop(self) -> None:
+        self.running = False
+
+    def write(self, path: str) -> None:
+        with open(path, 'w') as f:
+            for stack, count in self.folded.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# --- One cell (runs in a subprocess) ---
+
+def run_cell(model: str, workload: str, config: MatrixConfig, port: int, file_path: str,
+             flame_dir: Optional[str]) -> Dict[str, float]:
+    sampler = StackSampler() if flame_dir else None
+    if sampler:
+        sampler.start()
+
+    cpu_start = time.process_time()
+    start_time = time.perf_counter()
+    if model.startswith('gevent'):
+        latencies = run_gevent(model, workload, config, port, file_path)
+    elif model == 'threads':
+        latencies = run_threads(workload, config, port, file_path)
+    else:
+        latencies = run_asyncio(workload, config, port, file_path)
+    wall = time.perf_counter() - start_time
+    cpu = time.process_time() - cpu_start
+
+    if sampler:
+        sampler.stop()
+        sampler.write(os.path.join(flame_dir, f"{model}_{workload}.folded"))
+
+    latencies = sorted(latencies)
+    return {
+        'model': model,
+        'workload': workload,
+        'tasks_per_second': len(latencies) / wall,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        'cpu_seconds': cpu,
+        'wall_seconds': wall
+    }
+
+
+# --- Matrix runner (parent process) ---
+
+def wait_for_port(port: int, timeout: float = 5.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Echo server did not start on port {port}")
+
+
+def run_matrix(models: List[str], workloads: List[str], port: int, flame_dir: Optional[str]) -> List[Dict[str, float]]:
+    config = MatrixConfig()
+    server = subprocess.Popen([sys.executable, __file__, '--echo-server', '--port', str(port)])
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(os.urandom(config.file_size))
+        file_path = f.name
+    results = []
+    try:
+        wait_for_port(port)
+        for workload in workloads:
+            for model in models:
+                command = [sys.executable, __file__, '--cell', model, workload,
+                           '--port', str(port), '--file', file_path]
+                if flame_dir:
+                    command += ['--flame-dir', flame_dir]
+                output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                results.append(result)
+                logger.info(
+                    f"{workload:<6} {model:<15} {result['tasks_per_second']:9.0f} tasks/s  "
+                    f"p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+                    f"CPU {result['cpu_seconds']:5.2f}s"
+                )
+    finally:
+        server.terminate()
+        server.wait()
+        os.remove(file_path)
+    return results
+
+
+def print_table(results: List[Dict[str, float]], models: List[str], workloads: List[str]) -> None:
+    cells = {(r['workload'], r['model']): r for r in results}
+    logger.info("=== Throughput in tasks/s (p99 latency in ms) ===")
+    logger.info(f"{'workload':<10}" + "".join(f"{model:>22}" for model in models))
+    for workload in workloads:
+        row = f"{workload:<10}"
+        for model in models:
+            r = cells[(workload, model)]
+            row += f"{r['tasks_per_second']:>12.0f} ({r['p99_ms']:>7.1f})"
+        logger.info(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark I/O models on the same workloads")
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=MODELS)
+    parser.add_argument('--workloads', nargs='+', default=list(WORKLOADS), choices=WORKLOADS)
+    parser.add_argument('--port', type=int, default=12600)
+    parser.add_argument('--flame-dir', help="write <model>_<workload>.folded stack samples here")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    # internal: used by the subprocesses
+    parser.add_argument('--echo-server', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--cell', nargs=2, metavar=('MODEL', 'WORKLOAD'), help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.echo_server:
+        run_echo_server(args.port)
+        return
+    if args.cell:
+        model, workload = args.cell
+        print(json.dumps(run_cell(model, workload, MatrixConfig(), args.port, args.file, args.flame_dir)))
+        return
+
+    if args.flame_dir:
+        os.makedirs(args.flame_dir, exist_ok=True)
+        logger.info(f"Folded stacks go to {args.flame_dir}/ (render with flamegraph.pl or speedscope)")
+    logger.info(f"Running {len(args.models) * len(args.workloads)} cells (one subprocess each)")
+    results = run_matrix(args.models, args.workloads, args.port, args.flame_dir)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, args.models, args.workloads)
+
+
+if __name__ == "__main__":
+    main()
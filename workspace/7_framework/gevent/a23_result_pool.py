@@ -0,0 +1,341 @@
+# Errors as Values and Columnar Results
+#
+# ErrorHandlingExample.process_task in a12_error_handling.py raises an exception for
+# every failing task, catches it, and builds a dict for every result. That reads well
+# for five tasks. At a million tasks the bookkeeping becomes the workload:
+#   - each raise creates an exception object and a traceback object per frame unwound
+#   - the per-result dicts ("task_id", "status", "error") cost ~200 bytes each and
+#     the summary walks the whole list once per status
+#   - spawning one greenlet per task costs more than most small tasks themselves
+#
+# This example keeps the same statuses but changes the representation:
+#   - tasks return Ok(value) or Err(kind, message): small __slots__ objects, no raise
+#   - exceptions that still escape a task (bugs, Timeout) are converted to Err at the
+#     pool boundary; only a sample of them get their traceback formatted
+#   - ResultPool runs `size` long-lived worker greenlets on a gevent Pool and writes
+#     outcomes into columns (array('b') of status codes, array('d') of durations) plus
+#     error counts keyed by kind
+
+import logging
+import random
+import time
+import traceback
+import tracemalloc
+from array import array
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import gevent
+from gevent.pool import Pool
+from gevent.timeout import Timeout
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+STATUS_SUCCESS = 0
+STATUS_ERROR = 1
+STATUS_TIMEOUT = 2
+STATUS_NAMES = {STATUS_SUCCESS: "success", STATUS_ERROR: "error", STATUS_TIMEOUT: "timeout"}
+
+
+class Ok:
+    """A successful task result."""
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any = None):
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"Ok({self.value!r})"
+
+
+class Err:
+    """A failed task result: an error kind (e.g. 'ValueError') and a message."""
+    __slots__ = ('kind', 'message', 'status')
+
+    def __init__(self, kind: str, message: str = "", status: int = STATUS_ERROR):
+        self.kind = kind
+        self.message = message
+        self.status = status
+
+    def __repr__(self) -> str:
+        return f"Err({self.kind!r}, {self.message!r})"
+
+
+Result = Union[Ok, Err]
+
+
+class ResultPoolConfig:
+    """Configuration for ResultPool."""
+    def __init__(
+        self,
+        size: int = 100,
+        traceback_sample_rate: float = 0.01,
+        max_samples_per_kind: int = 5,
+        keep_values: bool = False
+    ):
+        self.size = size
+        # fraction of escaped exceptions whose traceback is formatted and kept
+        self.traceback_sample_rate = traceback_sample_rate
+        self.max_samples_per_kind = max_samples_per_kind
+        # values of Ok results are dropped unless asked for: most batch jobs only need counts
+        self.keep_values = keep_values
+
+
+class Outcomes:
+    """Columnar outcomes of one ResultPool.map() call, indexed by task position."""
+    def __init__(self, count: int, keep_values: bool):
+        self.statuses = array('b', bytes(count))
+        self.durations = array('d', bytes(8 * count))
+        self.values: Optional[List[Any]] = [None] * count if keep_values else None
+        self.error_counts: Counter = Counter()
+        # kind -> [(task index, message, formatted traceback or None)]
+        self.error_samples: Dict[str, List[Tuple[int, str, Optional[str]]]] = defaultdict(list)
+        self.wall = 0.0
+
+    def summary(self) -> Dict[str, int]:
+        counts = Counter(self.statuses)
+        return {name: counts.get(code, 0) for code, name in STATUS_NAMES.items()}
+
+    def failed_indexes(self) -> List[int]:
+        return [i for i, status in enumerate(self.statuses) if status != STATUS_SUCCESS]
+
+
+class ResultPool:
+    """Runs a function over many items with a fixed set of worker greenlets."""
+    def __init__(self, config: Optional[ResultPoolConfig] = None):
+        self.config = config or ResultPoolConfig()
+        self._random = random.Random()
+
+    def _record_error(self, outcomes: Outcomes, index: int, err: Err, exc: Optional[BaseException]) -> None:
+        outcomes.statuses[index] = err.status
+        outcomes.error_counts[err.kind] += 1
+        samples = outcomes.error_samples[err.kind]
+        if len(samples) >= self.config.max_samples_per_kind:
+            return
+        if exc is None:
+            samples.append((index, err.message, None))
+        elif self._random.random() < self.config.traceback_sample_rate or not samples:
+            # always keep the first traceback of each kind, then sample
+            samples.append((index, err.message, ''.join(traceback.format_exception(exc))))
+
+    def map(self, func: Callable[[Any], Result], items: Iterable[Any], timeout: Optional[float] = None) -> Outcomes:
+        """Calls func(item) for every item; func returns Ok/Err (raising also works)."""
+        items = list(items)
+        outcomes = Outcomes(len(items), self.config.keep_values)
+        work = iter(enumerate(items))
+        perf_counter = time.perf_counter
+
+        def worker() -> None:
+            for index, item in work:
+                start_time = perf_counter()
+                exc = None
+                try:
+                    if timeout is None:
+                        result = func(item)
+                    else:
+                        with Timeout(timeout):
+                            result = func(item)
+                except Timeout as e:
+                    exc = e
+                    result = Err('Timeout', f"took longer than {timeout}s", STATUS_TIMEOUT)
+                except Exception as e:
+                    exc = e
+                    result = Err(type(e).__name__, str(e))
+                outcomes.durations[index] = perf_counter() - start_time
+                if type(result) is Ok:
+                    if outcomes.values is not None:
+                        outcomes.values[index] = result.value
+                else:
+                    self._record_error(outcomes, index, result, exc)
+
+        start_time = time.perf_counter()
+        pool = Pool(self.config.size)
+        for _ in range(min(self.config.size, len(items))):
+            pool.spawn(worker)
+        pool.join()
+        outcomes.wall = time.perf_counter() - start_time
+        return outcomes
+
+
+# --- Benchmark ---
+
+class BenchmarkConfig:
+    """Configuration for the exceptions vs values benchmark."""
+    def __init__(self, num_tasks: int = 1_000_000, failure_probability: float = 0.3, pool_size: int = 100):
+        self.num_tasks = num_tasks
+        self.failure_probability = failure_probability
+        self.pool_size = pool_size
+
+
+def make_failures(config: BenchmarkConfig) -> List[int]:
+    """Pre-rolls each task's fate (0 ok, 1 invalid input, 2 network) so all variants see the same mix."""
+    rng = random.Random(42)
+    p = config.failure_probability
+    fates = []
+    for _ in range(config.num_tasks):
+        if rng.random() < p:
+            fates.append(1)
+        elif rng.random() < p:
+            fates.append(2)
+        else:
+            fates.append(0)
+    return fates
+
+
+def exception_per_task(config: BenchmarkConfig, fates: List[int]) -> Tuple[float, Dict[str, int], List[Dict[str, Any]]]:
+    """The a12 approach (minus sleeps and per-task logging): raise, catch, one dict per task."""
+    def process_task(task_id: int) -> Dict[str, Any]:
+        try:
+            fate = fates[task_id]
+            if fate == 1:
+                raise ValueError(f"Task {task_id}: Invalid input data")
+            if fate == 2:
+                raise ConnectionError(f"Task {task_id}: Network failure")
+            return {"task_id": task_id, "status": "success", "result": task_id * 2}
+        except ValueError as e:
+            return {"task_id": task_id, "status": "error", "error": str(e)}
+        except ConnectionError as e:
+            return {"task_id": task_id, "status": "error", "error": str(e)}
+
+    start_time = time.perf_counter()
+    results = Pool(config.pool_size).map(process_task, range(config.num_tasks))
+    summary = {
+        "success": sum(1 for r in results if r["status"] == "success"),
+        "timeout": sum(1 for r in results if r["status"] == "timeout"),
+        "error": sum(1 for r in results if r["status"] == "error")
+    }
+    return time.perf_counter() - start_time, summary, results
+
+
+def exception_with_traceback(
+    config: BenchmarkConfig, fates: List[int]
+) -> Tuple[float, Dict[str, int], List[Dict[str, Any]]]:
+    """The same, but keeping every traceback for later debugging (what logger.exception does)."""
+    def process_task(task_id: int) -> Dict[str, Any]:
+        try:
+            fate = fates[task_id]
+            if fate == 1:
+                raise ValueError(f"Task {task_id}: Invalid input data")
+            if fate == 2:
+                raise ConnectionError(f"Task {task_id}: Network failure")
+            return {"task_id": task_id, "status": "success", "result": task_id * 2}
+        except Exception as e:
+            return {"task_id": task_id, "status": "error", "error": str(e), "traceback": traceback.format_exc()}
+
+    start_time = time.perf_counter()
+    results = Pool(config.pool_size).map(process_task, range(config.num_tasks))
+    summary = {
+        "success": sum(1 for r in results if r["status"] == "success"),
+        "timeout": sum(1 for r in results if r["status"] == "timeout"),
+        "error": sum(1 for r in results if r["status"] == "error")
+    }
+    return time.perf_counter() - start_time, summary, results
+
+
+def errors_as_values_per_greenlet(
+    config: BenchmarkConfig, fates: List[int]
+) -> Tuple[float, Dict[str, int], List[Result]]:
+    """Ok/Err values, but still one greenlet per task: separates the two effects."""
+    invalid = Err('ValueError', "Invalid input data")
+    network = Err('ConnectionError', "Network failure")
+
+    def process_task(task_id: int) -> Result:
+        fate = fates[task_id]
+        if fate == 1:
+            return invalid
+        if fate == 2:
+            return network
+        return Ok(task_id * 2)
+
+    start_time = time.perf_counter()
+    results = Pool(config.pool_size).map(process_task, range(config.num_tasks))
+    counts = Counter(STATUS_SUCCESS if type(r) is Ok else r.status for r in results)
+    summary = {name: counts.get(code, 0) for code, name in STATUS_NAMES.items()}
+    return time.perf_counter() - start_time, summary, results
+
+
+def errors_as_values(config: BenchmarkConfig, fates: List[int]) -> Tuple[float, Dict[str, int], Outcomes]:
+    """Tasks return Ok/Err; ResultPool stores columns."""
+    invalid = Err('ValueError', "Invalid input data")
+    network = Err('ConnectionError', "Network failure")
+
+    def process_task(task_id: int) -> Result:
+        fate = fates[task_id]
+        if fate == 1:
+            return invalid
+        if fate == 2:
+            return network
+        return Ok(task_id * 2)
+
+    start_time = time.perf_counter()
+    outcomes = ResultPool(ResultPoolConfig(size=config.pool_size)).map(process_task, range(config.num_tasks))
+    summary = outcomes.summary()
+    return time.perf_counter() - start_time, summary, outcomes
+
+
+def retained_bytes(run: Callable, config: BenchmarkConfig, fates: List[int]) -> float:
+    """Bytes per task still held by the returned results (tracemalloc)."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    _, _, results = run(config, fates)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return (after - before) / config.num_tasks
+
+
+def error_sampling_demo() -> None:
+    """Unexpected exceptions and timeouts become Err values; only some tracebacks are kept."""
+    def flaky(n: int) -> Result:
+        if n % 7 == 0:
+            return {}['missing']  # a bug: KeyError escapes the task
+        if n % 11 == 0:
+            gevent.sleep(0.05)  # slower than the timeout below
+        if n % 3 == 0:
+            return Err('ValueError', f"item {n} is not valid")
+        return Ok(n)
+
+    outcomes = ResultPool(ResultPoolConfig(size=20)).map(flaky, range(200), timeout=0.01)
+    logger.info(f"Summary: {outcomes.summary()}, errors by kind: {dict(outcomes.error_counts)}")
+    for kind, samples in outcomes.error_samples.items():
+        index, message, tb = samples[0]
+        last_line = tb.strip().splitlines()[-1] if tb else "(returned Err, no traceback)"
+        logger.info(f"  {kind}: {len(samples)} samples kept, first at task {index}: {last_line}")
+
+
+def main():
+    """Compares exception-per-task error handling with errors as values."""
+    logger.info("=== Errors as values (sampling demo) ===")
+    error_sampling_demo()
+
+    config = BenchmarkConfig()
+    fates = make_failures(config)
+    logger.info(f"=== {config.num_tasks:,} tasks, {config.failure_probability:.0%} failure probability per check ===")
+    variants = [
+        ("exception per task + dict (a12)", exception_per_task),
+        ("exception + traceback per task", exception_with_traceback),
+        ("Ok/Err, greenlet per task", errors_as_values_per_greenlet),
+        ("Ok/Err + ResultPool columns", errors_as_values),
+    ]
+    for label, run in variants:
+        elapsed, summary, results = run(config, fates)
+        del results
+        logger.info(
+            f"{label:<33} {elapsed:6.2f}s  {elapsed / config.num_tasks * 1e9:6.0f} ns/task  "
+            f"{summary['success']:,} ok, {summary['error']:,} errors"
+        )
+
+    memory_config = BenchmarkConfig(num_tasks=100_000)
+    memory_fates = make_failures(memory_config)
+    logger.info(f"=== Memory held by the results ({memory_config.num_tasks:,} tasks) ===")
+    for label, run in variants:
+        logger.info(f"{label:<33} {retained_bytes(run, memory_config, memory_fates):6.0f} bytes/task")
+
+
+if __name__ == "__main__":
+    main()
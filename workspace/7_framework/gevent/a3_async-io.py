@@ -14,6 +14,7 @@ def write_file(filename, content):
 
     Note: For true async file I/O, you'd need gevent's file objects
     or use gevent.fileobject.FileObject
+    (see a15_cooperative_file_io.py for a threadpool-backed version and a benchmark)
     """
     print(f"Writing to {filename}")
     gevent.sleep(0.1)  # Simulate I/O delay
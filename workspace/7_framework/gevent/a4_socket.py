@@ -44,8 +44,10 @@ def handle_client(client_socket, address):
             print(f"Received from {address}: {message}")
 
             # Echo the message back
+            # sendall() retries until every byte is sent; send() may send only part of it
+            # (see a14_framed_echo_server.py for message framing under load)
             response = f"Echo: {message}\n"
-            client_socket.send(response.encode('utf-8'))
+            client_socket.sendall(response.encode('utf-8'))
 
     except Exception as e:
         print(f"Error handling client {address}: {e}")
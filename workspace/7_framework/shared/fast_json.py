@@ -0,0 +1,194 @@
+"""
+A fast JSON path for endpoints that return trusted internal data.
+
+With `response_model`, FastAPI validates whatever the endpoint returns against
+the model and then serializes it. For an endpoint that has just read its own
+records (and often already built model instances from them), that is a second,
+redundant validation of every row.
+
+`FastJSONResponse` renders content with orjson when it is installed, otherwise
+with one shared json.JSONEncoder. The `fast_json_response` decorator wraps an
+endpoint so that what it returns is sent as a FastJSONResponse:
+
+    @app.get("/users", response_model=UsersListResponse)
+    @fast_json_response(UsersListResponse)
+    def get_users(...):
+        return {"users": users, "total": total, ...}
+
+FastAPI sends a returned Response as it is, without validating it against
+`response_model`, but it still uses `response_model` for the OpenAPI schema,
+so the docs do not change. The decorator must sit below the route decorator.
+
+The content is trusted, not checked: it must already have the shape of the
+model. Passing the model to the decorator only drops the keys the model does
+not declare (such as updated_at or hashed_password) and fills in defaults, as
+response_model would.
+"""
+from functools import wraps
+from operator import itemgetter
+from typing import Any, Callable, Mapping, Optional, Union, get_args, get_origin
+import inspect
+import json
+import types
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+try:
+    import orjson
+except ImportError:  # pip install orjson for the fastest encoder
+    orjson = None
+
+Projector = Callable[[Any], Any]
+
+_UNION_TYPES = (Union, getattr(types, "UnionType", Union))  # Optional[X] and X | None
+
+
+def _default(value: Any) -> Any:
+    """The JSON form Pydantic gives values the encoder does not know (models, Decimal, UUID, timedelta...)."""
+    return to_jsonable_python(value, by_alias=True)
+
+
+# the settings of Starlette's JSONResponse, built once instead of per json.dumps call
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default)
+
+
+def dumps(content: Any) -> bytes:
+    """`content` as compact UTF-8 JSON."""
+    if orjson is not None:
+        # OPT_UTC_Z writes UTC datetimes with "Z", as Pydantic does
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return _encoder.encode(content).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """A JSON response rendered by dumps() without any validation."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _projector(annotation: Any) -> Optional[Projector]:
+    """
+    A function that trims a value to the fields `annotation` declares, or None if
+    the value can be sent as it is (scalars, and types without nested models).
+    """
+    origin = get_origin(annotation)
+    if origin in _UNION_TYPES:
+        options = [arg for arg in get_args(annotation) if arg is not type(None)]
+        inner = _projector(options[0]) if len(options) == 1 else None
+        if inner is None:
+            return None
+        return lambda value: None if value is None else inner(value)
+    if origin in (list, tuple, set, frozenset):
+        args = get_args(annotation)
+        inner = _projector(args[0]) if args else None
+        if inner is None:
+            return None
+        return lambda values: [inner(value) for value in values]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _model_projector(annotation)
+    return None
+
+
+def _model_projector(model: type) -> Projector:
+    fields = []
+    for name, field in model.model_fields.items():
+        default = None if field.is_required() else field.get_default(call_default_factory=True)
+        fields.append((name, field.alias or name, field.is_required(), default, _projector(field.annotation)))
+    names = [name for name, *_ in fields]
+    aliases = [alias for _, alias, *_ in fields]
+    nested = [(alias, inner) for _, alias, _, _, inner in fields if inner is not None]
+    # itemgetter with one name returns the value itself, not a 1-tuple
+    get_all = itemgetter(*names) if len(names) > 1 else (lambda value: (value[names[0]],) if names else ())
+
+    def project_slowly(value: Mapping) -> dict:
+        result = {}
+        for name, alias, required, default, _ in fields:
+            if name in value:
+                result[alias] = value[name]
+            elif not required:
+                result[alias] = default
+            else:
+                raise KeyError(f"{model.__name__}.{name} is missing from the response content")
+        return result
+
+    def project(value: Any) -> Any:
+        if not isinstance(value, dict) and not isinstance(value, Mapping):
+            return value  # a model instance (or anything else) is encoded as it is
+        try:
+            # every field present: one C-level lookup of all of them
+            result = dict(zip(aliases, get_all(value)))
+        except KeyError:
+            result = project_slowly(value)
+        for alias, inner in nested:
+            if result[alias] is not None:
+                result[alias] = inner(result[alias])
+        return result
+
+    return project
+
+
+def fast_json_response(model: Any = None, *, status_code: int = 200) -> Callable[[Callable], Callable]:
+    """
+    Send what the endpoint returns as a FastJSONResponse, skipping response_model
+    validation.
+
+    model:       the response_model of the route (e.g. List[ProductResponse]);
+                 dict content is trimmed to its fields. None sends the content
+                 as it is.
+    status_code: the status of the response, unless the endpoint sets
+                 response.status_code. FastAPI does not apply the route's
+                 status_code to a returned Response.
+
+    Headers and the status code set on an injected `Response` parameter are
+    copied to the response; the endpoint gets one even if it does not ask.
+    Responses the endpoint returns itself are passed through.
+    """
+    project = _projector(model) if model is not None else None
+
+    def decorator(endpoint: Callable) -> Callable:
+        signature = inspect.signature(endpoint)
+        response_param = next(
+            (name for name, param in signature.parameters.items() if param.annotation is Response), None
+        )
+        added_param = None
+        if response_param is None:
+            added_param = "fast_json_sub_response"
+            signature = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter(added_param, inspect.Parameter.KEYWORD_ONLY, annotation=Response)
+            ])
+
+        def respond(content: Any, sub_response: Optional[Response]) -> Response:
+            if isinstance(content, Response):
+                return content
+            if project is not None:
+                content = project(content)
+            if sub_response is None:  # called directly rather than by FastAPI
+                return FastJSONResponse(content, status_code=status_code)
+            response = FastJSONResponse(content, status_code=sub_response.status_code or status_code)
+            response.headers.raw.extend(
+                (key, value) for key, value in sub_response.headers.raw if key != b"content-length"
+            )
+            return response
+
+        # FastAPI runs sync endpoints in a thread pool, so keep the endpoint's kind
+        if inspect.iscoroutinefunction(endpoint):
+            @wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                sub_response = kwargs.pop(added_param, None) if added_param else kwargs.get(response_param)
+                return respond(await endpoint(*args, **kwargs), sub_response)
+        else:
+            @wraps(endpoint)
+            def wrapper(*args, **kwargs):
+                sub_response = kwargs.pop(added_param, None) if added_param else kwargs.get(response_param)
+                return respond(endpoint(*args, **kwargs), sub_response)
+
+        wrapper.__signature__ = signature
+        return wrapper
+
+    return decorator
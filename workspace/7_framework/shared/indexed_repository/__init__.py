@@ -0,0 +1,8 @@
+"""
+In-memory table with O(1) primary key lookups, sorted secondary indexes and
+bitmap filters, shared by the FastAPI day projects (see repository.py), and
+the keyset cursors used to page through it (see pagination.py).
+"""
+from .repository import IndexedRepository
+
+__all__ = ["IndexedRepository"]
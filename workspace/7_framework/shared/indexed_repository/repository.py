@@ -0,0 +1,594 @@
+"""
+Indexed in-memory repository.
+
+Records are dicts. A dict maps each primary key to its record, so get, update and
+delete are O(1) lookups instead of a scan over a list. Secondary indexes are
+sorted lists of (value, key) pairs kept up to date with bisect; equality and
+range lookups on fields such as price, created_at or category cost O(log n) plus
+the number of matches. The sorted lists are split into buckets of about a
+thousand entries (the layout of sortedcontainers.SortedList), so an insert or a
+delete shifts a bucket, not a million-entry list.
+
+Iteration, range queries and pages walk the keys and indexes in place instead of
+copying the table. They are a live view: a record inserted or deleted while a
+caller is iterating may or may not be seen.
+
+Filters are answered with bitmaps. Every record owns a slot number, and a bitmap
+is a Python int with bit n set when the record in slot n matches:
+
+- facets keep one bitmap per value of a low-cardinality field (status,
+  is_active, age), so facet("status", "active") is a lookup and
+  facet_range("age", 18, 30) ORs a few bitmaps together;
+- search fields keep a lowercased copy of their text per record, and an n-gram
+  index finds the few records worth checking for a substring.
+
+Bitmaps combine with & and |, int.bit_count() counts the matches without
+visiting them, and seek(..., within=bitmap) walks a sort index keeping only
+the records in the bitmap.
+
+Indexed fields must only be changed through update() or replace(); assigning to
+record["price"] directly leaves the price index pointing at the old value.
+"""
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from itertools import chain, islice
+from operator import itemgetter
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+import re
+import threading
+
+Record = Dict[str, Any]
+IndexSpec = Union[Iterable[str], Mapping[str, Optional[Callable[[Any], Any]]]]
+
+_index_value = itemgetter(0)
+
+# bit offsets set in each byte value, and the non-zero bytes of a bitmap
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+
+def _bitmap(slots: Iterable[int], size: int) -> int:
+    """The bitmap with the bits of `slots` set (all below `size`)."""
+    buffer = bytearray((size + 7) // 8)
+    for slot in slots:
+        buffer[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _slots(bitmap: int) -> Iterator[int]:
+    """The set bits of a bitmap, lowest first; skips empty bytes at C speed."""
+    buffer = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for match in _NONZERO_BYTE.finditer(buffer):
+        at = match.start()
+        base = at << 3
+        for bit in _BYTE_BITS[buffer[at]]:
+            yield base + bit
+
+
+class _SortedIndex:
+    """A sorted list stored as buckets of LOAD to 2 * LOAD entries, with the largest entry of each."""
+
+    LOAD = 1000
+
+    def __init__(self, key: Optional[Callable[[Any], Any]] = None):
+        self._key = key  # what range bounds are compared against
+        self._buckets: List[list] = []
+        self._maxes: list = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def last(self) -> Any:
+        return self._maxes[-1]
+
+    def load(self, entries: Iterable[Any]) -> None:
+        """Add many entries with one sort instead of one insort each."""
+        entries = sorted(chain(chain.from_iterable(self._buckets), entries))
+        self._buckets = [entries[i:i + self.LOAD] for i in range(0, len(entries), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(entries)
+
+    def add(self, entry: Any) -> None:
+        buckets, maxes = self._buckets, self._maxes
+        self._len += 1
+        if not maxes:
+            buckets.append([entry])
+            maxes.append(entry)
+            return
+        i = bisect_left(maxes, entry)
+        if i == len(maxes):
+            i -= 1
+            buckets[i].append(entry)
+            maxes[i] = entry
+        else:
+            insort(buckets[i], entry)
+        bucket = buckets[i]
+        if len(bucket) > 2 * self.LOAD:
+            buckets.insert(i + 1, bucket[self.LOAD:])
+            del bucket[self.LOAD:]
+            maxes.insert(i, bucket[-1])
+
+    def remove(self, entry: Any) -> None:
+        """Remove an entry that is known to be present."""
+        i = bisect_left(self._maxes, entry)
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, entry)
+        del bucket[j]
+        self._len -= 1
+        if not bucket:
+            del self._buckets[i]
+            del self._maxes[i]
+        elif j == len(bucket):
+            self._maxes[i] = bucket[-1]
+
+    def slice(self, start: int, stop: Optional[int] = None) -> list:
+        """Entries at positions start..stop, found by walking the bucket sizes."""
+        stop = self._len if stop is None else stop
+        result = []
+        for bucket in self._buckets:
+            size = len(bucket)
+            if start < size and stop > 0:
+                result.extend(bucket[max(start, 0):stop])
+            start -= size
+            stop -= size
+            if stop <= 0:
+                break
+        return result
+
+    def irange(self, low: Any = None, high: Any = None, reverse: bool = False,
+               inclusive: Tuple[bool, bool] = (True, True)) -> Iterator[Any]:
+        """Entries whose key lies between low and high, copying one bucket at a time."""
+        key = self._key
+        maxes = self._maxes
+        first, first_at = 0, 0
+        if low is not None:
+            find = bisect_left if inclusive[0] else bisect_right
+            first = find(maxes, low, key=key)
+            if first < len(maxes):
+                first_at = find(self._buckets[first], low, key=key)
+        last, last_at = len(maxes) - 1, None
+        if high is not None:
+            find = bisect_right if inclusive[1] else bisect_left
+            last = find(maxes, high, key=key)
+            if last < len(maxes):
+                last_at = find(self._buckets[last], high, key=key)
+            else:
+                last -= 1
+
+        return self._walk(first, first_at, last, last_at, reverse)
+
+    def iter_after(self, entry: Any = None, reverse: bool = False) -> Iterator[Any]:
+        """
+        Entries that sort after `entry` (before it when `reverse`), comparing whole
+        entries; every entry when `entry` is None. This is the seek behind keyset
+        pagination: the page starts right after the last row of the previous one.
+        """
+        maxes = self._maxes
+        if not reverse:
+            if entry is None:
+                return self._walk(0, 0, len(maxes) - 1, None, False)
+            first = bisect_right(maxes, entry)
+            first_at = bisect_right(self._buckets[first], entry) if first < len(maxes) else 0
+            return self._walk(first, first_at, len(maxes) - 1, None, False)
+        if entry is None:
+            return self._walk(0, 0, len(maxes) - 1, None, True)
+        last = bisect_left(maxes, entry)
+        if last == len(maxes):
+            return self._walk(0, 0, last - 1, None, True)
+        return self._walk(0, 0, last, bisect_left(self._buckets[last], entry), True)
+
+    def _walk(self, first: int, first_at: int, last: int, last_at: Optional[int], reverse: bool) -> Iterator[Any]:
+        """Entries from buckets[first][first_at] up to (not including) buckets[last][last_at]."""
+        # bucket references only: a split during iteration cannot shift what we walk
+        buckets = self._buckets[first:last + 1]
+        end = len(buckets) - 1
+        for n in (range(end, -1, -1) if reverse else range(end + 1)):
+            chunk = buckets[n][first_at if n == 0 else 0:last_at if n == end else None]
+            yield from (reversed(chunk) if reverse else chunk)
+
+
+class IndexedRepository:
+    """In-memory table with a dict primary index, sorted secondary indexes and bitmap filters."""
+
+    # seek(within=...) sorts the matching records itself, instead of walking the
+    # sort index past all the others, when fewer than 1 in SPARSE records match
+    SPARSE = 32
+
+    def __init__(self, key: str = "id", indexes: IndexSpec = (), records: Iterable[Record] = (),
+                 facets: Iterable[str] = (), search: Iterable[str] = (), ngram: int = 3):
+        """
+        key:     name of the primary key field
+        indexes: fields to index, or a mapping of field -> function applied to the
+                 value before indexing (e.g. {"category": str.lower}); the function
+                 also gets None for a missing field and may map it to a sortable value
+        records: initial records
+        facets:  low-cardinality fields to keep a bitmap per value for
+        search:  text fields that search() looks in
+        ngram:   length of the n-grams indexed for search(); 0 disables the n-gram
+                 index, and search() then checks every record's lowercased text
+        """
+        self.key = key
+        if isinstance(indexes, Mapping):
+            self._transforms = dict(indexes)
+        else:
+            self._transforms = {field: None for field in indexes}
+        self._facet_fields = tuple(facets)
+        self._search_fields = tuple(search)
+        self._ngram = ngram
+        self._lock = threading.Lock()
+        self._reset()
+        self.extend(records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._records
+
+    def __iter__(self) -> Iterator[Record]:
+        """Records in primary key order."""
+        return self._lookup(self._keys.irange())
+
+    # Reads
+
+    def get(self, key: Hashable) -> Optional[Record]:
+        return self._records.get(key)
+
+    def all(self) -> List[Record]:
+        """A new list of every record, in primary key order."""
+        return list(self)
+
+    def next_id(self) -> int:
+        """One more than the largest integer key (1 when empty)."""
+        return self._keys.last() + 1 if self._keys else 1
+
+    def find(self, field: str, value: Any) -> List[Record]:
+        """Records whose indexed `field` equals `value`."""
+        return list(self.range(field, value, value))
+
+    def range(self, field: str, low: Any = None, high: Any = None, reverse: bool = False) -> Iterator[Record]:
+        """
+        Records with low <= field <= high, ordered by the field (then by key).
+
+        Either bound can be None for an open range. Records where the field is
+        missing or None are not in the index and never match.
+        """
+        transform = self._transforms[field]
+        if transform is not None:
+            low = transform(low) if low is not None else None
+            high = transform(high) if high is not None else None
+        entries = self._indexes[field].irange(low, high, reverse)
+        return self._lookup(entry[1] for entry in entries)
+
+    def facet(self, field: str, value: Any) -> int:
+        """Bitmap of the records whose facet `field` equals `value`."""
+        return self._facets[field].get(value, 0)
+
+    def facet_range(self, field: str, low: Any = None, high: Any = None) -> int:
+        """Bitmap of the records with low <= field <= high; either bound can be None."""
+        bitmap = 0
+        for value, bits in list(self._facets[field].items()):
+            if value is not None and (low is None or value >= low) and (high is None or value <= high):
+                bitmap |= bits
+        return bitmap
+
+    def search(self, text: str) -> int:
+        """
+        Bitmap of the records whose search fields contain `text`, ignoring case.
+
+        With the n-gram index, only the records that share the query's rarest
+        n-gram are checked; shorter queries check every record.
+        """
+        text = text.lower()
+        texts = self._texts
+        n = self._ngram
+        if n and len(text) >= n:
+            postings = [self._grams.get(text[i:i + n]) for i in range(len(text) - n + 1)]
+            if not all(postings):
+                return 0
+            candidates = min(postings, key=len)
+        else:
+            candidates = range(len(texts))
+        return _bitmap(
+            (slot for slot in candidates if texts[slot] is not None and text in texts[slot]), len(texts)
+        )
+
+    def seek(self, field: Optional[str] = None, after: Optional[Tuple[Any, Hashable]] = None,
+             reverse: bool = False, within: Optional[int] = None) -> Iterator[Record]:
+        """
+        Records ordered by (field, key), starting right after the position `after`
+        = (field value, key); from the start when `after` is None. With `field`
+        None (or the primary key) the order is by key alone.
+
+        Finding the start is O(log n) however deep the position is, which is what
+        cursor pagination needs. Raises ValueError if `after` cannot be compared
+        with the indexed values (e.g. a string position in a numeric index).
+
+        With `within`, only the records in that bitmap are returned. When few
+        records match, they are sorted directly instead of walking the index.
+        """
+        by_key = field is None or field == self.key
+        position = after
+        try:
+            if after is not None:
+                if by_key:
+                    position = after[1]
+                elif self._transforms[field] is not None:
+                    position = (self._transforms[field](after[0]), after[1])
+            if within is not None and within.bit_count() * self.SPARSE < len(self._records):
+                return iter(self._seek_sparse(None if by_key else field, position, reverse, within))
+            if by_key:
+                keys = self._keys.iter_after(position, reverse)
+            else:
+                keys = map(itemgetter(1), self._indexes[field].iter_after(position, reverse))
+        except TypeError as e:
+            raise ValueError(f"Position {after!r} cannot be compared with the {field or self.key} index") from e
+        if within is not None:
+            keys = self._within(keys, within)
+        return self._lookup(keys)
+
+    def page(self, offset: int = 0, limit: Optional[int] = None, after: Optional[Hashable] = None) -> List[Record]:
+        """
+        A page of records in primary key order.
+
+        With `after`, the page starts at the first key greater than it (keyset
+        pagination: stable while records are inserted or deleted); otherwise it
+        starts at `offset`. A keyset page costs O(log n + limit); an offset page
+        also walks the bucket sizes up to the offset.
+        """
+        if after is not None:
+            keys = islice(self._keys.irange(after, inclusive=(False, True)), limit)
+        else:
+            keys = self._keys.slice(offset, None if limit is None else offset + limit)
+        return list(self._lookup(keys))
+
+    def select(
+        self,
+        field: Optional[str] = None,
+        low: Any = None,
+        high: Any = None,
+        where: Optional[Callable[[Record], bool]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> List[Record]:
+        """
+        Records in the range low..high of the indexed `field` (or all records in key
+        order when `field` is None) that pass `where`, skipping `offset` matches and
+        returning at most `limit`. Stops scanning as soon as the page is full.
+        """
+        records = self.range(field, low, high) if field is not None else iter(self)
+        if where is not None:
+            records = filter(where, records)
+        return list(islice(records, offset, None if limit is None else offset + limit))
+
+    # Writes
+
+    def insert(self, record: Record) -> Record:
+        """Add a record; raises ValueError if its key is already present."""
+        key = record[self.key]
+        with self._lock:
+            if key in self._records:
+                raise ValueError(f"Record with {self.key} {key!r} already exists")
+            self._records[key] = record
+            self._keys.add(key)
+            for field in self._transforms:
+                self._index_field(field, record, key)
+            self._index_bits(record, self._claim_slot(key), self._facet_fields, True)
+        return record
+
+    def extend(self, records: Iterable[Record]) -> None:
+        """Add many records, sorting each index and building each bitmap once (a bulk load)."""
+        records = list(records)
+        with self._lock:
+            added = {}
+            for record in records:
+                key = record[self.key]
+                if key in self._records or key in added:
+                    raise ValueError(f"Record with {self.key} {key!r} already exists")
+                added[key] = record
+            self._records.update(added)
+            self._keys.load(added)
+            for field, index in self._indexes.items():
+                entries = ((self._entry(field, record), key) for key, record in added.items())
+                index.load(entry for entry in entries if entry[0] is not None)
+
+            slots = [self._claim_slot(key) for key in added]
+            for field in self._facet_fields:
+                by_value = defaultdict(list)
+                for slot, record in zip(slots, added.values()):
+                    by_value[record.get(field)].append(slot)
+                values = self._facets[field]
+                for value, value_slots in by_value.items():
+                    values[value] = values.get(value, 0) | _bitmap(value_slots, len(self._key_at))
+            if self._search_fields:
+                for slot, record in zip(slots, added.values()):
+                    self._index_text(record, slot)
+
+    def update(self, key: Hashable, changes: Mapping[str, Any]) -> Optional[Record]:
+        """Apply `changes` to the record in place and reindex; None if there is no such record."""
+        if self.key in changes and changes[self.key] != key:
+            raise ValueError(f"The {self.key} of a record cannot be changed")
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                return None
+            fields = self._transforms.keys() & changes.keys()
+            facets = [field for field in self._facet_fields if field in changes]
+            text = any(field in changes for field in self._search_fields)
+            slot = self._slot_of[key]
+            for field in fields:
+                self._unindex_field(field, record, key)
+            self._unindex_bits(record, slot, facets, text)
+            record.update(changes)
+            for field in fields:
+                self._index_field(field, record, key)
+            self._index_bits(record, slot, facets, text)
+        return record
+
+    def replace(self, key: Hashable, record: Record) -> Optional[Record]:
+        """Store `record` under `key` in place of the current one; None if there is no such record."""
+        with self._lock:
+            old = self._records.get(key)
+            if old is None:
+                return None
+            slot = self._slot_of[key]
+            for field in self._transforms:
+                self._unindex_field(field, old, key)
+            self._unindex_bits(old, slot, self._facet_fields, True)
+            record[self.key] = key
+            self._records[key] = record
+            for field in self._transforms:
+                self._index_field(field, record, key)
+            self._index_bits(record, slot, self._facet_fields, True)
+        return record
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            record = self._records.pop(key, None)
+            if record is None:
+                return False
+            self._keys.remove(key)
+            for field in self._transforms:
+                self._unindex_field(field, record, key)
+            self._unindex_bits(record, self._slot_of[key], self._facet_fields, True)
+            self._release_slot(key)
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    # Helpers (writers hold the lock)
+
+    def _reset(self) -> None:
+        self._records: Dict[Hashable, Record] = {}
+        self._keys = _SortedIndex()
+        # entries are (value, primary key); ranges compare the value only
+        self._indexes = {field: _SortedIndex(key=_index_value) for field in self._transforms}
+        # every record owns a slot: its bit in the bitmaps; freed slots are reused
+        self._slot_of: Dict[Hashable, int] = {}
+        self._key_at: List[Optional[Hashable]] = []
+        self._free: List[int] = []
+        self._facets: Dict[str, Dict[Any, int]] = {field: {} for field in self._facet_fields}
+        # lowercased search text by slot, and the slots containing each n-gram
+        self._texts: List[Optional[str]] = []
+        self._grams: Dict[str, array] = {}
+
+    def _lookup(self, keys: Iterable[Hashable]) -> Iterator[Record]:
+        records = self._records
+        for key in keys:
+            record = records.get(key)
+            if record is not None:
+                yield record
+
+    def _within(self, keys: Iterable[Hashable], bitmap: int) -> Iterator[Hashable]:
+        """The keys whose slot is set in `bitmap`."""
+        mask = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+        size = len(mask)
+        slot_of = self._slot_of
+        for key in keys:
+            slot = slot_of.get(key)
+            if slot is not None and slot >> 3 < size and mask[slot >> 3] >> (slot & 7) & 1:
+                yield key
+
+    def _seek_sparse(self, field: Optional[str], position: Any, reverse: bool, bitmap: int) -> List[Record]:
+        """seek() for a bitmap with few records: sort those records rather than walk the index."""
+        key_at, records = self._key_at, self._records
+        keys = [key_at[slot] for slot in _slots(bitmap)]
+        if field is None:
+            entries = sorted(key for key in keys if key in records)
+        else:
+            entries = sorted(
+                entry for entry in ((self._entry(field, records[key]), key) for key in keys if key in records)
+                if entry[0] is not None
+            )
+        if position is not None:
+            if reverse:
+                del entries[bisect_left(entries, position):]
+            else:
+                del entries[:bisect_right(entries, position)]
+        if reverse:
+            entries.reverse()
+        return list(self._lookup(entries if field is None else map(itemgetter(1), entries)))
+
+    def _entry(self, field: str, record: Record) -> Any:
+        value = record.get(field)
+        transform = self._transforms[field]
+        return transform(value) if transform is not None else value
+
+    def _index_field(self, field: str, record: Record, key: Hashable) -> None:
+        value = self._entry(field, record)
+        if value is not None:
+            self._indexes[field].add((value, key))
+
+    def _unindex_field(self, field: str, record: Record, key: Hashable) -> None:
+        value = self._entry(field, record)
+        if value is not None:
+            self._indexes[field].remove((value, key))
+
+    def _claim_slot(self, key: Hashable) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._key_at[slot] = key
+        else:
+            slot = len(self._key_at)
+            self._key_at.append(key)
+            self._texts.append(None)
+        self._slot_of[key] = slot
+        return slot
+
+    def _release_slot(self, key: Hashable) -> None:
+        slot = self._slot_of.pop(key)
+        self._key_at[slot] = None
+        self._free.append(slot)
+
+    def _index_bits(self, record: Record, slot: int, facets: Iterable[str], text: bool) -> None:
+        bit = 1 << slot
+        for field in facets:
+            values = self._facets[field]
+            value = record.get(field)
+            values[value] = values.get(value, 0) | bit
+        if text and self._search_fields:
+            self._index_text(record, slot)
+
+    def _unindex_bits(self, record: Record, slot: int, facets: Iterable[str], text: bool) -> None:
+        bit = 1 << slot
+        for field in facets:
+            values = self._facets[field]
+            value = record.get(field)
+            bits = values[value] & ~bit
+            if bits:
+                values[value] = bits
+            else:
+                del values[value]
+        if text and self._search_fields:
+            self._unindex_text(slot)
+
+    def _grams_of(self, text: str) -> set:
+        n = self._ngram
+        return {text[i:i + n] for i in range(len(text) - n + 1)} if n else set()
+
+    def _index_text(self, record: Record, slot: int) -> None:
+        values = (record.get(field) for field in self._search_fields)
+        # fields are kept apart by a character no query contains
+        text = "\0".join(str(value).lower() for value in values if value is not None)
+        self._texts[slot] = text
+        grams = self._grams
+        for gram in self._grams_of(text):
+            postings = grams.get(gram)
+            if postings is None:
+                grams[gram] = array("i", (slot,))
+            else:
+                postings.append(slot)
+
+    def _unindex_text(self, slot: int) -> None:
+        text = self._texts[slot]
+        self._texts[slot] = None
+        grams = self._grams
+        for gram in self._grams_of(text or ""):
+            postings = grams[gram]
+            postings.remove(slot)
+            if not postings:
+                del grams[gram]
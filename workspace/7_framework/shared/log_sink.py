@@ -0,0 +1,187 @@
+from collections import deque
+from typing import Any, Dict, List, Optional, Union
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    """Make bytes (and anything else json can't handle) safe to serialize."""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="backslashreplace")
+    return str(value)
+
+
+def encode_record(record: Union[Dict[str, Any], str]) -> bytes:
+    """
+    Serialize one record as a JSON line.
+
+    Newlines and control characters inside values are escaped by json.dumps,
+    so one record always stays on one line.
+    """
+    if isinstance(record, str):
+        record = {"message": record}
+    return json.dumps(record, default=_json_default, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class BatchedLogSink:
+    """
+    Append-only log writer for the request hot path.
+
+    `write()` only appends the record to a deque (append/popleft are atomic in CPython,
+    so producers never take a lock) and returns immediately. A background thread
+    serializes the records and writes them in batches with a single `writev` call,
+    as soon as `batch_size` records are waiting or `flush_interval` seconds have passed.
+
+    When `max_queue` records are waiting, new records are either dropped
+    (overflow="drop", the right choice on the event loop) or the caller waits
+    for the writer to catch up (overflow="block", for worker threads). If there is
+    no writer thread to wait for (not started, closed, or died), a blocked caller
+    writes the queue itself.
+
+    A batch the writer thread cannot write (a failed writev, or a record json can't
+    encode) is logged, counted in `stats()["errors"]` and dropped; the thread keeps
+    running.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 512,
+        flush_interval: float = 0.2,
+        max_queue: int = 10_000,
+        overflow: str = "drop",
+    ):
+        if overflow not in ("drop", "block"):
+            raise ValueError("overflow must be 'drop' or 'block'")
+
+        self.path = path
+        # writev() accepts at most IOV_MAX (1024 on Linux) buffers per call
+        self.batch_size = min(batch_size, 1024)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overflow = overflow
+
+        self._queue: deque = deque()
+        self._wakeup = threading.Event()
+        self._drained = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # serializes flush() callers so batches keep their order in the file
+        self._flush_lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+
+    # --- Producer side ---
+
+    def write(self, record: Union[Dict[str, Any], str]) -> bool:
+        """Queue a record; returns False if it was dropped because the queue is full."""
+        if len(self._queue) >= self.max_queue:
+            if self.overflow == "drop":
+                self.dropped += 1
+                return False
+            # backpressure: wait until the writer thread has made room
+            while len(self._queue) >= self.max_queue:
+                if self._thread is None or not self._thread.is_alive():
+                    # nobody else will drain the queue: waiting would never end
+                    self.flush()
+                    break
+                self._wakeup.set()
+                self._drained.clear()
+                self._drained.wait(self.flush_interval)
+
+        self._queue.append(record)
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    # --- Writer side ---
+
+    def start(self) -> "BatchedLogSink":
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop the writer thread after writing everything that is still queued."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> None:
+        """Write every queued record now (from the calling thread)."""
+        with self._flush_lock:
+            while self._queue:
+                self._write_batch(self._take_batch())
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            while self._queue:
+                try:
+                    self._write_batch(self._take_batch())
+                except Exception:
+                    self.errors += 1
+                    logger.exception("Dropped a log batch for %s", self.path)
+                # let blocked producers continue
+                self._drained.set()
+
+    def _take_batch(self) -> List[bytes]:
+        batch = []
+        queue = self._queue
+        for _ in range(min(self.batch_size, len(queue))):
+            batch.append(encode_record(queue.popleft()))
+        return batch
+
+    def _write_batch(self, lines: List[bytes]) -> None:
+        if not lines:
+            return
+        # The file is opened per batch, not per record, so log rotation (or a test
+        # removing the file) is picked up at the next batch.
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if hasattr(os, "writev"):
+                written = os.writev(fd, lines)
+                total = sum(len(line) for line in lines)
+                if written < total:
+                    # partial write: send the rest as a single buffer
+                    self._write_all(fd, b"".join(lines)[written:])
+            else:
+                self._write_all(fd, b"".join(lines))
+        finally:
+            os.close(fd)
+        self.written += len(lines)
+        self.batches += 1
+
+    @staticmethod
+    def _write_all(fd: int, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+    def __enter__(self) -> "BatchedLogSink":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,110 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import List, Optional
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, Field
+
+import fast_json
+from fast_json import FastJSONResponse, dumps, fast_json_response
+
+
+class Color(str, Enum):
+    RED = "red"
+
+
+class Tag(BaseModel):
+    name: str
+
+
+class Thing(BaseModel):
+    id: int
+    color: Color
+    price: Decimal
+    seen_at: datetime
+    note: Optional[str] = None
+    tags: List[Tag] = []
+    label: str = Field("plain", alias="displayLabel")
+
+
+def make_thing(**changes):
+    thing = {
+        "id": 1, "color": Color.RED, "price": Decimal("9.50"),
+        "seen_at": datetime(2024, 1, 2, 3, 4, 5, 678, tzinfo=timezone.utc),
+        "tags": [{"name": "a", "secret": 1}], "internal": "not for clients"
+    }
+    thing.update(changes)
+    return thing
+
+
+@pytest.mark.parametrize("encoder", ["orjson", "json"])
+def test_dumps_matches_pydantic(monkeypatch, encoder):
+    if encoder == "json":
+        monkeypatch.setattr(fast_json, "orjson", None)
+    elif fast_json.orjson is None:
+        pytest.skip("orjson is not installed")
+    model = Thing.model_validate(make_thing())
+    naive = datetime(2024, 5, 6, 7, 8, 9)
+    assert json.loads(dumps(model)) == json.loads(model.model_dump_json(by_alias=True))
+    assert json.loads(dumps({"at": naive, "ok": True, 1: None})) == {"at": "2024-05-06T07:08:09", "ok": True, "1": None}
+    assert dumps(["é"]) == '["é"]'.encode()
+
+
+def test_projection_trims_to_the_model():
+    project = fast_json._projector(List[Thing])
+    [projected] = project([make_thing()])
+    assert "internal" not in projected
+    assert projected["tags"] == [{"name": "a"}]
+    assert projected["note"] is None and projected["displayLabel"] == "plain"
+    with pytest.raises(KeyError):
+        project([{"id": 1}])
+
+
+def test_decorator_skips_validation_and_keeps_the_schema():
+    app = FastAPI()
+
+    @app.get("/things", response_model=List[Thing])
+    @fast_json_response(List[Thing])
+    async def list_things(limit: int = 10):
+        return [make_thing(id=i) for i in range(limit)]
+
+    @app.post("/things", response_model=Thing, status_code=201)
+    @fast_json_response(Thing, status_code=201)
+    def create_thing(response: Response):
+        response.headers["X-Thing"] = "made"
+        return make_thing()
+
+    @app.get("/raw")
+    @fast_json_response()
+    def raw():
+        return Response("plain text", media_type="text/plain")
+
+    client = TestClient(app)
+    listed = client.get("/things?limit=2")
+    assert listed.status_code == 200
+    assert [thing["id"] for thing in listed.json()] == [0, 1]
+    assert "internal" not in listed.json()[0]
+
+    created = client.post("/things")
+    assert created.status_code == 201 and created.headers["X-Thing"] == "made"
+    assert created.json() == json.loads(Thing.model_validate(make_thing()).model_dump_json(by_alias=True))
+
+    assert client.get("/raw").text == "plain text"
+
+    operation = app.openapi()["paths"]["/things"]["get"]
+    assert [param["name"] for param in operation["parameters"]] == ["limit"]
+    assert operation["responses"]["200"]["content"]["application/json"]["schema"]["items"]["$ref"].endswith("/Thing")
+
+
+def test_direct_call_returns_a_response():
+    @fast_json_response()
+    def endpoint():
+        return {"ok": True}
+
+    response = endpoint()
+    assert isinstance(response, FastJSONResponse)
+    assert response.body == b'{"ok":true}'
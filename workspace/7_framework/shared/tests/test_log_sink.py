@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+
+import pytest
+
+from log_sink import BatchedLogSink, encode_record
+
+
+class TestEncodeRecord:
+    """Test cases for JSON line encoding."""
+
+    def test_string_becomes_message(self):
+        """A plain string is wrapped in a message field."""
+        assert encode_record("hello") == b'{"message":"hello"}\n'
+
+    def test_newlines_are_escaped(self):
+        """A record with newlines still fits on one line."""
+        line = encode_record({"message": "a\nb"})
+        assert line.count(b"\n") == 1
+        assert json.loads(line)["message"] == "a\nb"
+
+    def test_bytes_are_binary_safe(self):
+        """Bytes values (even invalid UTF-8) are serialized instead of raising."""
+        line = encode_record({"body": b"ok\xff"})
+        assert json.loads(line)["body"] == "ok\\xff"
+
+
+class TestBatchedLogSink:
+    """Test cases for BatchedLogSink."""
+
+    def test_writes_batches_in_background(self, tmp_path):
+        """Records written by producers end up in the file, in order."""
+        path = tmp_path / "app.log"
+        with BatchedLogSink(str(path), batch_size=10, flush_interval=0.01) as sink:
+            for i in range(95):
+                sink.write({"n": i})
+
+        lines = path.read_text().splitlines()
+        assert [json.loads(line)["n"] for line in lines] == list(range(95))
+        assert sink.stats()["written"] == 95
+        # 95 records in batches of at most 10
+        assert sink.batches >= 10
+
+    def test_drop_on_overflow(self, tmp_path):
+        """With overflow='drop', records beyond max_queue are counted and discarded."""
+        sink = BatchedLogSink(str(tmp_path / "app.log"), max_queue=5)
+        results = [sink.write({"n": i}) for i in range(8)]
+        assert results == [True] * 5 + [False] * 3
+        assert sink.dropped == 3
+        sink.close()
+        assert len((tmp_path / "app.log").read_text().splitlines()) == 5
+
+    def test_block_on_overflow(self, tmp_path):
+        """With overflow='block', producers wait for the writer instead of dropping."""
+        path = tmp_path / "app.log"
+        with BatchedLogSink(str(path), max_queue=5, batch_size=5, flush_interval=0.01, overflow="block") as sink:
+            for i in range(50):
+                assert sink.write({"n": i}) is True
+
+        assert sink.dropped == 0
+        assert len(path.read_text().splitlines()) == 50
+
+    def test_block_without_writer_thread_flushes_synchronously(self, tmp_path):
+        """With overflow='block' and no writer thread, a full queue is written by the caller."""
+        path = tmp_path / "app.log"
+        sink = BatchedLogSink(str(path), max_queue=5, overflow="block")
+        for i in range(12):
+            assert sink.write({"n": i}) is True
+        assert [json.loads(line)["n"] for line in path.read_text().splitlines()] == list(range(10))
+        sink.close()
+        assert len(path.read_text().splitlines()) == 12
+
+    def test_block_after_writer_thread_died(self, tmp_path):
+        """A writer thread that is no longer alive does not leave producers waiting forever."""
+        path = tmp_path / "app.log"
+        sink = BatchedLogSink(str(path), max_queue=5, overflow="block")
+        sink._thread = threading.Thread(target=lambda: None)
+        sink._thread.start()
+        sink._thread.join()
+        for i in range(8):
+            assert sink.write({"n": i}) is True
+        assert sink.written == 5
+
+    def test_bad_batch_does_not_stop_writer_thread(self, tmp_path, caplog):
+        """A batch that cannot be written is logged and dropped; later batches are still written."""
+        path = tmp_path / "app.log"
+        circular = {}
+        circular["self"] = circular
+        with BatchedLogSink(str(path), batch_size=1, flush_interval=0.01) as sink:
+            sink.write(circular)
+            sink.write({"n": 1})
+            deadline = time.monotonic() + 5
+            while sink.written < 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert sink._thread.is_alive()
+
+        assert [json.loads(line) for line in path.read_text().splitlines()] == [{"n": 1}]
+        assert sink.stats()["errors"] == 1
+        assert "Dropped a log batch" in caplog.text
+
+    def test_invalid_overflow(self, tmp_path):
+        """Only 'drop' and 'block' are valid overflow policies."""
+        with pytest.raises(ValueError):
+            BatchedLogSink(str(tmp_path / "app.log"), overflow="ignore")
@@ -0,0 +1,201 @@
+import pytest
+import random
+
+from indexed_repository import IndexedRepository
+from indexed_repository.repository import _SortedIndex
+
+
+def make_items(count):
+    return [
+        {"id": i, "name": f"Item {i}", "price": float(i % 7), "category": "Books" if i % 2 else "Games"}
+        for i in range(1, count + 1)
+    ]
+
+
+class TestIndexedRepository:
+    """Test cases for the indexed in-memory repository."""
+
+    @pytest.fixture
+    def repo(self):
+        return IndexedRepository(indexes={"price": None, "category": str.lower}, records=make_items(20))
+
+    def test_get_and_len(self, repo):
+        assert len(repo) == 20
+        assert repo.get(5)["name"] == "Item 5"
+        assert repo.get(99) is None
+        assert 5 in repo and 99 not in repo
+
+    def test_duplicate_key_is_rejected(self, repo):
+        with pytest.raises(ValueError):
+            repo.insert({"id": 5, "name": "again", "price": 1.0})
+
+    def test_range_is_inclusive_and_ordered(self, repo):
+        prices = [item["price"] for item in repo.range("price", 2, 4)]
+        assert prices == sorted(prices)
+        assert set(prices) == {2.0, 3.0, 4.0}
+        assert len(prices) == len([item for item in make_items(20) if 2 <= item["price"] <= 4])
+
+    def test_open_ranges_and_reverse(self, repo):
+        assert all(item["price"] >= 5 for item in repo.range("price", low=5))
+        assert all(item["price"] <= 1 for item in repo.range("price", high=1))
+        descending = [item["price"] for item in repo.range("price", reverse=True)]
+        assert descending == sorted(descending, reverse=True)
+
+    def test_index_transform_applies_to_lookups(self, repo):
+        assert len(repo.find("category", "BOOKS")) == 10
+        assert [item["id"] for item in repo.find("category", "games")] == list(range(2, 21, 2))
+
+    def test_update_reindexes(self, repo):
+        repo.update(3, {"price": 100.0})
+        assert [item["id"] for item in repo.find("price", 100.0)] == [3]
+        assert 3 not in [item["id"] for item in repo.find("price", 3.0)]
+
+    def test_update_cannot_change_the_key(self, repo):
+        with pytest.raises(ValueError):
+            repo.update(3, {"id": 4})
+        assert repo.update(99, {"price": 1.0}) is None
+
+    def test_replace_and_delete(self, repo):
+        repo.replace(4, {"name": "New", "price": 50.0, "category": "Music"})
+        assert repo.get(4) == {"id": 4, "name": "New", "price": 50.0, "category": "Music"}
+        assert repo.find("category", "music")[0]["id"] == 4
+
+        assert repo.delete(4) is True
+        assert repo.delete(4) is False
+        assert repo.find("price", 50.0) == []
+        assert 4 not in [item["id"] for item in repo]
+
+    def test_offset_and_keyset_pages(self, repo):
+        assert [item["id"] for item in repo.page(offset=5, limit=3)] == [6, 7, 8]
+        assert [item["id"] for item in repo.page(after=8, limit=3)] == [9, 10, 11]
+        # keyset pages do not shift when earlier records are deleted
+        repo.delete(2)
+        assert [item["id"] for item in repo.page(after=8, limit=3)] == [9, 10, 11]
+
+    def test_select_stops_at_the_page(self, repo):
+        page = repo.select("category", "books", "books", where=lambda item: item["price"] > 2, offset=1, limit=2)
+        expected = [item for item in make_items(20) if item["id"] % 2 and item["price"] > 2][1:3]
+        assert page == expected
+
+    def test_missing_values_are_not_indexed(self):
+        repo = IndexedRepository(indexes=("price",), records=[{"id": 1, "price": None}, {"id": 2}])
+        assert list(repo.range("price")) == []
+        assert repo.delete(1) and repo.delete(2)
+
+    def test_next_id_and_clear(self, repo):
+        assert repo.next_id() == 21
+        repo.clear()
+        assert len(repo) == 0 and repo.next_id() == 1
+        assert list(repo.range("price")) == []
+
+    def test_matches_a_linear_scan(self, monkeypatch):
+        # tiny buckets so inserts and deletes split and empty them
+        monkeypatch.setattr(_SortedIndex, "LOAD", 4)
+        rng = random.Random(7)
+        repo = IndexedRepository(indexes=("price",), records=[{"id": i, "price": i % 50} for i in range(0, 200, 3)])
+        shadow = {record["id"]: record for record in repo}
+        for step in range(3000):
+            key = rng.randrange(200)
+            action = rng.random()
+            if key not in shadow and action < 0.5:
+                record = {"id": key, "price": rng.randrange(50)}
+                repo.insert(record)
+                shadow[key] = record
+            elif key in shadow and action < 0.8:
+                repo.update(key, {"price": rng.randrange(50)})
+            elif key in shadow:
+                repo.delete(key)
+                del shadow[key]
+
+            if step % 100 == 0:
+                low, high = sorted((rng.randrange(50), rng.randrange(50)))
+                expected = sorted((r["price"], r["id"]) for r in shadow.values() if low <= r["price"] <= high)
+                assert [(r["price"], r["id"]) for r in repo.range("price", low, high)] == expected
+                assert [(r["price"], r["id"]) for r in repo.range("price", low, high, reverse=True)] == expected[::-1]
+                keys = sorted(shadow)
+                assert [r["id"] for r in repo] == keys
+                assert [r["id"] for r in repo.page(offset=7, limit=9)] == keys[7:16]
+                assert [r["id"] for r in repo.page(after=low, limit=9)] == [k for k in keys if k > low][:9]
+
+    def test_seek_continues_after_a_position(self, monkeypatch):
+        monkeypatch.setattr(_SortedIndex, "LOAD", 4)
+        rng = random.Random(3)
+        rows = [{"id": i, "price": rng.randrange(20)} for i in range(1, 120)]
+        repo = IndexedRepository(indexes=("price",), records=rows)
+        by_price = sorted(rows, key=lambda r: (r["price"], r["id"]))
+        for position in (None, (0, 0), (7, 50), (7, 10**6), (19, 119), (50, 0)):
+            forward = [r for r in by_price if position is None or (r["price"], r["id"]) > position]
+            backward = [r for r in reversed(by_price) if position is None or (r["price"], r["id"]) < position]
+            assert list(repo.seek("price", position)) == forward
+            assert list(repo.seek("price", position, reverse=True)) == backward
+        assert [r["id"] for r in repo.seek(after=(None, 100))] == list(range(101, 120))
+        assert [r["id"] for r in repo.seek("id", after=(5, 5), reverse=True)] == [4, 3, 2, 1]
+        with pytest.raises(ValueError):
+            repo.seek("price", ("cheap", 1))
+
+    def test_transform_can_index_missing_values(self):
+        repo = IndexedRepository(indexes={"name": lambda name: name or ""},
+                                 records=[{"id": 1, "name": "b"}, {"id": 2, "name": None}, {"id": 3, "name": "a"}])
+        assert [r["id"] for r in repo.seek("name")] == [2, 3, 1]
+        assert [r["id"] for r in repo.seek("name", after=(None, 2))] == [3, 1]
+
+    def test_facets_and_search_are_bitmaps(self):
+        repo = IndexedRepository(indexes=("price",), facets=("category", "price"), search=("name",),
+                                 records=make_items(20))
+        books = repo.facet("category", "Books")
+        assert books.bit_count() == 10
+        assert repo.facet("category", "Music") == 0
+        cheap_books = books & repo.facet_range("price", high=2)
+        assert sorted(r["id"] for r in repo.seek(within=cheap_books)) == [
+            item["id"] for item in make_items(20) if item["id"] % 2 and item["price"] <= 2
+        ]
+        # "1" is shorter than the n-grams and checks every record; "tem 1" uses the index
+        assert [r["id"] for r in repo.seek(within=repo.search("1"))] == [1] + list(range(10, 20))
+        assert [r["id"] for r in repo.seek(within=repo.search("TEM 1"))] == [1] + list(range(10, 20))
+        assert repo.search("item 99") == 0
+
+    def test_bitmaps_follow_writes(self):
+        repo = IndexedRepository(facets=("status",), search=("name",), records=[
+            {"id": 1, "name": "Alice", "status": "active"},
+            {"id": 2, "name": "Bob", "status": "inactive"},
+        ])
+        repo.update(2, {"status": "active", "name": "Bobby"})
+        repo.delete(1)
+        repo.insert({"id": 3, "name": "Carol", "status": "active"})  # reuses the slot of 1
+        assert [r["id"] for r in repo.seek(within=repo.facet("status", "active"))] == [2, 3]
+        assert repo.facet("status", "inactive") == 0
+        assert [r["id"] for r in repo.seek(within=repo.search("bobb"))] == [2]
+        assert repo.search("alice") == 0
+        repo.replace(3, {"name": "Dave", "status": "inactive"})
+        assert [r["id"] for r in repo.seek(within=repo.facet("status", "inactive"))] == [3]
+        assert [r["id"] for r in repo.seek(within=repo.search("dav"))] == [3]
+        repo.clear()
+        assert repo.facet("status", "active") == 0 and repo.search("dav") == 0
+
+    @pytest.mark.parametrize("ngram,sparse", [(3, 0), (0, 0), (3, 10**6)])
+    def test_seek_within_matches_a_linear_scan(self, monkeypatch, ngram, sparse):
+        monkeypatch.setattr(_SortedIndex, "LOAD", 4)
+        # SPARSE 0 always walks the sort index, 10**6 always sorts the matches
+        monkeypatch.setattr(IndexedRepository, "SPARSE", sparse)
+        rng = random.Random(11)
+        words = ["alpha", "beta", "gamma", "delta"]
+        rows = [{"id": i, "price": rng.randrange(30), "group": rng.randrange(4),
+                 "name": f"{rng.choice(words)} {rng.choice(words)}"} for i in range(1, 400)]
+        repo = IndexedRepository(indexes=("price",), facets=("group",), search=("name",), ngram=ngram, records=rows)
+        by_price = sorted(rows, key=lambda r: (r["price"], r["id"]))
+        for bitmap, check in (
+            (repo.facet("group", 0), lambda r: r["group"] == 0),
+            (repo.facet("group", 1) & repo.search("ta ga"), lambda r: r["group"] == 1 and "ta ga" in r["name"]),
+        ):
+            assert bitmap.bit_count() == sum(1 for r in rows if check(r))
+            for position in (None, (10, 0), (10, 200)):
+                forward = [r for r in by_price if check(r) and (position is None or (r["price"], r["id"]) > position)]
+                backward = [r for r in reversed(by_price)
+                            if check(r) and (position is None or (r["price"], r["id"]) < position)]
+                assert list(repo.seek("price", position, within=bitmap)) == forward
+                assert list(repo.seek("price", position, reverse=True, within=bitmap)) == backward
+            assert [r["id"] for r in repo.seek(within=bitmap)] == [r["id"] for r in rows if check(r)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
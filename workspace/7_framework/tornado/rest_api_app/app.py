@@ -2,28 +2,28 @@ import tornado.ioloop
 import tornado.web
 import json
 
-# Sample in-memory data
-items = [
-    {"id": 1, "name": "Item 1"},
-    {"id": 2, "name": "Item 2"},
-    {"id": 3, "name": "Item 3"}
-]
+# Sample in-memory data, keyed by id
+items = {
+    1: {"id": 1, "name": "Item 1"},
+    2: {"id": 2, "name": "Item 2"},
+    3: {"id": 3, "name": "Item 3"}
+}
 
 class ItemListHandler(tornado.web.RequestHandler):
     def set_default_headers(self):
         self.set_header("Content-Type", "application/json")
 
     def get(self):
-        self.write(json.dumps(items))
+        self.write(json.dumps(list(items.values())))
 
     def post(self):
         try:
             data = json.loads(self.request.body)
             new_item = {
-                "id": items[-1]["id"] + 1 if items else 1,
+                "id": max(items, default=0) + 1,
                 "name": data["name"]
             }
-            items.append(new_item)
+            items[new_item["id"]] = new_item
             self.set_status(201)
             self.write(json.dumps(new_item))
         except Exception as e:
@@ -35,7 +35,7 @@ class ItemHandler(tornado.web.RequestHandler):
         self.set_header("Content-Type", "application/json")
 
     def get(self, item_id):
-        item = next((item for item in items if item["id"] == int(item_id)), None)
+        item = items.get(int(item_id))
         if item:
             self.write(json.dumps(item))
         else:
@@ -44,7 +44,7 @@ class ItemHandler(tornado.web.RequestHandler):
 
     def put(self, item_id):
         try:
-            item = next((item for item in items if item["id"] == int(item_id)), None)
+            item = items.get(int(item_id))
             if not item:
                 self.set_status(404)
                 self.write(json.dumps({"error": "Item not found"}))
@@ -58,8 +58,7 @@ class ItemHandler(tornado.web.RequestHandler):
             self.write(json.dumps({"error": str(e)}))
 
     def delete(self, item_id):
-        global items
-        items = [item for item in items if item["id"] != int(item_id)]
+        items.pop(int(item_id), None)
         self.set_status(204)
 
 def make_app():
@@ -17,11 +17,11 @@ class TestRestApi(tornado.testing.AsyncHTTPTestCase):
         super().setUp()
         # Reset items to initial state before each test
         app.items.clear()
-        app.items.extend([
-            {"id": 1, "name": "Item 1"},
-            {"id": 2, "name": "Item 2"},
-            {"id": 3, "name": "Item 3"}
-        ])
+        app.items.update({
+            1: {"id": 1, "name": "Item 1"},
+            2: {"id": 2, "name": "Item 2"},
+            3: {"id": 3, "name": "Item 3"}
+        })
 
     def test_get_items_success(self):
         """Test GET /items returns all items"""
@@ -68,7 +68,7 @@ class TestRestApi(tornado.testing.AsyncHTTPTestCase):
 
         # Verify item was added to the list
         self.assertEqual(len(app.items), 4)
-        self.assertEqual(app.items[-1]["name"], "New Test Item")
+        self.assertEqual(app.items.get(data["id"])["name"], "New Test Item")
 
     def test_post_item_empty_list(self):
         """Test POST /items creates item with ID 1 when list is empty"""
@@ -158,7 +158,7 @@ class TestRestApi(tornado.testing.AsyncHTTPTestCase):
         self.assertEqual(data["name"], "Updated Item 1")
 
         # Verify the item was actually updated in the list
-        updated_item = next(item for item in app.items if item["id"] == 1)
+        updated_item = next(item for item in app.items.values() if item["id"] == 1)
         self.assertEqual(updated_item["name"], "Updated Item 1")
 
     def test_put_item_not_found(self):
@@ -193,7 +193,7 @@ class TestRestApi(tornado.testing.AsyncHTTPTestCase):
         """Test DELETE /items/{id} removes item successfully"""
         # Verify item exists before deletion
         self.assertEqual(len(app.items), 3)
-        self.assertTrue(any(item["id"] == 2 for item in app.items))
+        self.assertTrue(any(item["id"] == 2 for item in app.items.values()))
 
         response = self.fetch("/items/2", method="DELETE")
 
@@ -202,7 +202,7 @@ class TestRestApi(tornado.testing.AsyncHTTPTestCase):
 
         # Verify item was removed from the list
         self.assertEqual(len(app.items), 2)
-        self.assertFalse(any(item["id"] == 2 for item in app.items))
+        self.assertFalse(any(item["id"] == 2 for item in app.items.values()))
 
     def test_delete_item_not_found(self):
         """Test DELETE /items/{id} for non-existent item still returns 204"""